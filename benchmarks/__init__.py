@@ -0,0 +1,7 @@
+"""Benchmarks for the Home Assistant side of the integration.  They import the integration
+so need Home Assistant installed; run them from the root of the repository:
+
+    python -m benchmarks.listener_registry
+
+The benchmarks for the pyenvisalink library are in pyenvisalink/benchmarks.
+"""
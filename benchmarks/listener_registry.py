@@ -0,0 +1,118 @@
+"""Registering, notifying and tearing down the listeners of a full set of zone entities
+(a zone sensor, a zone attribute sensor and a bypass switch per zone), compared with the
+lists of listeners the controller used to keep."""
+import argparse
+import asyncio
+import time
+
+from custom_components.envisalink_new.listener_registry import ListenerRegistry
+from custom_components.envisalink_new.pyenvisalink.const import (
+    EVL4_MAX_ZONES,
+    STATE_CHANGE_PARTITION,
+    STATE_CHANGE_ZONE,
+    STATE_CHANGE_ZONE_BYPASS,
+)
+from custom_components.envisalink_new.write_coalescer import StateWriteCoalescer
+
+
+class ListenerLists:
+    """The listeners as the controller originally kept them: a list per key, searched in
+    full to remove a listener."""
+
+    def __init__(self, loop):
+        self._listeners = {
+            STATE_CHANGE_PARTITION: {},
+            STATE_CHANGE_ZONE: {},
+            STATE_CHANGE_ZONE_BYPASS: {},
+        }
+
+    def add(self, state_type, state_key, update_callback, field=None):
+        def remove_listener():
+            for state_types in self._listeners.values():
+                for key_list in state_types.values():
+                    for idx, listener in enumerate(key_list):
+                        if listener[0] == remove_listener:
+                            key_list.pop(idx)
+                            break
+
+        self._listeners[state_type].setdefault(state_key, []).append(
+            (remove_listener, update_callback)
+        )
+        return remove_listener
+
+    def notify(self, state_type, keys):
+        state_info = self._listeners[state_type]
+        for key in keys:
+            for listener in state_info.get(key, ()):
+                listener[1]()
+
+
+class Registry:
+    """The listener registry and write coalescer, wired up the way the controller does."""
+
+    def __init__(self, loop):
+        self._listeners = ListenerRegistry()
+        self._state_writes = StateWriteCoalescer(loop)
+
+    def add(self, state_type, state_key, update_callback, field=None):
+        handle = self._listeners.add(state_type, state_key, update_callback, field)
+
+        def remove_listener():
+            self._listeners.remove(handle)
+            self._state_writes.discard(update_callback)
+
+        return remove_listener
+
+    def notify(self, state_type, keys):
+        for key in keys:
+            for callback in self._listeners.listeners(state_type, key):
+                callback()
+
+
+def entities(zones) -> list:
+    listeners = []
+    for zone in range(1, zones + 1):
+        listeners.append((STATE_CHANGE_ZONE, zone, None))
+        listeners.append((STATE_CHANGE_ZONE, zone, "low_battery"))
+        listeners.append((STATE_CHANGE_ZONE_BYPASS, zone, None))
+    return listeners
+
+
+def measure(cls, loop, zones, reps) -> tuple:
+    """Milliseconds to register, notify every zone and tear down the listeners."""
+    listeners = entities(zones)
+    register = notify = teardown = 0.0
+    for _ in range(reps):
+        registry = cls(loop)
+        start = time.perf_counter()
+        removers = [registry.add(t, k, lambda: None, f) for t, k, f in listeners]
+        registered = time.perf_counter()
+        registry.notify(STATE_CHANGE_ZONE, range(1, zones + 1))
+        notified = time.perf_counter()
+        for remove in removers:
+            remove()
+        done = time.perf_counter()
+        register += registered - start
+        notify += notified - registered
+        teardown += done - notified
+    return register / reps * 1e3, notify / reps * 1e3, teardown / reps * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--zones", type=int, default=EVL4_MAX_ZONES)
+    parser.add_argument("--reps", type=int, default=50)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    for name, cls in (("lists", ListenerLists), ("registry", Registry)):
+        register, notify, teardown = measure(cls, loop, args.zones, args.reps)
+        print(
+            f"{name:8} {args.zones} zones x 3 entities: register {register:6.3f} ms  "
+            f"notify {notify:6.3f} ms  teardown {teardown:7.3f} ms"
+        )
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Entity state writes per second under a synthetic load of chattering motion zones and
+keypad updates covering every partition, with each write made as soon as the change
+arrives (as the controller originally did) and through the write coalescer.  Also reports
+how long a zone going into alarm waits for its write."""
+import argparse
+import asyncio
+import random
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from custom_components.envisalink_new.const import (
+    CONF_STATE_WRITE_WINDOW,
+    CONF_ZONE_MIN_UPDATE_INTERVAL,
+    DOMAIN,
+)
+from custom_components.envisalink_new.controller import EnvisalinkController
+from custom_components.envisalink_new.pyenvisalink.alarm_state import ZONE_ALARM, AlarmState
+from custom_components.envisalink_new.pyenvisalink.const import (
+    MAX_PARTITIONS,
+    STATE_CHANGE_PARTITION,
+    STATE_CHANGE_ZONE,
+)
+
+ZONES = 32
+MOTION_ZONES = (3, 4, 5, 6)
+ALARM_ZONE = 20
+
+
+class DirectWrites:
+    """Stands in for the write coalescer, writing every entity straight away."""
+
+    def schedule(self, callbacks, key=None, urgent=False):
+        for callback in callbacks:
+            callback()
+
+    def cancel(self):
+        pass
+
+
+def make_controller(hass, options) -> EnvisalinkController:
+    entry = ConfigEntry(
+        version=1,
+        minor_version=1,
+        domain=DOMAIN,
+        title="Benchmark",
+        data={"host": "127.0.0.1", "zone_set": f"1-{ZONES}"},
+        options=options,
+        source="user",
+        unique_id=None,
+        discovery_keys={},
+    )
+    controller = EnvisalinkController(hass, entry)
+    controller.controller._alarmState = AlarmState.get_initial_alarm_state(
+        ZONES, MAX_PARTITIONS
+    )
+    return controller
+
+
+async def run(hass, options, duration, direct=False) -> tuple:
+    """Entity writes per second and the longest wait for an alarm zone to be written."""
+    loop = asyncio.get_running_loop()
+    controller = make_controller(hass, options)
+    if direct:
+        controller._state_writes = DirectWrites()
+
+    writes = 0
+    alarm_waits = []
+    alarm_since = None
+
+    def write_zone(zone):
+        def write():
+            nonlocal writes, alarm_since
+            writes += 1
+            if zone == ALARM_ZONE and alarm_since is not None:
+                alarm_waits.append(loop.time() - alarm_since)
+                alarm_since = None
+
+        return write
+
+    def write_entity():
+        nonlocal writes
+        writes += 1
+
+    for zone in range(1, ZONES + 1):
+        controller.add_state_change_listener(STATE_CHANGE_ZONE, zone, write_zone(zone))
+    for partition in range(1, MAX_PARTITIONS + 1):
+        for field in ("ready", "trouble", "ac_present", "fire", "alarm"):
+            controller.add_state_change_listener(
+                STATE_CHANGE_PARTITION, partition, write_entity, field
+            )
+        # The alarm panel and keypad entities are written on any change
+        for _ in range(2):
+            controller.add_state_change_listener(
+                STATE_CHANGE_PARTITION, partition, write_entity
+            )
+
+    zones = controller.controller.alarm_state.zones
+    rand = random.Random(5)
+    end = loop.time() + duration
+    while loop.time() < end:
+        # A handful of frames arrive in each read from the EVL
+        for _ in range(rand.randint(1, 6)):
+            r = rand.random()
+            if r < 0.7:
+                controller.async_zones_updated_callback([rand.choice(MOTION_ZONES)])
+            elif r < 0.95:
+                controller.async_keypad_updated_callback(
+                    {p: ["alpha"] for p in range(1, MAX_PARTITIONS + 1)}
+                )
+            else:
+                controller.async_keypad_updated_callback(
+                    {p: ["ready"] for p in range(1, MAX_PARTITIONS + 1)}
+                )
+        if rand.random() < 0.01:
+            inAlarm = not zones.get_flag(ALARM_ZONE, ZONE_ALARM)
+            zones.set_flag(ALARM_ZONE, ZONE_ALARM, inAlarm)
+            alarm_since = loop.time()
+            controller.async_zones_updated_callback([ALARM_ZONE])
+        await asyncio.sleep(0.01)
+
+    controller._state_writes.cancel()
+    wait = max(alarm_waits) * 1e3 if alarm_waits else 0.0
+    return writes / duration, wait
+
+
+async def run_cases(duration):
+    hass = HomeAssistant("/tmp")
+    cases = (
+        ("direct writes", {}, True),
+        ("coalesced per iteration", {}, False),
+        ("window 0.1 s", {CONF_STATE_WRITE_WINDOW: 0.1}, False),
+        ("zone min interval 1 s", {CONF_ZONE_MIN_UPDATE_INTERVAL: 1.0}, False),
+    )
+    for name, options, direct in cases:
+        rate, wait = await run(hass, options, duration, direct)
+        print(f"{name:24} {rate:7.1f} writes/s  longest alarm zone wait {wait:6.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+    asyncio.run(run_cases(args.duration))
+
+
+if __name__ == "__main__":
+    main()
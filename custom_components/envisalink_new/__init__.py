@@ -2,6 +2,8 @@
 from __future__ import annotations
 
 from copy import deepcopy
+from functools import partial
+from pathlib import Path
 from typing import Any
 
 import homeassistant.helpers.config_validation as cv
@@ -44,7 +46,7 @@ from .const import (
     SHOW_KEYPAD_ALWAYS_VALUE,
     SHOW_KEYPAD_NEVER_VALUE,
 )
-from .controller import EnvisalinkController
+from .controller import EnvisalinkController, discovery_store, journal_path, snapshot_path
 from .helpers import generate_range_string
 from .pyenvisalink.alarm_panel import EnvisalinkAlarmPanel
 from .pyenvisalink.const import PANEL_TYPE_DSC, PANEL_TYPE_HONEYWELL
@@ -89,7 +91,7 @@ CONFIG_SCHEMA = vol.Schema(
                 ),
                 vol.Optional(
                     CONF_ZONEDUMP_INTERVAL, default=DEFAULT_ZONEDUMP_INTERVAL
-                ): vol.Coerce(int),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0)),
                 vol.Optional(CONF_TIMEOUT, default=DEFAULT_TIMEOUT): vol.Coerce(int),
             }
         )
@@ -171,6 +173,16 @@ async def async_unload_entry(
     return unload_ok
 
 
+async def async_remove_entry(
+    hass: HomeAssistant, entry: config_entries.ConfigEntry
+) -> None:
+    """Remove the saved discovery details, alarm state and event journal along with the
+    config entry."""
+    await discovery_store(hass, entry.entry_id).async_remove()
+    for path in (snapshot_path(hass, entry.entry_id), journal_path(hass, entry.entry_id)):
+        await hass.async_add_executor_job(partial(Path(path).unlink, missing_ok=True))
+
+
 async def async_reload_entry(
     hass: HomeAssistant, entry: config_entries.ConfigEntry
 ) -> None:
@@ -230,6 +242,7 @@ def _transform_yaml_to_config_entry(yaml: dict[str, Any]) -> dict[str, Any]:
     for key in (
         CONF_PANIC,
         CONF_EVL_KEEPALIVE,
+        CONF_ZONEDUMP_INTERVAL,
         CONF_TIMEOUT,
         CONF_CREATE_ZONE_BYPASS_SWITCHES,
     ):
@@ -272,6 +285,7 @@ def _async_import_options_from_data_if_missing(
     for importable_option in (
         CONF_PANIC,
         CONF_EVL_KEEPALIVE,
+        CONF_ZONEDUMP_INTERVAL,
         CONF_TIMEOUT,
         CONF_CREATE_ZONE_BYPASS_SWITCHES,
     ):
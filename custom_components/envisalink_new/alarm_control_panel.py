@@ -223,6 +223,12 @@ class EnvisalinkAlarm(EnvisalinkDevice, AlarmControlPanelEntity):
     def _info(self):
         return self._controller.controller.alarm_state["partition"][self._partition_number]
 
+    @property
+    def extra_state_attributes(self):
+        """Return the state attributes."""
+        # The state restored at startup until the panel reports the partition again
+        return {"stale": self._info["status"].stale}
+
     @property
     def alarm_state(self) -> AlarmControlPanelState | None:
         """Return the state of the device."""
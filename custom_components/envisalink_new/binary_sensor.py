@@ -217,6 +217,10 @@ class EnvisalinkBinarySensor(EnvisalinkDevice, BinarySensorEntity, RestoreEntity
         self._zone_type = setup_info["zone_type"]
         self._attr_has_entity_name = setup_info["has_entity_name"]
 
+        # The attributes are rebuilt only when the zone's state has changed
+        self._attributes = None
+        self._attributes_version = None
+
         LOGGER.debug("Setting up zone: %s", name)
         super().__init__(name, controller, STATE_CHANGE_ZONE, zone_number)
 
@@ -224,6 +228,7 @@ class EnvisalinkBinarySensor(EnvisalinkDevice, BinarySensorEntity, RestoreEntity
         await super().async_added_to_hass()
 
         self.last_state = await self.async_get_last_state()
+        self._attributes_version = None
 
     @property
     def _info(self):
@@ -232,6 +237,14 @@ class EnvisalinkBinarySensor(EnvisalinkDevice, BinarySensorEntity, RestoreEntity
     @property
     def extra_state_attributes(self):
         """Return the state attributes."""
+        zones = self._controller.controller.alarm_state.zones
+        version = (zones.versions[self._zone_number], zones.last_fault[self._zone_number])
+        if version != self._attributes_version:
+            self._attributes = self._build_attributes()
+            self._attributes_version = version
+        return self._attributes
+
+    def _build_attributes(self) -> dict:
         attr = {}
 
         last_fault = self._info["last_fault"]
@@ -258,6 +271,11 @@ class EnvisalinkBinarySensor(EnvisalinkDevice, BinarySensorEntity, RestoreEntity
         # Expose whether the zone is currently bypassed
         attr["bypassed"] = self._info["bypassed"]
 
+        # The state restored at startup until the panel reports the zone again
+        attr["stale"] = self._controller.controller.alarm_state.zones.is_stale(
+            self._zone_number
+        )
+
         for key, value in self._info["status"].items():
             attr[key] = value
 
@@ -300,6 +318,8 @@ class EnvisalinkAttributeBinarySensor(EnvisalinkDevice, BinarySensorEntity):
         self._index = index
         if partition:
             self._partition = partition
+        if attr_type == "zone":
+            self._attr_extra_state_attributes = {"zone": index, "partition": partition}
 
         setup_info = generate_entity_setup_info(
             controller,
@@ -318,6 +338,7 @@ class EnvisalinkAttributeBinarySensor(EnvisalinkDevice, BinarySensorEntity):
             controller,
             STATE_CHANGE_PARTITION if attr_type == "partition" else STATE_CHANGE_ZONE,
             index,
+            evl_attr_name,
         )
 
     @property
@@ -334,12 +355,3 @@ class EnvisalinkAttributeBinarySensor(EnvisalinkDevice, BinarySensorEntity):
         """Return true if sensor is on."""
         return self._info["status"].get(self._evl_attr_name)
 
-    @property
-    def extra_state_attributes(self):
-        """Return the state attributes."""
-        attr = {}
-
-        if self._evl_attr_type == "zone":
-            attr["zone"] = self._index
-            attr["partition"] = self._partition
-        return attr
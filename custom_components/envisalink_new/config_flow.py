@@ -15,35 +15,55 @@ from homeassistant.helpers.device_registry import format_mac
 
 from .const import (
     CONF_ALARM_NAME,
+    CONF_BUFFERED_TRANSPORT,
     CONF_CODE_ARM_REQUIRED,
+    CONF_CONGESTION_CONTROL,
     CONF_CREATE_ZONE_BYPASS_SWITCHES,
+    CONF_EVENT_JOURNAL,
     CONF_EVL_DISCOVERY_PORT,
     CONF_EVL_KEEPALIVE,
     CONF_EVL_PORT,
     CONF_EVL_VERSION,
     CONF_HONEYWELL_ARM_NIGHT_MODE,
+    CONF_KEYPRESS_BATCH_SIZE,
     CONF_PANEL_TYPE,
     CONF_PANIC,
     CONF_PARTITION_ASSIGNMENTS,
     CONF_PARTITION_SET,
     CONF_PASS,
+    CONF_PIPELINE_WINDOW,
     CONF_SHOW_KEYPAD,
+    CONF_STATE_WRITE_WINDOW,
     CONF_USERNAME,
+    CONF_WIRE_TRACE_MAX_PER_SECOND,
+    CONF_WIRE_TRACE_SAMPLE_RATE,
     CONF_WIRELESS_ZONE_SET,
+    CONF_ZONE_MIN_UPDATE_INTERVAL,
     CONF_ZONE_SET,
+    CONF_ZONEDUMP_INTERVAL,
     DEFAULT_ALARM_NAME,
+    DEFAULT_BUFFERED_TRANSPORT,
     DEFAULT_CODE_ARM_REQUIRED,
+    DEFAULT_CONGESTION_CONTROL,
     DEFAULT_CREATE_ZONE_BYPASS_SWITCHES,
     DEFAULT_DISCOVERY_PORT,
+    DEFAULT_EVENT_JOURNAL,
     DEFAULT_EVL_VERSION,
     DEFAULT_HONEYWELL_ARM_NIGHT_MODE,
     DEFAULT_KEEPALIVE,
+    DEFAULT_KEYPRESS_BATCH_SIZE,
     DEFAULT_PANIC,
     DEFAULT_PARTITION_SET,
+    DEFAULT_PIPELINE_WINDOW,
     DEFAULT_PORT,
     DEFAULT_SHOW_KEYPAD,
+    DEFAULT_STATE_WRITE_WINDOW,
     DEFAULT_TIMEOUT,
     DEFAULT_USERNAME,
+    DEFAULT_WIRE_TRACE_MAX_PER_SECOND,
+    DEFAULT_WIRE_TRACE_SAMPLE_RATE,
+    DEFAULT_ZONE_MIN_UPDATE_INTERVAL,
+    DEFAULT_ZONEDUMP_INTERVAL,
     DOMAIN,
     HONEYWELL_ARM_MODE_INSTANT_VALUE,
     HONEYWELL_ARM_MODE_NIGHT_VALUE,
@@ -199,6 +219,54 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     CONF_EVL_KEEPALIVE, DEFAULT_KEEPALIVE
                 ),
             ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+            vol.Optional(
+                CONF_ZONEDUMP_INTERVAL,
+                default=self.config_entry.options.get(
+                    CONF_ZONEDUMP_INTERVAL, DEFAULT_ZONEDUMP_INTERVAL
+                ),
+            ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+            vol.Optional(
+                CONF_STATE_WRITE_WINDOW,
+                default=self.config_entry.options.get(
+                    CONF_STATE_WRITE_WINDOW, DEFAULT_STATE_WRITE_WINDOW
+                ),
+            ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+            vol.Optional(
+                CONF_ZONE_MIN_UPDATE_INTERVAL,
+                default=self.config_entry.options.get(
+                    CONF_ZONE_MIN_UPDATE_INTERVAL, DEFAULT_ZONE_MIN_UPDATE_INTERVAL
+                ),
+            ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+            vol.Optional(
+                CONF_EVENT_JOURNAL,
+                default=self.config_entry.options.get(
+                    CONF_EVENT_JOURNAL, DEFAULT_EVENT_JOURNAL
+                ),
+            ): selector.BooleanSelector(),
+            vol.Optional(
+                CONF_BUFFERED_TRANSPORT,
+                default=self.config_entry.options.get(
+                    CONF_BUFFERED_TRANSPORT, DEFAULT_BUFFERED_TRANSPORT
+                ),
+            ): selector.BooleanSelector(),
+            vol.Optional(
+                CONF_WIRE_TRACE_SAMPLE_RATE,
+                default=self.config_entry.options.get(
+                    CONF_WIRE_TRACE_SAMPLE_RATE, DEFAULT_WIRE_TRACE_SAMPLE_RATE
+                ),
+            ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+            vol.Optional(
+                CONF_WIRE_TRACE_MAX_PER_SECOND,
+                default=self.config_entry.options.get(
+                    CONF_WIRE_TRACE_MAX_PER_SECOND, DEFAULT_WIRE_TRACE_MAX_PER_SECOND
+                ),
+            ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+            vol.Optional(
+                CONF_CONGESTION_CONTROL,
+                default=self.config_entry.options.get(
+                    CONF_CONGESTION_CONTROL, DEFAULT_CONGESTION_CONTROL
+                ),
+            ): selector.BooleanSelector(),
             vol.Optional(
                 CONF_TIMEOUT,
                 default=self.config_entry.options.get(CONF_TIMEOUT, DEFAULT_TIMEOUT),
@@ -236,6 +304,14 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     default="",
                 )
             ] = cv.string
+            options_schema[
+                vol.Optional(
+                    CONF_PIPELINE_WINDOW,
+                    default=self.config_entry.options.get(
+                        CONF_PIPELINE_WINDOW, DEFAULT_PIPELINE_WINDOW
+                    ),
+                )
+            ] = vol.All(vol.Coerce(int), vol.Range(min=1))
 
         # Add Honeywell-only options
         if self.config_entry.data.get(CONF_PANEL_TYPE) == PANEL_TYPE_HONEYWELL:
@@ -256,6 +332,15 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     translation_key=CONF_HONEYWELL_ARM_NIGHT_MODE,
                 )
             )
+            # Number of keys sent in each keypress command
+            options_schema[
+                vol.Optional(
+                    CONF_KEYPRESS_BATCH_SIZE,
+                    default=self.config_entry.options.get(
+                        CONF_KEYPRESS_BATCH_SIZE, DEFAULT_KEYPRESS_BATCH_SIZE
+                    ),
+                )
+            ] = vol.All(vol.Coerce(int), vol.Range(min=1))
 
         # Selection options for when the keypad should be displayed
         options_schema[
@@ -23,6 +23,15 @@ CONF_PANIC = "panic_type"  # OPTION
 CONF_PASS = "password"
 CONF_USERNAME = "user_name"
 CONF_ZONEDUMP_INTERVAL = "zonedump_interval"  # OPTION
+CONF_STATE_WRITE_WINDOW = "state_write_window"  # OPTION
+CONF_ZONE_MIN_UPDATE_INTERVAL = "zone_min_update_interval"  # OPTION
+CONF_EVENT_JOURNAL = "event_journal"  # OPTION
+CONF_BUFFERED_TRANSPORT = "buffered_transport"  # OPTION
+CONF_WIRE_TRACE_SAMPLE_RATE = "wire_trace_sample_rate"  # OPTION
+CONF_WIRE_TRACE_MAX_PER_SECOND = "wire_trace_max_per_second"  # OPTION
+CONF_PIPELINE_WINDOW = "pipeline_window"  # OPTION
+CONF_KEYPRESS_BATCH_SIZE = "keypress_batch_size"  # OPTION
+CONF_CONGESTION_CONTROL = "congestion_control"  # OPTION
 CONF_CREATE_ZONE_BYPASS_SWITCHES = "create_zone_bypass_switches"  # OPTION
 CONF_HONEYWELL_ARM_NIGHT_MODE = "honeywell_arm_night_mode"  # OPTION
 CONF_WIRELESS_ZONE_SET = "wireless_zone_set"
@@ -60,7 +69,19 @@ DEFAULT_PORT = 4025
 DEFAULT_DISCOVERY_PORT = 80
 DEFAULT_TIMEOUT = 10
 DEFAULT_USERNAME = "user"
-DEFAULT_ZONEDUMP_INTERVAL = 30
+DEFAULT_ZONEDUMP_INTERVAL = 0
+DEFAULT_STATE_WRITE_WINDOW = 0
+DEFAULT_ZONE_MIN_UPDATE_INTERVAL = 0
+DEFAULT_EVENT_JOURNAL = False
+DEFAULT_BUFFERED_TRANSPORT = False
+DEFAULT_WIRE_TRACE_SAMPLE_RATE = 1
+DEFAULT_WIRE_TRACE_MAX_PER_SECOND = 0
+DEFAULT_PIPELINE_WINDOW = 1
+DEFAULT_KEYPRESS_BATCH_SIZE = 1
+DEFAULT_CONGESTION_CONTROL = False
+
+# Version of the saved EVL discovery details
+DISCOVERY_STORAGE_VERSION = 1
 DEFAULT_ZONETYPE = BinarySensorDeviceClass.OPENING
 DEFAULT_HONEYWELL_ARM_NIGHT_MODE = HONEYWELL_ARM_MODE_NIGHT_VALUE
 DEFAULT_SHOW_KEYPAD = SHOW_KEYPAD_ALWAYS_VALUE
@@ -1,39 +1,85 @@
 """Support for Envisalink devices."""
-from collections.abc import Callable
+from collections.abc import Callable, Mapping
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_HOST, CONF_TIMEOUT
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.const import CONF_HOST, CONF_TIMEOUT, EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant, callback
 from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.helpers.device_registry import format_mac
+from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.issue_registry import (
     IssueSeverity,
     async_create_issue,
     async_delete_issue,
 )
+from homeassistant.helpers.storage import STORAGE_DIR, Store
 
 from .const import (
+    CONF_BUFFERED_TRANSPORT,
+    CONF_CONGESTION_CONTROL,
     CONF_CREATE_ZONE_BYPASS_SWITCHES,
+    CONF_EVENT_JOURNAL,
     CONF_EVL_DISCOVERY_PORT,
     CONF_EVL_KEEPALIVE,
     CONF_EVL_PORT,
+    CONF_KEYPRESS_BATCH_SIZE,
     CONF_PASS,
+    CONF_PIPELINE_WINDOW,
+    CONF_STATE_WRITE_WINDOW,
     CONF_USERNAME,
+    CONF_WIRE_TRACE_MAX_PER_SECOND,
+    CONF_WIRE_TRACE_SAMPLE_RATE,
+    CONF_ZONE_MIN_UPDATE_INTERVAL,
+    CONF_ZONE_SET,
+    CONF_ZONEDUMP_INTERVAL,
+    DEFAULT_BUFFERED_TRANSPORT,
+    DEFAULT_CONGESTION_CONTROL,
     DEFAULT_CREATE_ZONE_BYPASS_SWITCHES,
     DEFAULT_DISCOVERY_PORT,
+    DEFAULT_EVENT_JOURNAL,
     DEFAULT_KEEPALIVE,
+    DEFAULT_KEYPRESS_BATCH_SIZE,
+    DEFAULT_PIPELINE_WINDOW,
     DEFAULT_PORT,
+    DEFAULT_STATE_WRITE_WINDOW,
     DEFAULT_TIMEOUT,
+    DEFAULT_WIRE_TRACE_MAX_PER_SECOND,
+    DEFAULT_WIRE_TRACE_SAMPLE_RATE,
+    DEFAULT_ZONE_MIN_UPDATE_INTERVAL,
+    DEFAULT_ZONEDUMP_INTERVAL,
+    DISCOVERY_STORAGE_VERSION,
     DOMAIN,
     LOGGER,
 )
 from .helpers import extract_discovery_endpoint, parse_range_string
+from .listener_registry import ListenerRegistry
 from .pyenvisalink.alarm_panel import EnvisalinkAlarmPanel
+from .pyenvisalink.alarm_state import ZONE_ALARM
 from .pyenvisalink.const import (
+    EVL4_MAX_ZONES,
     STATE_CHANGE_PARTITION,
     STATE_CHANGE_ZONE,
     STATE_CHANGE_ZONE_BYPASS,
 )
+from .write_coalescer import StateWriteCoalescer
+
+# Partition status changes which are written to HA immediately
+_URGENT_PARTITION_FIELDS = frozenset({"alarm", "fire", "alarm_fire_zone", "panic"})
+
+
+def discovery_store(hass: HomeAssistant, entry_id: str) -> Store[dict]:
+    """Storage for the discovery details of an EVL so they can be reused on restart."""
+    return Store(hass, DISCOVERY_STORAGE_VERSION, f"{DOMAIN}.{entry_id}.discovery")
+
+
+def snapshot_path(hass: HomeAssistant, entry_id: str) -> str:
+    """File the alarm state is saved to so it can be restored on restart."""
+    return hass.config.path(STORAGE_DIR, f"{DOMAIN}.{entry_id}.state")
+
+
+def journal_path(hass: HomeAssistant, entry_id: str) -> str:
+    """File the journal of panel events is kept in."""
+    return hass.config.path(STORAGE_DIR, f"{DOMAIN}.{entry_id}.journal")
 
 
 class EnvisalinkController:
@@ -55,13 +101,42 @@ class EnvisalinkController:
         discovery_port = entry.data.get(CONF_EVL_DISCOVERY_PORT, DEFAULT_DISCOVERY_PORT)
         user = entry.data.get(CONF_USERNAME)
         password = str(entry.data.get(CONF_PASS))
+        # Only the zones up to the highest configured one need to be tracked
+        zone_set = parse_range_string(entry.data.get(CONF_ZONE_SET, ""), 1, EVL4_MAX_ZONES)
+        max_zones = max(zone_set) if zone_set else None
 
         # Options
         keep_alive = entry.options.get(CONF_EVL_KEEPALIVE, DEFAULT_KEEPALIVE)
+        zone_dump_interval = entry.options.get(
+            CONF_ZONEDUMP_INTERVAL, DEFAULT_ZONEDUMP_INTERVAL
+        )
         create_zone_bypass_switches = entry.options.get(
             CONF_CREATE_ZONE_BYPASS_SWITCHES, DEFAULT_CREATE_ZONE_BYPASS_SWITCHES
         )
         connection_timeout = entry.options.get(CONF_TIMEOUT, DEFAULT_TIMEOUT)
+        state_write_window = entry.options.get(
+            CONF_STATE_WRITE_WINDOW, DEFAULT_STATE_WRITE_WINDOW
+        )
+        zone_min_update_interval = entry.options.get(
+            CONF_ZONE_MIN_UPDATE_INTERVAL, DEFAULT_ZONE_MIN_UPDATE_INTERVAL
+        )
+        event_journal = entry.options.get(CONF_EVENT_JOURNAL, DEFAULT_EVENT_JOURNAL)
+        buffered_transport = entry.options.get(
+            CONF_BUFFERED_TRANSPORT, DEFAULT_BUFFERED_TRANSPORT
+        )
+        wire_trace_sample_rate = entry.options.get(
+            CONF_WIRE_TRACE_SAMPLE_RATE, DEFAULT_WIRE_TRACE_SAMPLE_RATE
+        )
+        wire_trace_max_per_second = entry.options.get(
+            CONF_WIRE_TRACE_MAX_PER_SECOND, DEFAULT_WIRE_TRACE_MAX_PER_SECOND
+        )
+        pipeline_window = entry.options.get(CONF_PIPELINE_WINDOW, DEFAULT_PIPELINE_WINDOW)
+        keypress_batch_size = entry.options.get(
+            CONF_KEYPRESS_BATCH_SIZE, DEFAULT_KEYPRESS_BATCH_SIZE
+        )
+        congestion_control = entry.options.get(
+            CONF_CONGESTION_CONTROL, DEFAULT_CONGESTION_CONTROL
+        )
 
         self.hass = hass
 
@@ -71,19 +146,34 @@ class EnvisalinkController:
             port,
             user,
             password,
-            0,  # Disable zone timer dumps
+            zone_dump_interval,
             keep_alive,
             connection_timeout,
             create_zone_bypass_switches,
             httpHost=hostAndPort[0],
             httpPort=hostAndPort[1],
+            bufferedTransport=buffered_transport,
+            wireTraceSampleRate=wire_trace_sample_rate,
+            wireTraceMaxPerSecond=wire_trace_max_per_second,
+            pipelineWindow=pipeline_window,
+            keypressBatchSize=keypress_batch_size,
+            congestionControl=congestion_control,
+            snapshotPath=snapshot_path(hass, entry.entry_id),
+            journalPath=journal_path(hass, entry.entry_id) if event_journal else None,
+            maxZones=max_zones,
         )
 
-        self._listeners: dict[str, dict] = {
-            STATE_CHANGE_PARTITION: {},
-            STATE_CHANGE_ZONE: {},
-            STATE_CHANGE_ZONE_BYPASS: {},
-        }
+        self._listeners = ListenerRegistry()
+        self._state_writes = StateWriteCoalescer(
+            hass.loop, state_write_window, zone_min_update_interval
+        )
+        # Zones which were in alarm when last written
+        self._alarm_zones: set[int] = set()
+
+        self._device_info: DeviceInfo | None = None
+        self._device_info_key = None
+
+        self._discovery_store = discovery_store(hass, entry.entry_id)
 
         self.controller.callback_connection_status = self.async_connection_status_callback
         self.controller.callback_login_failure = self.async_login_fail_callback
@@ -106,38 +196,89 @@ class EnvisalinkController:
         )
 
     def add_state_change_listener(
-        self, state_type, state_key, update_callback
+        self, state_type, state_key, update_callback, field=None
     ) -> Callable[[], None]:
-        """Register an entity to have a state update triggered when it's underlying data is changed."""
+        """Register an entity to have a state update triggered when it's underlying data is changed.
+
+        If a field is given, the entity is only updated when that field changes (or when the
+        fields which changed aren't known)."""
+        if state_type not in (
+            STATE_CHANGE_PARTITION,
+            STATE_CHANGE_ZONE,
+            STATE_CHANGE_ZONE_BYPASS,
+        ):
+            raise KeyError(state_type)
+        handle = self._listeners.add(state_type, state_key, update_callback, field)
 
         def remove_listener() -> None:
-            for state_types in self._listeners.values():
-                for key_list in state_types.values():
-                    for idx, listener in enumerate(key_list):
-                        # pylint: disable-next=comparison-with-callable
-                        if listener[0] == remove_listener:
-                            key_list.pop(idx)
-                            break
-
-        state_info = self._listeners[state_type]
-        if state_key not in state_info:
-            state_info[state_key] = []
-        state_info[state_key].append((remove_listener, update_callback))
+            self._listeners.remove(handle)
+            self._state_writes.discard(update_callback)
+
         return remove_listener
 
-    def _process_state_change(self, update_type: str, update_keys: list):
-        state_info = self._listeners[update_type]
-        for key in update_keys:
-            if key in state_info:
-                for listener in state_info[key]:
-                    listener[1]()
+    def _process_state_change(self, update_type: str, update_keys):
+        """Schedule a state write for the entities affected by a change.  The writes are
+        coalesced but alarm and fire transitions are always written immediately."""
+        if update_type == STATE_CHANGE_PARTITION:
+            changed_fields = update_keys if isinstance(update_keys, Mapping) else None
+            for partition in update_keys:
+                fields = changed_fields[partition] if changed_fields is not None else None
+                callbacks = self._listeners.listeners(update_type, partition, fields)
+                if callbacks:
+                    urgent = fields is not None and not _URGENT_PARTITION_FIELDS.isdisjoint(
+                        fields
+                    )
+                    self._state_writes.schedule(callbacks, urgent=urgent)
+        else:
+            zones = self.controller.alarm_state.zones
+            for zone in update_keys:
+                urgent = False
+                if update_type == STATE_CHANGE_ZONE:
+                    # Zones going into or out of alarm skip the debounce
+                    in_alarm = zone in zones and zones.get_flag(zone, ZONE_ALARM)
+                    urgent = in_alarm or zone in self._alarm_zones
+                    if in_alarm:
+                        self._alarm_zones.add(zone)
+                    else:
+                        self._alarm_zones.discard(zone)
+                callbacks = self._listeners.listeners(update_type, zone)
+                if callbacks:
+                    self._state_writes.schedule(callbacks, (update_type, zone), urgent)
 
     def _update_entity_states(self):
         """Trigger a state update for all entities."""
-        for state_info in self._listeners.values():
-            for key_list in state_info.values():
-                for listener in key_list:
-                    listener[1]()
+        self._state_writes.schedule(self._listeners.all_listeners())
+
+    def get_command_metrics(self) -> dict:
+        """Metrics for the commands sent to the EVL along with the entity state writes."""
+        metrics = self.controller.get_command_metrics()
+        if metrics:
+            metrics = {**metrics, "state_writes": self._state_writes.snapshot()}
+        return metrics
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Device information shared by all of the entities.  It is only rebuilt when the
+        details reported by the EVL change."""
+        panel = self.controller
+        key = (
+            panel.envisalink_version,
+            panel.panel_type,
+            panel.firmware_version,
+            panel.host,
+        )
+        if key != self._device_info_key:
+            self._device_info = DeviceInfo(
+                identifiers={(DOMAIN, self.unique_id)},
+                name=self.alarm_name,
+                manufacturer="eyezon",
+                model=f"Envisalink {panel.envisalink_version}: {panel.panel_type}",
+                sw_version=panel.firmware_version,
+                hw_version=panel.envisalink_version,
+                configuration_url=f"http://{panel.host}",
+            )
+            self._device_info_key = key
+        return self._device_info
 
     @property
     def unique_id(self):
@@ -147,52 +288,121 @@ class EnvisalinkController:
     async def start(self) -> bool:
         """Start and connection to the underlying Envisalink alarm panel device."""
         LOGGER.info("Start envisalink")
-        await self.controller.discover()
-
-        if self.controller.mac_address:
-            mac = format_mac(self.controller.mac_address)
-            if mac != self._unique_id:
-                LOGGER.debug(
-                    (
-                        "MAC address (%s) of EVL device (%s) does not match "
-                        "unique ID (%s)"
-                    ),
-                    mac,
-                    self.alarm_name,
-                    self._unique_id,
-                )
-                async_create_issue(
-                    self.hass,
-                    DOMAIN,
-                    f"migrate_unique_id.{self._unique_id}",
-                    data={
-                        "config_entry_id": self._config_entry.entry_id,
-                        "config_entry_title": self._config_entry.title,
-                        "new_unique_id": mac,
-                        "old_unique_id": self._unique_id,
-                    },
-                    is_fixable=True,
-                    severity=IssueSeverity.WARNING,
-                    translation_key="migrate_unique_id",
-                )
-            else:
-                async_delete_issue(
-                    self.hass, DOMAIN, f"migrate_unique_id.{self._unique_id}"
-                )
+
+        # Skip the HTTP discovery (and panel type probe) on startup if the results were
+        # saved last time and check them in the background while logging in instead.
+        cached = await self._discovery_store.async_load()
+        if self.controller.restore_discovery_info(cached):
+            LOGGER.debug("Using saved discovery info for %s: %s", self.alarm_name, cached)
+            self._config_entry.async_create_background_task(
+                self.hass,
+                self._async_revalidate_discovery(cached),
+                f"{DOMAIN} {self.alarm_name} discovery",
+            )
+        else:
+            cached = None
+            await self.controller.discover()
+
+        self._check_unique_id()
 
         result = await self.controller.start()
         if result != self.controller.ConnectionResult.SUCCESS:
+            if cached:
+                # The saved details may be what's wrong so rediscover on the next attempt
+                await self._discovery_store.async_remove()
             raise ConfigEntryNotReady(
                 self._get_exception_message(
                     result, f"{self.controller.host}:{self.controller.port}"
                 )
             )
 
+        if not cached:
+            await self._async_save_discovery(self.controller.discovery_info)
+
+        # Config entries aren't unloaded when HA shuts down so save the alarm state then
+        self._config_entry.async_on_unload(
+            self.hass.bus.async_listen_once(
+                EVENT_HOMEASSISTANT_STOP, self._async_save_snapshot
+            )
+        )
         return True
 
+    async def _async_save_snapshot(self, event: Event):
+        await self.controller.save_snapshot()
+
+    async def _async_revalidate_discovery(self, cached: dict):
+        """Query the EVL for its details and update the saved copy if they have changed."""
+        probe = EnvisalinkAlarmPanel(
+            self.controller.host,
+            self.controller.port,
+            self.controller.user_name,
+            self.controller.password,
+            connectionTimeout=self.controller.connection_timeout,
+            httpHost=self.controller.httpHost,
+            httpPort=self.controller.httpPort,
+        )
+        if await probe.discover() != probe.ConnectionResult.SUCCESS:
+            return
+
+        info = probe.discovery_info
+        if not info["panel_type"]:
+            # The panel type can't always be told from the web interface
+            info["panel_type"] = cached["panel_type"]
+        if info == cached:
+            return
+
+        LOGGER.info("Discovery info for %s has changed: %s", self.alarm_name, info)
+        if info["panel_type"] != cached["panel_type"]:
+            # Restart with the right panel type
+            await self._discovery_store.async_remove()
+            self.hass.config_entries.async_schedule_reload(self._config_entry.entry_id)
+            return
+
+        self.controller.restore_discovery_info(info)
+        self._check_unique_id()
+        await self._async_save_discovery(info)
+
+    async def _async_save_discovery(self, info: dict):
+        if info["panel_type"]:
+            await self._discovery_store.async_save(info)
+
+    def _check_unique_id(self):
+        """Raise a repair issue if the unique ID isn't the MAC address of the EVL."""
+        if not self.controller.mac_address:
+            return
+
+        mac = format_mac(self.controller.mac_address)
+        if mac != self._unique_id:
+            LOGGER.debug(
+                (
+                    "MAC address (%s) of EVL device (%s) does not match "
+                    "unique ID (%s)"
+                ),
+                mac,
+                self.alarm_name,
+                self._unique_id,
+            )
+            async_create_issue(
+                self.hass,
+                DOMAIN,
+                f"migrate_unique_id.{self._unique_id}",
+                data={
+                    "config_entry_id": self._config_entry.entry_id,
+                    "config_entry_title": self._config_entry.title,
+                    "new_unique_id": mac,
+                    "old_unique_id": self._unique_id,
+                },
+                is_fixable=True,
+                severity=IssueSeverity.WARNING,
+                translation_key="migrate_unique_id",
+            )
+        else:
+            async_delete_issue(self.hass, DOMAIN, f"migrate_unique_id.{self._unique_id}")
+
     async def stop(self):
         """Stop the underlying Envisalink alarm panel."""
 
+        self._state_writes.cancel()
         if self.controller:
             await self.controller.stop()
 
@@ -254,7 +464,7 @@ class EnvisalinkController:
         self._process_state_change(STATE_CHANGE_ZONE, data)
 
     @callback
-    def async_keypad_updated_callback(self, data: list):
+    def async_keypad_updated_callback(self, data: dict):
         """Handle non-alarm based info updates."""
         LOGGER.debug(
             "Envisalink sent '%s' new alarm info. Updating alarms: %r",
@@ -264,7 +474,7 @@ class EnvisalinkController:
         self._process_state_change(STATE_CHANGE_PARTITION, data)
 
     @callback
-    def async_partition_updated_callback(self, data: list):
+    def async_partition_updated_callback(self, data: dict):
         """Handle partition changes thrown by evl (including alarms)."""
         LOGGER.debug(
             "The envisalink '%s' sent a partition update event: %r",
@@ -0,0 +1,70 @@
+"""Registry of the entities listening for state changes from the Envisalink."""
+from collections.abc import Callable, Iterable
+from itertools import count
+
+
+class ListenerRegistry:
+    """Listeners for state changes, indexed by (state type, key) and optionally by the
+    status field they care about.
+
+    Every listener is identified by a handle so removing one is O(1) and a flat index of
+    all listeners is kept for broadcasting to every entity."""
+
+    def __init__(self) -> None:
+        self._handles = count(1)
+        # handle -> callback, for broadcasts
+        self._all: dict[int, Callable[[], None]] = {}
+        # state type -> key -> field -> handle -> callback.  A field of None means the
+        # listener wants to hear about a change to any field.
+        self._by_type: dict[str, dict] = {}
+        # handle -> (state type, key, field), for removal
+        self._locations: dict[int, tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self._all)
+
+    def add(self, state_type, key, callback: Callable[[], None], field=None) -> int:
+        """Register a listener and return its handle."""
+        handle = next(self._handles)
+        byKey = self._by_type.setdefault(state_type, {})
+        byKey.setdefault(key, {}).setdefault(field, {})[handle] = callback
+        self._all[handle] = callback
+        self._locations[handle] = (state_type, key, field)
+        return handle
+
+    def remove(self, handle: int) -> None:
+        """Remove a listener.  Removing a listener more than once is harmless."""
+        location = self._locations.pop(handle, None)
+        if location is None:
+            return
+        state_type, key, field = location
+        del self._all[handle]
+        byKey = self._by_type[state_type]
+        byField = byKey[key]
+        listeners = byField[field]
+        del listeners[handle]
+        if not listeners:
+            del byField[field]
+            if not byField:
+                del byKey[key]
+
+    def listeners(self, state_type, key, fields: Iterable | None = None) -> list:
+        """The listeners for a key.  If the fields which changed are given, listeners
+        registered for other fields are left out."""
+        byField = self._by_type.get(state_type, {}).get(key)
+        if byField is None:
+            return []
+        if len(byField) == 1 and (fields is None or None in byField):
+            # Common case: everyone listening to this key wants every change
+            (listeners,) = byField.values()
+            return list(listeners.values())
+        if fields is None:
+            return [cb for listeners in byField.values() for cb in listeners.values()]
+        callbacks = list(byField.get(None, {}).values())
+        for field in fields:
+            if listeners := byField.get(field):
+                callbacks.extend(listeners.values())
+        return callbacks
+
+    def all_listeners(self) -> list:
+        return list(self._all.values())
@@ -1,19 +1,23 @@
 """Models for Envisalink."""
 from homeassistant.helpers.entity import DeviceInfo, Entity
 
-from .const import DOMAIN, LOGGER
+from .const import LOGGER
 
 
 class EnvisalinkDevice(Entity):
     """Representation of an Envisalink device."""
 
-    def __init__(self, name, controller, state_update_type, state_update_key):
-        """Initialize the device."""
+    def __init__(
+        self, name, controller, state_update_type, state_update_key, state_update_field=None
+    ):
+        """Initialize the device.  If state_update_field is given, the entity is only
+        updated when that field of its underlying status changes."""
         self._controller = controller
         self._attr_should_poll = False
         self._attr_name = name
         self._state_update_type = state_update_type
         self._state_update_key = state_update_key
+        self._state_update_field = state_update_field
 
     async def async_added_to_hass(self) -> None:
         """Register this entity to receive state change updates from the underlying device."""
@@ -25,25 +29,17 @@ class EnvisalinkDevice(Entity):
         if self._state_update_type and self._state_update_key:
             self.async_on_remove(
                 self._controller.add_state_change_listener(
-                    self._state_update_type, self._state_update_key, state_updated
+                    self._state_update_type,
+                    self._state_update_key,
+                    state_updated,
+                    self._state_update_field,
                 )
             )
 
     @property
     def device_info(self) -> DeviceInfo:
         """Return device information about this EVL device."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._controller.unique_id)},
-            name=self._controller.alarm_name,
-            manufacturer="eyezon",
-            model=(
-                f"Envisalink {self._controller.controller.envisalink_version}: "
-                f"{self._controller.controller.panel_type}"
-            ),
-            sw_version=self._controller.controller.firmware_version,
-            hw_version=self._controller.controller.envisalink_version,
-            configuration_url=f"http://{self._controller.controller.host}",
-        )
+        return self._controller.device_info
 
     @property
     def available(self) -> bool:
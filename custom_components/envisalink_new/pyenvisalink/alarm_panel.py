@@ -1,8 +1,12 @@
 import asyncio
 import logging
+import os
 import re
+import time
+from contextlib import nullcontext
 from enum import Enum
 from functools import partial
+from pathlib import Path
 
 import aiohttp
 
@@ -17,6 +21,8 @@ from .const import (
 )
 from .dsc_client import DSCClient
 from .honeywell_client import HoneywellClient
+from .journal import EventJournal
+from .snapshot import decode_snapshot, encode_snapshot
 from .uno_client import UnoClient
 
 _LOGGER = logging.getLogger(__name__)
@@ -24,6 +30,14 @@ _LOGGER = logging.getLogger(__name__)
 COMMAND_ERR = "Cannot run this command while disconnected. Please run start() first."
 
 
+def _write_file_atomic(path, data):
+    """Write the file so that a crash part way through never leaves a partial file."""
+    tmpPath = f"{path}.tmp"
+    with open(tmpPath, "wb") as f:
+        f.write(data)
+    os.replace(tmpPath, path)
+
+
 class EnvisalinkAlarmPanel:
     """This class represents an envisalink-based alarm panel."""
 
@@ -49,6 +63,17 @@ class EnvisalinkAlarmPanel:
         commandTimeout=5.0,
         httpPort=8080,
         httpHost=None,
+        bufferedTransport=False,
+        wireTraceSampleRate=1,
+        wireTraceMaxPerSecond=0,
+        pipelineWindow=1,
+        keypressBatchSize=1,
+        congestionControl=False,
+        snapshotPath=None,
+        snapshotInterval=300,
+        journalPath=None,
+        journalSize=4096,
+        maxZones=None,
     ):
         self._macAddress = None
         self._firmwareVersion = None
@@ -64,10 +89,23 @@ class EnvisalinkAlarmPanel:
         self._keepAliveInterval = keepAliveInterval
         self._zoneTimerInterval = zoneTimerInterval
         self._maxPartitions = EnvisalinkAlarmPanel.get_max_partitions()
+        self._maxZones = maxZones
         self._alarmState = None
         self._client = None
         self._zoneBypassEnabled = zoneBypassEnabled
         self._commandTimeout = commandTimeout
+        self._bufferedTransport = bufferedTransport
+        self._wireTraceSampleRate = wireTraceSampleRate
+        self._wireTraceMaxPerSecond = wireTraceMaxPerSecond
+        self._pipelineWindow = pipelineWindow
+        self._keypressBatchSize = keypressBatchSize
+        self._congestionControl = congestionControl
+        self._snapshotPath = snapshotPath
+        self._snapshotInterval = snapshotInterval
+        self._snapshotTask = None
+        self._journalPath = journalPath
+        self._journalSize = journalSize
+        self._journal = None
 
         self._connectionStatusCallback = self._defaultCallback
         self._loginSuccessCallback = partial(self._defaultCallback, None)
@@ -103,6 +141,40 @@ class EnvisalinkAlarmPanel:
     def command_timeout(self):
         return self._commandTimeout
 
+    @property
+    def buffered_transport(self):
+        return self._bufferedTransport
+
+    @property
+    def wire_trace_sample_rate(self):
+        return self._wireTraceSampleRate
+
+    @property
+    def wire_trace_max_per_second(self):
+        return self._wireTraceMaxPerSecond
+
+    @property
+    def pipeline_window(self):
+        return self._pipelineWindow
+
+    @property
+    def keypress_batch_size(self):
+        return self._keypressBatchSize
+
+    @property
+    def congestion_control(self):
+        return self._congestionControl
+
+    @property
+    def snapshot_path(self):
+        return self._snapshotPath
+
+    @property
+    def journal(self) -> EventJournal | None:
+        """Journal of the zone, partition, CID and command events, kept in the file at
+        journalPath.  None if no journal path was given."""
+        return self._journal
+
     @property
     def user_name(self):
         return self._username
@@ -151,6 +223,14 @@ class EnvisalinkAlarmPanel:
     def max_zones(self):
         return EnvisalinkAlarmPanel.get_max_zones_by_version(self._evlVersion)
 
+    @property
+    def zone_count(self):
+        """Number of zones tracked: the zones the EVL supports, limited to the highest
+        zone in use if that is known."""
+        if self._maxZones:
+            return min(self._maxZones, self.max_zones)
+        return self.max_zones
+
     def get_max_zones_by_version(version) -> int:
         if version in ("3", 3):
             return EVL3_MAX_ZONES
@@ -245,9 +325,11 @@ class EnvisalinkAlarmPanel:
             if result != self.ConnectionResult.SUCCESS:
                 return result
 
-        self._alarmState = AlarmState.get_initial_alarm_state(
-            max(EVL3_MAX_ZONES, EVL4_MAX_ZONES), MAX_PARTITIONS
-        )
+        self._alarmState = AlarmState.get_initial_alarm_state(self.zone_count, MAX_PARTITIONS)
+        if self._snapshotPath:
+            await self.load_snapshot()
+        if self._journalPath and self._journalSize > 0 and self._journal is None:
+            await self.open_journal()
 
         """Connect to the envisalink, and listen for events to occur."""
         logging.info(
@@ -279,16 +361,78 @@ class EnvisalinkAlarmPanel:
 
         if result != self.ConnectionResult.SUCCESS:
             await self.stop()
+        elif self._snapshotPath and self._snapshotInterval > 0:
+            self._snapshotTask = asyncio.create_task(
+                self.periodic_snapshot(), name="periodic_snapshot"
+            )
         return result
 
     async def stop(self):
         """Shut down and close our connection to the envisalink."""
+        if self._snapshotTask:
+            self._snapshotTask.cancel()
+            self._snapshotTask = None
+        await self.save_snapshot()
+
+        if self._journal is not None:
+            journal, self._journal = self._journal, None
+            await asyncio.get_running_loop().run_in_executor(None, journal.close)
+
         if self._client:
             _LOGGER.info("Disconnecting from the envisalink...")
             await self._client.stop()
         else:
             _LOGGER.error(COMMAND_ERR)
 
+    async def load_snapshot(self) -> bool:
+        """Restore the alarm state saved by save_snapshot().  The restored state is
+        marked as stale until the panel reports it again."""
+        try:
+            data = await asyncio.get_running_loop().run_in_executor(
+                None, Path(self._snapshotPath).read_bytes
+            )
+        except FileNotFoundError:
+            return False
+        except OSError as ex:
+            _LOGGER.warning("Unable to read alarm state snapshot: %r", ex)
+            return False
+
+        savedAt = decode_snapshot(self._alarmState, data)
+        if savedAt is None:
+            _LOGGER.warning("Ignoring unusable alarm state snapshot '%s'", self._snapshotPath)
+            return False
+        _LOGGER.info("Restored alarm state saved %.0f seconds ago", time.time() - savedAt)
+        return True
+
+    async def save_snapshot(self):
+        """Save the current alarm state so it can be restored on the next start."""
+        if not self._snapshotPath or not self._alarmState:
+            return
+        data = encode_snapshot(self._alarmState, time.time())
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, _write_file_atomic, self._snapshotPath, data
+            )
+        except OSError as ex:
+            _LOGGER.warning("Unable to save alarm state snapshot: %r", ex)
+
+    async def open_journal(self):
+        """Map the event journal, falling back to keeping it in memory if the journal
+        file can't be used."""
+        loop = asyncio.get_running_loop()
+        try:
+            self._journal = await loop.run_in_executor(
+                None, EventJournal.open, self._journalPath, self._journalSize
+            )
+        except (OSError, ValueError) as ex:
+            _LOGGER.warning("Unable to open event journal '%s': %r", self._journalPath, ex)
+            self._journal = EventJournal.open(None, self._journalSize)
+
+    async def periodic_snapshot(self):
+        while True:
+            await asyncio.sleep(self._snapshotInterval)
+            await self.save_snapshot()
+
     async def dump_zone_timers(self):
         """Request a zone timer dump from the envisalink."""
         if self._client:
@@ -382,15 +526,18 @@ class EnvisalinkAlarmPanel:
         else:
             _LOGGER.error(COMMAND_ERR)
 
-    async def discover_device_details(self) -> bool:
+    def _http_session(self) -> aiohttp.ClientSession:
+        return aiohttp.ClientSession(
+            auth=aiohttp.BasicAuth(self._username, self._password),
+            timeout=aiohttp.ClientTimeout(total=self.connection_timeout),
+        )
+
+    async def discover_device_details(self, session=None) -> bool:
         self._evlVersion = 0
         self._panelType = None
 
         try:
-            async with aiohttp.ClientSession(
-                auth=aiohttp.BasicAuth(self._username, self._password),
-                timeout=aiohttp.ClientTimeout(total=self.connection_timeout),
-            ) as client:
+            async with nullcontext(session) if session else self._http_session() as client:
                 url = f"http://{self._httpHost}:{self._httpPort}/2"
                 resp = await client.get(url)
                 if resp.status != 200:
@@ -445,58 +592,89 @@ class EnvisalinkAlarmPanel:
         self._firmwareVersion = None
 
         try:
-            async with aiohttp.ClientSession(
-                auth=aiohttp.BasicAuth(self._username, self._password),
-                timeout=aiohttp.ClientTimeout(total=self.connection_timeout),
-            ) as client:
-                url = f"http://{self._httpHost}:{self._httpPort}/3"
-                resp = await client.get(url)
-                if resp.status == 401:
-                    _LOGGER.error("Unable to validate connection: invalid authorization.")
-                    return self.ConnectionResult.INVALID_AUTHORIZATION
-                elif resp.status == 404:
-                    # Connection was successful but unable to extract FW and MAC info
-                    _LOGGER.warn(
-                        (
-                            "Connection successful but unable to fetch FW/MAC: "
-                            "404 (page not found): '%s'"
-                        ),
-                        url,
-                    )
-                elif resp.status != 200:
-                    # Connection was successful but unable to extract FW and MAC info
-                    _LOGGER.warn(
-                        "Connection successful but unable to fetch FW/MAC: '%s'",
-                        resp.status,
-                    )
-                else:
-                    # Attempt to extract the firmware version and MAC address from the returned HTML
-                    html = await resp.text()
-                    fw_regex = "Firmware Version: ([^ ]*)"
-                    mac_regex = "MAC: ([0-9a-fA-F]*)"
-
-                    m = re.search(fw_regex, html)
-                    if m is None or m.lastindex != 1:
-                        _LOGGER.warn("# Unable to extract Firmware version")
-                    else:
-                        self._firmwareVersion = m.group(1)
-
-                    m = re.search(mac_regex, html)
-                    if m is None or m.lastindex != 1:
-                        _LOGGER.warn("# Unable to extract MAC address")
-                    else:
-                        self._macAddress = m.group(1).lower()
+            async with self._http_session() as client:
+                # The two pages are independent so fetch them together over one session
+                result, _ = await asyncio.gather(
+                    self._discover_firmware(client), self.discover_device_details(client)
+                )
         except Exception as ex:
             _LOGGER.error("Unable to validate connection: %r", ex)
             return self.ConnectionResult.CONNECTION_FAILED
 
-        await self.discover_device_details()
+        if result != self.ConnectionResult.SUCCESS:
+            return result
 
         _LOGGER.info(
             f"Firmware Version: '{self._firmwareVersion}' / MAC address: '{self._macAddress}'"
         )
         return self.ConnectionResult.SUCCESS
 
+    async def _discover_firmware(self, client) -> ConnectionResult:
+        url = f"http://{self._httpHost}:{self._httpPort}/3"
+        resp = await client.get(url)
+        if resp.status == 401:
+            _LOGGER.error("Unable to validate connection: invalid authorization.")
+            return self.ConnectionResult.INVALID_AUTHORIZATION
+        elif resp.status == 404:
+            # Connection was successful but unable to extract FW and MAC info
+            _LOGGER.warn(
+                (
+                    "Connection successful but unable to fetch FW/MAC: "
+                    "404 (page not found): '%s'"
+                ),
+                url,
+            )
+        elif resp.status != 200:
+            # Connection was successful but unable to extract FW and MAC info
+            _LOGGER.warn(
+                "Connection successful but unable to fetch FW/MAC: '%s'",
+                resp.status,
+            )
+        else:
+            # Attempt to extract the firmware version and MAC address from the returned HTML
+            html = await resp.text()
+            fw_regex = "Firmware Version: ([^ ]*)"
+            mac_regex = "MAC: ([0-9a-fA-F]*)"
+
+            m = re.search(fw_regex, html)
+            if m is None or m.lastindex != 1:
+                _LOGGER.warn("# Unable to extract Firmware version")
+            else:
+                self._firmwareVersion = m.group(1)
+
+            m = re.search(mac_regex, html)
+            if m is None or m.lastindex != 1:
+                _LOGGER.warn("# Unable to extract MAC address")
+            else:
+                self._macAddress = m.group(1).lower()
+        return self.ConnectionResult.SUCCESS
+
+    @property
+    def discovery_info(self) -> dict:
+        """The details learned by discover() in a form which can be saved and later
+        handed to restore_discovery_info()."""
+        return {
+            "mac_address": self._macAddress,
+            "firmware_version": self._firmwareVersion,
+            "evl_version": self._evlVersion,
+            "panel_type": self._panelType,
+        }
+
+    def restore_discovery_info(self, info) -> bool:
+        """Use previously saved discovery details instead of querying the EVL.  Returns
+        False (leaving everything untouched) if the details are unusable."""
+        if not info or info.get("panel_type") not in (
+            PANEL_TYPE_DSC,
+            PANEL_TYPE_HONEYWELL,
+            PANEL_TYPE_UNO,
+        ):
+            return False
+        self._macAddress = info.get("mac_address")
+        self._firmwareVersion = info.get("firmware_version")
+        self._evlVersion = info.get("evl_version")
+        self._panelType = info["panel_type"]
+        return True
+
     async def discover_panel_type(self) -> ConnectionResult:
         _LOGGER.info("Checking panel type for %s", self.host)
         self._panelType = None
@@ -545,6 +723,13 @@ class EnvisalinkAlarmPanel:
             return False
         return self._client.is_online()
 
+    def get_command_metrics(self) -> dict:
+        """Snapshot of the latency, retry and failure metrics for the commands issued
+        to the EVL.  Returns an empty dict if the panel hasn't been started."""
+        if not self._client:
+            return {}
+        return self._client.get_metrics()
+
     def handle_connection_status(self, status):
         if not status and not self._syncConnect.done():
             self._syncConnect.set_result(self.ConnectionResult.CONNECTION_FAILED)
@@ -1,52 +1,431 @@
-class AlarmState:
-    """Helper class for alarm state functionality."""
+from array import array
+from collections.abc import Mapping, MutableMapping
+from itertools import chain
+
+# Flags tracked for every zone.  Each flag is stored as a bit vector (bit n = zone n).
+ZONE_OPEN = 0
+ZONE_FAULT = 1
+ZONE_ALARM = 2
+ZONE_TAMPER = 3
+ZONE_LOW_BATTERY = 4
+ZONE_BYPASSED = 5
+
+# Zone 'status' keys and the flag each one maps to
+ZONE_STATUS_FLAGS = {
+    "open": ZONE_OPEN,
+    "fault": ZONE_FAULT,
+    "alarm": ZONE_ALARM,
+    "tamper": ZONE_TAMPER,
+    "low_battery": ZONE_LOW_BATTERY,
+}
+
+_ZONE_KEYS = ("status", "last_fault", "bypassed", "updated")
+
+
+def decode_zone_bitmap(data) -> tuple:
+    """Decode a hex zone bitmap sent by the EVL (first byte = zones 1-8, least significant
+    bit first) into (bits, mask) in ZoneStore layout, where bit n is zone n and mask
+    covers the zones present in the payload."""
+    raw = bytes.fromhex(data)
+    return int.from_bytes(raw, "little") << 1, ((1 << (8 * len(raw))) - 1) << 1
+
+
+def bit_positions(bits) -> list:
+    """The positions of the set bits in bits, lowest first."""
+    positions = []
+    while bits:
+        low = bits & -bits
+        positions.append(low.bit_length() - 1)
+        bits ^= low
+    return positions
+
+
+class _DictRepr:
+    """Show the views below the same way the dicts they replace were shown."""
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class ZoneStore:
+    """Packed state for all of the zones.  Zone flags are kept as one bit vector per flag
+    and the timestamps in arrays, all indexed by zone number (starting at 1).
+
+    versions[n] is bumped whenever a flag of zone n changes so consumers can cache
+    anything derived from the flags.  Zones restored from a snapshot are marked stale
+    until the panel next reports whether they are open or faulted; that report counts as
+    a change to the zone even if its flags stay the same."""
+
+    __slots__ = ("count", "_bits", "last_fault", "updated", "versions", "stale", "_views")
+
+    def __init__(self, count):
+        self.count = count
+        self._bits = [0] * (ZONE_BYPASSED + 1)
+        self.last_fault = array("d", bytes(8 * (count + 1)))
+        self.updated = array("d", bytes(8 * (count + 1)))
+        self.versions = array("L", bytes(array("L").itemsize * (count + 1)))
+        # Bit vector of the zones whose state hasn't been confirmed by the panel
+        self.stale = 0
+        self._views = [None] * (count + 1)
+
+    def __contains__(self, zone) -> bool:
+        return 1 <= zone <= self.count
+
+    def get_flag(self, zone, flag) -> bool:
+        return bool(self._bits[flag] >> zone & 1)
+
+    def flags(self, zone) -> int:
+        """All of the flags of a zone packed into an int; bit n is flag n."""
+        flags = 0
+        for flag, bits in enumerate(self._bits):
+            flags |= (bits >> zone & 1) << flag
+        return flags
+
+    def is_stale(self, zone) -> bool:
+        return bool(self.stale >> zone & 1)
+
+    def mark_stale(self):
+        """Mark every zone as not yet confirmed by the panel."""
+        self.stale = (1 << (self.count + 1)) - 2
+
+    def set_flag(self, zone, flag, value) -> bool:
+        """Set a flag for a zone; returns True if the flag changed or the zone was
+        stale."""
+        bits = self._bits[flag]
+        mask = 1 << zone
+        confirmed = False
+        if flag <= ZONE_FAULT and self.stale & mask:
+            self.stale &= ~mask
+            confirmed = True
+        newBits = bits | mask if value else bits & ~mask
+        if newBits == bits:
+            if confirmed:
+                self.versions[zone] += 1
+            return confirmed
+        self._bits[flag] = newBits
+        self.versions[zone] += 1
+        return True
+
+    def bitmap(self, flag) -> int:
+        """The bit vector for a flag; bit n is set if the flag is set for zone n."""
+        return self._bits[flag]
+
+    def set_bitmap(self, flag, bits):
+        self.update_bitmap(flag, bits)
+
+    def update_bitmap(self, flag, bits, mask=-1) -> list:
+        """Replace the bits of a flag selected by mask; returns the zones whose flag
+        changed or which were stale.  Only the bits which differ from the current state
+        are visited."""
+        mask &= (1 << (self.count + 1)) - 2
+        confirmed = 0
+        if flag <= ZONE_FAULT and self.stale:
+            confirmed = self.stale & mask
+            self.stale &= ~mask
+        current = self._bits[flag]
+        diff = (current ^ bits) & mask
+        if not diff and not confirmed:
+            return []
+        self._bits[flag] = current ^ diff
+        changed = bit_positions(diff | confirmed)
+        versions = self.versions
+        for zone in changed:
+            versions[zone] += 1
+        return changed
+
+    def view(self, zone) -> "ZoneView":
+        view = self._views[zone]
+        if view is None:
+            view = self._views[zone] = ZoneView(self, zone)
+        return view
+
+
+class ZoneStatusView(_DictRepr, MutableMapping):
+    """Dict-like view of a zone's status flags."""
+
+    __slots__ = ("_store", "_zone")
+
+    def __init__(self, store, zone):
+        self._store = store
+        self._zone = zone
+
+    def __getitem__(self, key):
+        return self._store.get_flag(self._zone, ZONE_STATUS_FLAGS[key])
+
+    def __setitem__(self, key, value):
+        self._store.set_flag(self._zone, ZONE_STATUS_FLAGS[key], value)
+
+    def __delitem__(self, key):
+        raise TypeError("Zone status flags cannot be removed")
+
+    def __iter__(self):
+        return iter(ZONE_STATUS_FLAGS)
+
+    def __len__(self):
+        return len(ZONE_STATUS_FLAGS)
+
+    def update(self, other=(), **kwargs) -> list:
+        """Update the flags; returns the keys whose value actually changed (or which
+        confirmed a stale zone)."""
+        changed = []
+        items = other.items() if isinstance(other, Mapping) else other
+        for key, value in chain(items, kwargs.items()):
+            if self._store.set_flag(self._zone, ZONE_STATUS_FLAGS[key], value):
+                changed.append(key)
+        return changed
+
+
+class ZoneView(_DictRepr, MutableMapping):
+    """Dict-like view of a single zone in the zone store, matching the layout of the
+    original nested dicts: {"status": {...}, "last_fault", "bypassed", "updated"}."""
+
+    __slots__ = ("_store", "_zone", "_status")
+
+    def __init__(self, store, zone):
+        self._store = store
+        self._zone = zone
+        self._status = ZoneStatusView(store, zone)
+
+    def __getitem__(self, key):
+        if key == "status":
+            return self._status
+        if key == "last_fault":
+            return self._store.last_fault[self._zone]
+        if key == "bypassed":
+            return self._store.get_flag(self._zone, ZONE_BYPASSED)
+        if key == "updated":
+            return self._store.updated[self._zone]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == "last_fault":
+            self._store.last_fault[self._zone] = value
+        elif key == "bypassed":
+            self._store.set_flag(self._zone, ZONE_BYPASSED, value)
+        elif key == "updated":
+            self._store.updated[self._zone] = value
+        else:
+            raise KeyError(key)
+
+    def __delitem__(self, key):
+        raise TypeError("Zone attributes cannot be removed")
+
+    def __iter__(self):
+        return iter(_ZONE_KEYS)
+
+    def __len__(self):
+        return len(_ZONE_KEYS)
+
+
+class ZoneMapping(_DictRepr, Mapping):
+    """Read-only mapping from zone number to a ZoneView."""
+
+    __slots__ = ("store",)
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, zone):
+        store = self.store
+        if not (isinstance(zone, int) and 1 <= zone <= store.count):
+            raise KeyError(zone)
+        return store._views[zone] or store.view(zone)
+
+    def __iter__(self):
+        return iter(range(1, self.store.count + 1))
+
+    def __len__(self):
+        return self.store.count
+
+    def __contains__(self, zone):
+        return zone in self.store
+
+
+# The well known partition status keys
+_PARTITION_KEYS = (
+    "partition_state",
+    "alpha",
+    "ac_present",
+    "beep",
+    "armed_bypass",
+    "entry_delay",
+    "exit_delay",
+    "last_armed_by_user",
+    "last_disarmed_by_user",
+    "ready",
+    "bat_trouble",
+    "trouble",
+    "fire",
+    "panic",
+    "alarm",
+    "alarm_fire_zone",
+    "alarm_in_memory",
+    "armed_away",
+    "armed_stay",
+    "armed_zero_entry_delay",
+    "armed_night",
+    "bell_trouble",
+    "zone_low_battery",
+)
+
+
+class PartitionStatus(_DictRepr, MutableMapping):
+    """Status of a partition.  The well known keys are held in slots; anything else a
+    panel reports is kept in an overflow dict.  version is bumped on every change and
+    stale is set while the status is restored from a snapshot and not yet confirmed by
+    the panel.  The confirmation isn't panel state so it isn't reported by update();
+    confirmed is set instead until AlarmState.take_confirmed_partitions() collects it."""
+
+    __slots__ = _PARTITION_KEYS + ("_extra", "version", "stale", "confirmed")
+
+    _KEYS = frozenset(_PARTITION_KEYS)
+
+    def __init__(self):
+        self.partition_state = "N/A"
+        self.alpha = "N/A"
+        self.ac_present = True
+        self.beep = False
+        self.armed_bypass = False
+        self.entry_delay = False
+        self.exit_delay = False
+        self.last_armed_by_user = ""
+        self.last_disarmed_by_user = ""
+        self.ready = False
+        self.bat_trouble = False
+        self.trouble = False
+        self.fire = False
+        self.panic = False
+        self.alarm = False
+        self.alarm_fire_zone = False
+        self.alarm_in_memory = False
+        self.armed_away = False
+        self.armed_stay = False
+        self.armed_zero_entry_delay = False
+        self.armed_night = False
+        self.bell_trouble = False
+        self.zone_low_battery = False
+        self._extra = {}
+        self.version = 0
+        self.stale = False
+        self.confirmed = False
+
+    def __getitem__(self, key):
+        if key in self._KEYS:
+            return getattr(self, key)
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        if key in self._KEYS:
+            setattr(self, key, value)
+        else:
+            self._extra[key] = value
+        self.version += 1
+        if self.stale:
+            self.stale = False
+            self.confirmed = True
+
+    def __delitem__(self, key):
+        if key in self._KEYS:
+            raise TypeError("Standard partition status keys cannot be removed")
+        del self._extra[key]
+        self.version += 1
+
+    def __iter__(self):
+        yield from _PARTITION_KEYS
+        yield from self._extra
+
+    def __len__(self):
+        return len(self._KEYS) + len(self._extra)
+
+    def update(self, other=(), **kwargs) -> list:
+        """Update the status; returns the keys whose value actually changed."""
+        changed = []
+        extra = self._extra
+        items = other.items() if isinstance(other, Mapping) else other
+        for key, value in chain(items, kwargs.items()):
+            if key in self._KEYS:
+                if getattr(self, key) != value:
+                    setattr(self, key, value)
+                    changed.append(key)
+            elif key not in extra or extra[key] != value:
+                extra[key] = value
+                changed.append(key)
+        confirmed = self.stale
+        if confirmed:
+            self.stale = False
+            self.confirmed = True
+        if changed or confirmed:
+            self.version += 1
+        return changed
+
+
+class Partition(_DictRepr, Mapping):
+    """A partition entry; {"status": PartitionStatus} in the original layout."""
+
+    __slots__ = ("status",)
+
+    def __init__(self):
+        self.status = PartitionStatus()
+
+    def __getitem__(self, key):
+        if key == "status":
+            return self.status
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield "status"
+
+    def __len__(self):
+        return 1
+
+
+class AlarmState(_DictRepr, Mapping):
+    """Helper class for alarm state functionality.  The state is held in a compact store
+    but can still be accessed as alarm_state["zone"][n]["status"]["open"] and
+    alarm_state["partition"][n]["status"][...] as before."""
+
+    __slots__ = ("zones", "partitions", "_views", "_unconfirmed")
+
+    def __init__(self, maxZones, maxPartitions):
+        self.zones = ZoneStore(maxZones)
+        self.partitions = {i: Partition() for i in range(1, maxPartitions + 1)}
+        self._views = {"partition": self.partitions, "zone": ZoneMapping(self.zones)}
+        self._unconfirmed = False
+
+    def __getitem__(self, key):
+        return self._views[key]
+
+    def __iter__(self):
+        return iter(self._views)
+
+    def __len__(self):
+        return len(self._views)
+
+    def mark_partitions_stale(self):
+        """Mark every partition status as restored and not yet confirmed by the panel."""
+        for partition in self.partitions.values():
+            partition.status.stale = True
+        self._unconfirmed = True
+
+    def take_confirmed_partitions(self) -> set:
+        """The partitions whose stale status the panel has confirmed since the last call."""
+        if not self._unconfirmed:
+            return set()
+        confirmed = set()
+        unconfirmed = False
+        for number, partition in self.partitions.items():
+            status = partition.status
+            if status.confirmed:
+                status.confirmed = False
+                confirmed.add(number)
+            elif status.stale:
+                unconfirmed = True
+        self._unconfirmed = unconfirmed
+        return confirmed
 
     @staticmethod
     def get_initial_alarm_state(maxZones, maxPartitions):
         """Builds the proper alarm state collection."""
-
-        _alarmState = {"partition": {}, "zone": {}}
-
-        for i in range(1, maxPartitions + 1):
-            _alarmState["partition"][i] = {
-                "status": {
-                    "partition_state": "N/A",
-                    "alpha": "N/A",
-                    "ac_present": True,
-                    "beep": False,
-                    "armed_bypass": False,
-                    "entry_delay": False,
-                    "exit_delay": False,
-                    "last_armed_by_user": "",
-                    "last_disarmed_by_user": "",
-                    "ready": False,
-                    "bat_trouble": False,
-                    "trouble": False,
-                    "fire": False,
-                    "panic": False,
-                    "alarm": False,
-                    "alarm_fire_zone": False,
-                    "alarm_in_memory": False,
-                    "armed_away": False,
-                    "armed_stay": False,
-                    "armed_zero_entry_delay": False,
-                    "armed_night": False,
-                    "bell_trouble": False,
-                    "zone_low_battery": False,
-                }
-            }
-        for j in range(1, maxZones + 1):
-            _alarmState["zone"][j] = {
-                "status": {
-                    "open": False,
-                    "fault": False,
-                    "alarm": False,
-                    "tamper": False,
-                    "low_battery": False,
-                },
-                "last_fault": 0,
-                "bypassed": False,
-                "updated": 0.0,
-            }
-
-        return _alarmState
+        return AlarmState(maxZones, maxPartitions)
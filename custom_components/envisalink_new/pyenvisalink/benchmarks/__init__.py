@@ -0,0 +1,6 @@
+"""Benchmarks for the hot paths of the library.  Run them from the integration directory
+so the library imports as a top level package, the same way test_harness.py does:
+
+    cd custom_components/envisalink_new
+    python -m pyenvisalink.benchmarks.replay
+"""
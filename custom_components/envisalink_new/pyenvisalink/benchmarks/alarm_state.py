@@ -0,0 +1,89 @@
+"""Memory used by the alarm state and the cost of looking up and updating zones, compared
+with the nested dicts the alarm state used to be kept in."""
+import argparse
+import timeit
+import tracemalloc
+
+from ..alarm_state import ZONE_BYPASSED, ZONE_OPEN, AlarmState, PartitionStatus
+from ..const import EVL3_MAX_ZONES, EVL4_MAX_ZONES, MAX_PARTITIONS
+
+ZONE_STATUS = dict.fromkeys(("open", "fault", "alarm", "tamper", "low_battery"), False)
+
+
+def nested_alarm_state(maxZones, maxPartitions) -> dict:
+    """The alarm state in its original layout of nested dicts."""
+    partitions = {
+        i: {"status": dict(PartitionStatus())} for i in range(1, maxPartitions + 1)
+    }
+    zones = {
+        i: {"status": dict(ZONE_STATUS), "last_fault": 0, "bypassed": False, "updated": 0.0}
+        for i in range(1, maxZones + 1)
+    }
+    return {"partition": partitions, "zone": zones}
+
+
+def allocated(build) -> int:
+    """Bytes allocated by build() which are still in use after it returns.  The zone
+    views of the alarm state are created on first use so aren't included."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    state = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del state
+    return size
+
+
+def per_call(statement, number, **names) -> float:
+    """Microseconds per call of statement."""
+    best = min(timeit.repeat(statement, globals=names, number=number, repeat=5))
+    return best / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=100000)
+    args = parser.parse_args()
+    n = args.number
+
+    for zones in (EVL3_MAX_ZONES, EVL4_MAX_ZONES):
+        compact = allocated(lambda: AlarmState(zones, MAX_PARTITIONS))
+        nested = allocated(lambda: nested_alarm_state(zones, MAX_PARTITIONS))
+        print(f"{zones:3} zones: {compact:7} bytes  (nested dicts {nested:7} bytes)")
+
+    state = AlarmState.get_initial_alarm_state(EVL4_MAX_ZONES, MAX_PARTITIONS)
+    store = state.zones
+    nested = nested_alarm_state(EVL4_MAX_ZONES, MAX_PARTITIONS)
+    for view in range(1, EVL4_MAX_ZONES + 1):
+        store.view(view)
+    names = {"state": state, "store": store, "nested": nested, "OPEN": ZONE_OPEN}
+    timings = (
+        ("zone flag", "store.get_flag(77, OPEN)", "nested['zone'][77]['status']['open']"),
+        ("zone view", "state['zone'][77]['status']['open']", None),
+        (
+            "zone write",
+            "store.set_flag(77, OPEN, True); store.set_flag(77, OPEN, False)",
+            "nested['zone'][77]['status']['open'] = True; "
+            "nested['zone'][77]['status']['open'] = False",
+        ),
+        (
+            "bypassed zones",
+            "store.bitmap(BYPASSED)",
+            "[z for z, info in nested['zone'].items() if info['bypassed']]",
+        ),
+        (
+            "partition field",
+            "state.partitions[1].status['ready']",
+            "nested['partition'][1]['status']['ready']",
+        ),
+    )
+    names["BYPASSED"] = ZONE_BYPASSED
+    for label, statement, original in timings:
+        line = f"{label:16} {per_call(statement, n, **names):7.3f} us"
+        if original:
+            line += f"  (nested dicts {per_call(original, n, **names):7.3f} us)"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Hundreds of concurrent callers queueing commands, first against the scheduler alone
+(commands are acked on the next loop iteration) and then through a fake EVL."""
+import argparse
+import asyncio
+import time
+
+from ..const import PANEL_TYPE_HONEYWELL
+from ..fake_evl import FakeEvl, build_panel
+from ..honeywell_client import HoneywellClient
+
+
+async def run_callers(client, callers, keys) -> tuple:
+    """Returns the number of callers whose commands succeeded, the wall time and the CPU
+    time spent per command."""
+
+    async def caller(n):
+        if keys == 1:
+            return await client.queue_command("00", "")
+        return await client.queue_commands(
+            [{"cmd": "03", "data": "1,%d" % k} for k in range(keys)]
+        )
+
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    results = await asyncio.gather(*[caller(n) for n in range(callers)])
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    return sum(results), wall, cpu / (callers * keys)
+
+
+async def scheduler_only(callers, keys) -> tuple:
+    loop = asyncio.get_running_loop()
+    client = HoneywellClient(build_panel(PANEL_TYPE_HONEYWELL))
+    client._loggedin = True
+
+    async def send_command(cmd, data, logData=None):
+        loop.call_soon(client.command_succeeded, cmd)
+
+    client.send_command = send_command
+    task = loop.create_task(client.process_command_queue())
+    result = await run_callers(client, callers, keys)
+    client._shutdown = True
+    client._commandEvent.set()
+    await task
+    return result
+
+
+async def fake_evl(callers, keys) -> tuple:
+    evl = FakeEvl(PANEL_TYPE_HONEYWELL)
+    port = await evl.start()
+    panel = build_panel(PANEL_TYPE_HONEYWELL, port)
+    await panel.start()
+    result = await run_callers(panel._client, callers, keys)
+    await panel.stop()
+    await evl.stop()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--callers", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--keys", type=int, default=1, help="commands queued per caller")
+    args = parser.parse_args()
+
+    for name, bench in (("scheduler", scheduler_only), ("fake evl", fake_evl)):
+        for callers in args.callers:
+            ok, wall, cpu = asyncio.run(bench(callers, args.keys))
+            print(
+                f"{name:9} callers={callers:5} ok={ok:5} "
+                f"wall={wall:6.3f}s  {cpu * 1e6:6.1f} us CPU/command"
+            )
+
+
+if __name__ == "__main__":
+    main()
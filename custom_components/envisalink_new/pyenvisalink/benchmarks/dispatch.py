@@ -0,0 +1,107 @@
+"""Cost of parsing and dispatching a frame per response code, with the handlers stubbed
+out, through the dispatch table compared with the original per frame dispatch (building
+a command dict, formatting the handler name and looking it up with getattr)."""
+import argparse
+import asyncio
+import logging
+import timeit
+
+from ..const import PANEL_TYPE_DSC, PANEL_TYPE_HONEYWELL, PANEL_TYPE_UNO
+from ..dsc_client import DSCClient
+from ..fake_evl import build_panel, dsc_frame
+from ..honeywell_client import HoneywellClient
+from ..uno_client import UnoClient
+
+_LOGGER = logging.getLogger(__name__)
+
+FRAMES = {
+    PANEL_TYPE_HONEYWELL: (
+        HoneywellClient,
+        [
+            b"%00,01,1C08,08,00,****DISARMED****  Ready to Arm  $\r\n",
+            b"%01,0000000000000000$\r\n",
+            b"^03,00$\r\n",
+            b"%FF,0000$\r\n",
+        ],
+    ),
+    PANEL_TYPE_UNO: (
+        UnoClient,
+        [b"%04,0000000000000000$\r\n", b"%06,0000000000000000$\r\n"],
+    ),
+    PANEL_TYPE_DSC: (
+        DSCClient,
+        [dsc_frame("609", "001"), dsc_frame("650", "1"), dsc_frame("500", "000")],
+    ),
+}
+
+
+def stub_handlers(client):
+    """Replace the handlers with ones which do nothing and rebuild the dispatch table."""
+    for info in client._evl_ResponseTypes.values():
+        setattr(client, "handle_%s" % info["handler"], lambda code, data: None)
+    client._dispatchTable = client.build_dispatch_table()
+
+
+def original_process_frame(client, buffer, start, end):
+    """Dispatch the way process_frame did before the dispatch table."""
+    parsed = client.parseHandler(buffer, start, end)
+    if parsed is None:
+        return
+    cmd = {"code": parsed[0], "data": parsed[1]}
+    try:
+        info = client._evl_ResponseTypes[cmd["code"]]
+        cmd["handler"] = "handle_%s" % info["handler"]
+        cmd["state_change"] = info.get("state_change", False)
+    except KeyError:
+        pass
+
+    result = None
+    try:
+        _LOGGER.debug(
+            str.format(
+                "calling handler: {0} for code: {1} with data: {2}",
+                cmd["handler"],
+                cmd["code"],
+                cmd["data"],
+            )
+        )
+        result = getattr(client, cmd["handler"])(cmd["code"], cmd["data"])
+    except (AttributeError, TypeError, KeyError):
+        pass
+    if result and cmd["state_change"]:
+        client.handle_state_change_callbacks(result)
+
+
+def per_frame(step, number) -> float:
+    """Microseconds per call of step()."""
+    best = min(timeit.repeat(step, number=number, repeat=5))
+    return best / number * 1e6
+
+
+async def run(number):
+    for panelType, (clientClass, frames) in FRAMES.items():
+        client = clientClass(build_panel(panelType))
+        client._loggedin = True
+        stub_handlers(client)
+        for frame in frames:
+            end = len(frame)
+            table = per_frame(lambda: client.process_frame(frame, 0, end), number)
+            original = per_frame(
+                lambda: original_process_frame(client, frame, 0, end), number
+            )
+            code = client.parseHandler(frame, 0, end)[0]
+            print(
+                f"{panelType:9} {code:4} {table:6.2f} us per frame  "
+                f"(original {original:6.2f} us)"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=100000)
+    args = parser.parse_args()
+    asyncio.run(run(args.number))
+
+
+if __name__ == "__main__":
+    main()
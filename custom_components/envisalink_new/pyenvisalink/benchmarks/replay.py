@@ -0,0 +1,94 @@
+"""Replay a TPI session from a fake EVL through the stream reader and the buffered
+transports and report the CPU time spent per line."""
+import argparse
+import asyncio
+import time
+
+from ..const import PANEL_TYPE_DSC, PANEL_TYPE_HONEYWELL, PANEL_TYPE_UNO
+from ..fake_evl import FakeEvl, build_panel, dsc_frame
+
+SESSIONS = {
+    PANEL_TYPE_HONEYWELL: [
+        b"%00,01,1C08,08,00,****DISARMED****  Ready to Arm  $\r\n",
+        b"%00,01,0008,12,00,FAULT 12 FRONT DOOR              $\r\n",
+        b"%00,01,0008,14,00,FAULT 14 BACK DOOR               $\r\n",
+        b"%02,0100000000000000$\r\n",
+        b"%00,01,0008,12,00,FAULT 12 FRONT DOOR              $\r\n",
+        b"%00,01,1C08,08,00,****DISARMED****  Ready to Arm  $\r\n",
+        b"%01,0000000000000000$\r\n",
+        b"%03,11300100305$\r\n",
+    ],
+    PANEL_TYPE_UNO: [
+        b"%01,0C00000000000000$\r\n",
+        b"%02,0100000000000000$\r\n",
+        b"%04,0200000000000000$\r\n",
+        b"%01,0000000000000000$\r\n",
+        b"%06,0000000000000000$\r\n",
+        b"%04,0000000000000000$\r\n",
+    ],
+    PANEL_TYPE_DSC: [
+        dsc_frame("609", "001"),
+        dsc_frame("610", "001"),
+        dsc_frame("609", "012"),
+        dsc_frame("650", "1"),
+        dsc_frame("610", "012"),
+        dsc_frame("651", "1"),
+        dsc_frame("510", "81"),
+        dsc_frame("849", "02"),
+    ],
+}
+
+
+async def replay(panelType, lines, buffered) -> tuple:
+    """Returns the CPU time and wall time spent per line in seconds."""
+    session = SESSIONS[panelType]
+    evl = FakeEvl(panelType)
+    port = await evl.start()
+    panel = build_panel(panelType, port, bufferedTransport=buffered)
+    await panel.start()
+    await evl.loggedIn.wait()
+
+    done = asyncio.Event()
+    seen = 0
+    processFrame = panel._client.process_frame
+
+    def process_frame(buffer, start, end):
+        nonlocal seen
+        processFrame(buffer, start, end)
+        seen += 1
+        if seen == lines:
+            done.set()
+
+    # Let the acks for the commands sent after login arrive first
+    await asyncio.sleep(0.1)
+    panel._client.process_frame = process_frame
+    stream = b"".join(session[i % len(session)] for i in range(lines))
+
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    evl.send(stream)
+    await asyncio.wait_for(done.wait(), 60)
+    cpu = time.process_time() - cpu
+    wall = time.perf_counter() - wall
+
+    await panel.stop()
+    await evl.stop()
+    return cpu / lines, wall / lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=20000)
+    args = parser.parse_args()
+
+    for panelType in SESSIONS:
+        for buffered in (False, True):
+            cpu, wall = asyncio.run(replay(panelType, args.lines, buffered))
+            print(
+                f"{panelType:9} {'buffered' if buffered else 'stream':8} "
+                f"{cpu * 1e6:6.2f} us CPU/line  {1 / wall:9.0f} lines/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
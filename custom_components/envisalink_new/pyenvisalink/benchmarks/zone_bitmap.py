@@ -0,0 +1,119 @@
+"""Decoding full 128 zone UNO zone state and bypass bitmaps and 64 zone DSC bypass bitmaps,
+compared with decoding them a byte at a time and updating every zone, as the handlers
+used to."""
+import argparse
+import asyncio
+import random
+import timeit
+
+from ..alarm_state import ZONE_BYPASSED, ZONE_FAULT, ZONE_OPEN
+from ..const import PANEL_TYPE_DSC, PANEL_TYPE_UNO
+from ..dsc_client import DSCClient
+from ..fake_evl import build_panel
+from ..uno_client import UnoClient
+
+
+def per_byte_update(zones, data, flags) -> list:
+    """The original decoding: one int() per byte and a flag update per zone."""
+    updates = []
+    zoneNumber = 0
+    for idx in range(0, len(data), 2):
+        byte = int(data[idx : idx + 2], 16)
+        for bit in range(8):
+            zoneNumber += 1
+            if zoneNumber not in zones:
+                return updates
+            isSet = byte & (1 << bit) != 0
+            changed = False
+            for flag in flags:
+                changed |= zones.set_flag(zoneNumber, flag, isSet)
+            if changed:
+                updates.append(zoneNumber)
+    return updates
+
+
+def flip_first_zone(data) -> str:
+    return "%02X" % (int(data[:2], 16) ^ 1) + data[2:]
+
+
+def per_call(step, number) -> float:
+    """Microseconds per message; step() handles two messages."""
+    best = min(timeit.repeat(step, number=number, repeat=5))
+    return best / (2 * number) * 1e6
+
+
+async def run(number):
+    uno = UnoClient(build_panel(PANEL_TYPE_UNO))
+    dsc = DSCClient(build_panel(PANEL_TYPE_DSC, zoneBypassEnabled=True))
+    unoZones = uno._alarmPanel.alarm_state.zones
+    dscZones = dsc._alarmPanel.alarm_state.zones
+
+    rand = random.Random(1)
+    full = "".join("%02X" % rand.getrandbits(8) for _ in range(16))
+    cases = (
+        (
+            "UNO zones, one zone flips",
+            uno.handle_zone_state_change,
+            unoZones,
+            (ZONE_OPEN, ZONE_FAULT),
+            full,
+            flip_first_zone(full),
+        ),
+        (
+            "UNO zones, unchanged",
+            uno.handle_zone_state_change,
+            unoZones,
+            (ZONE_OPEN, ZONE_FAULT),
+            full,
+            full,
+        ),
+        (
+            "UNO zones, all flip",
+            uno.handle_zone_state_change,
+            unoZones,
+            (ZONE_OPEN, ZONE_FAULT),
+            "FF" * 16,
+            "00" * 16,
+        ),
+        (
+            "UNO bypass, one flips",
+            uno.handle_zone_bypass_update,
+            unoZones,
+            (ZONE_BYPASSED,),
+            full,
+            flip_first_zone(full),
+        ),
+        (
+            "DSC bypass, one flips",
+            dsc.handle_zone_bypass_update,
+            dscZones,
+            (ZONE_BYPASSED,),
+            full[:16],
+            flip_first_zone(full[:16]),
+        ),
+    )
+    for label, handler, zones, flags, first, second in cases:
+
+        def decoder():
+            handler("", first)
+            handler("", second)
+
+        def original():
+            per_byte_update(zones, first, flags)
+            per_byte_update(zones, second, flags)
+
+        print(
+            f"{label:26} {per_call(decoder, number):7.2f} us per message  "
+            f"(per byte {per_call(original, number):7.2f} us)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(run(args.number))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Tracking the zones a Honeywell keypad scrolls through with 40 zones faulted at once,
+both in full %00 handling and for the tracker alone, compared with the per zone timers
+the client used to keep."""
+import argparse
+import asyncio
+import timeit
+
+from ..const import PANEL_TYPE_HONEYWELL
+from ..fake_evl import build_panel
+from ..honeywell_client import HoneywellClient
+from ..zone_tracker import ZONE_REPORT_STATE, ZoneFaultTracker
+
+
+def timers_update(timers, zone) -> list:
+    """The original zone timers: every "zone|kind" counter is incremented on each report
+    and the expired ones are found by splitting their keys."""
+    for z in timers:
+        timers[z] += 1
+    timers[f"{zone}|state"] = 1
+    expired = []
+    max_timer = round(len(timers) * 2 + 2, 0)
+    for z in list(timers):
+        if timers[z] > max_timer:
+            timer = str.split(z, "|")
+            expired.append(int(timer[0]))
+            timers.pop(z)
+    return expired
+
+
+def tracker_update(tracker, zone) -> list:
+    tracker.advance()
+    tracker.report(zone, ZONE_REPORT_STATE)
+    return tracker.expire()
+
+
+def per_frame(step, frames, number) -> float:
+    """Microseconds per frame; step() handles every frame once."""
+    best = min(timeit.repeat(step, number=number, repeat=5))
+    return best / (number * frames) * 1e6
+
+
+async def run(faulted, number):
+    client = HoneywellClient(build_panel(PANEL_TYPE_HONEYWELL))
+    client._loggedin = True
+    zones = range(1, faulted + 1)
+    frames = ["01,0008,%03d,00,FAULT %02d ZONE NAME  " % (zone, zone) for zone in zones]
+
+    def keypad():
+        for frame in frames:
+            client.handle_keypad_update("%00", frame)
+
+    tracker = ZoneFaultTracker()
+    timers = {}
+
+    def track():
+        for zone in zones:
+            tracker_update(tracker, zone)
+
+    def time_out():
+        for zone in zones:
+            timers_update(timers, zone)
+
+    # Let every zone be reported once before timing
+    keypad()
+    track()
+    time_out()
+    print(f"{faulted} faulted zones scrolling")
+    print(f"  %00 handling  {per_frame(keypad, faulted, number):6.2f} us per frame")
+    print(
+        f"  tracker       {per_frame(track, faulted, number):6.2f} us per frame  "
+        f"(zone timers {per_frame(time_out, faulted, number):6.2f} us)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--faulted", type=int, default=40)
+    parser.add_argument("--number", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run(args.faulted, args.number))
+
+
+if __name__ == "__main__":
+    main()
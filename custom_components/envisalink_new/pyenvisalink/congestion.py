@@ -0,0 +1,75 @@
+"""Connection level congestion control for commands sent to the EVL."""
+
+# Defaults for the estimate of the EVL's sustainable command rate (commands/second)
+DEFAULT_INITIAL_RATE = 20.0
+DEFAULT_MIN_RATE = 1.0
+DEFAULT_MAX_RATE = 100.0
+
+# Until the first overrun each ack grows the rate by SLOW_START_GROWTH.  After that,
+# each ack adds ADDITIVE_INCREASE / rate to the rate (i.e. roughly ADDITIVE_INCREASE
+# commands/second for every second spent sending) while each overrun multiplies it by
+# MULTIPLICATIVE_DECREASE.
+SLOW_START_GROWTH = 1.05
+ADDITIVE_INCREASE = 2.0
+MULTIPLICATIVE_DECREASE = 0.75
+
+
+class CongestionController:
+    """AIMD estimate of the rate at which the EVL can accept commands.
+
+    Commands are paced at the estimated rate.  The rate grows quickly until the EVL first
+    reports a buffer overrun; after that every command the EVL accepts nudges the rate up
+    and every overrun cuts it.  Overruns for commands which were sent before the most
+    recent cut are ignored since they were sent at the old rate and have already been
+    accounted for."""
+
+    def __init__(
+        self,
+        initialRate=DEFAULT_INITIAL_RATE,
+        minRate=DEFAULT_MIN_RATE,
+        maxRate=DEFAULT_MAX_RATE,
+    ):
+        self._minRate = minRate
+        self._maxRate = maxRate
+        self.rate = min(max(initialRate, minRate), maxRate)
+        self.overruns = 0
+        self.decreases = 0
+        self._slowStart = True
+        self._nextSendTime = 0.0
+        self._lastDecrease = 0.0
+
+    def interval(self) -> float:
+        """Time between commands at the current rate."""
+        return 1.0 / self.rate
+
+    def delay(self, now) -> float:
+        """How long to wait before the next command may be sent."""
+        return max(0.0, self._nextSendTime - now)
+
+    def on_send(self, now):
+        self._nextSendTime = now + self.interval()
+
+    def on_success(self):
+        if self._slowStart:
+            rate = self.rate * SLOW_START_GROWTH
+        else:
+            rate = self.rate + ADDITIVE_INCREASE / self.rate
+        self.rate = min(self._maxRate, rate)
+
+    def on_overrun(self, sentTime, now):
+        self.overruns += 1
+        if sentTime < self._lastDecrease:
+            return
+        self._slowStart = False
+        self.rate = max(self._minRate, self.rate * MULTIPLICATIVE_DECREASE)
+        self.decreases += 1
+        self._lastDecrease = now
+        # Back off from now rather than from the last send
+        self._nextSendTime = now + self.interval()
+
+    def snapshot(self) -> dict:
+        return {
+            "rate": round(self.rate, 2),
+            "overruns": self.overruns,
+            "decreases": self.decreases,
+        }
@@ -13,3 +13,11 @@ MAX_PARTITIONS = 8
 # Maximum number of zones supported by the EVL based on version
 EVL3_MAX_ZONES = 64
 EVL4_MAX_ZONES = 128
+
+# Command priority classes used by the command scheduler.  Queued commands are sent in
+# order of priority (lowest value first) and then in the order they were queued.
+PRIORITY_LIFE_SAFETY = 0
+PRIORITY_USER_ACTION = 1
+PRIORITY_MAINTENANCE = 2
+
+COMMAND_PRIORITY_NAMES = ("life_safety", "user_action", "maintenance")
@@ -1,11 +1,14 @@
 import asyncio
 import datetime
-import json
 import logging
 import re
 import time
 
+from .alarm_state import ZONE_BYPASSED, decode_zone_bitmap
 from .const import (
+    PRIORITY_LIFE_SAFETY,
+    PRIORITY_MAINTENANCE,
+    PRIORITY_USER_ACTION,
     STATE_CHANGE_KEYPAD,
     STATE_CHANGE_PARTITION,
     STATE_CHANGE_ZONE,
@@ -21,6 +24,8 @@ from .dsc_envisalinkdefs import (
     evl_verboseTrouble,
 )
 from .envisalink_base_client import EnvisalinkClient
+from .frame_parser import DSCFrameParser
+from .log_helpers import LazyJson
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -28,6 +33,10 @@ _LOGGER = logging.getLogger(__name__)
 class DSCClient(EnvisalinkClient):
     """Represents a dsc alarm client."""
 
+    _evl_ResponseTypes = evl_ResponseTypes
+    _evl_TPI_Response_Codes = evl_TPI_Response_Codes
+    _commandBase = 10
+
     def detect(prompt):
         """Given the initial connection data, determine if this is a DSC panel."""
         code = "505"
@@ -39,6 +48,23 @@ class DSCClient(EnvisalinkClient):
         super().__init__(panel)
         self._loginEvent = asyncio.Event()
         self._bypassStateInitialized = False
+        self._frameParser = DSCFrameParser()
+
+        # DSC acks echo the command code so several commands can be in flight at once
+        self._pipelineWindow = max(1, panel.pipeline_window)
+        self._loginHandlers = {
+            "3": self.handle_login,
+            "2": self.handle_login_timeout,
+            "1": self.handle_login_success,
+            "0": self.handle_login_failure,
+        }
+
+    def build_dispatch_table(self) -> dict:
+        table = super().build_dispatch_table()
+
+        # The login response code is further qualified by its data
+        table["505"] = (self.handle_login_response, False)
+        return table
 
     def to_chars(string):
         chars = []
@@ -57,18 +83,21 @@ class DSCClient(EnvisalinkClient):
 
     async def dump_zone_timers(self):
         """Send a command to dump out the zone timers."""
-        await self.queue_command(evl_Commands["DumpZoneTimers"], "")
+        await self.queue_command(evl_Commands["DumpZoneTimers"], "", priority=PRIORITY_MAINTENANCE)
 
-    async def keypresses_to_partition(self, partitionNumber, keypresses):
+    async def keypresses_to_partition(
+        self, partitionNumber, keypresses, priority=PRIORITY_USER_ACTION
+    ):
         """Send keypresses (max of 6) to a particular partition."""
         await self.queue_command(
             evl_Commands["PartitionKeypress"],
             str.format("{0}{1}", partitionNumber, keypresses[:6]),
+            priority=priority,
         )
 
     async def keep_alive(self):
         """Send a keepalive command to reset it's watchdog timer."""
-        await self.queue_command(evl_Commands["KeepAlive"], "")
+        await self.queue_command(evl_Commands["KeepAlive"], "", priority=PRIORITY_MAINTENANCE)
 
     async def arm_stay_partition(self, code, partitionNumber):
         """Public method to arm/stay a partition."""
@@ -88,11 +117,18 @@ class DSCClient(EnvisalinkClient):
 
     async def disarm_partition(self, code, partitionNumber):
         """Public method to disarm a partition."""
-        await self.queue_command(evl_Commands["Disarm"], str(partitionNumber) + str(code), code)
+        await self.queue_command(
+            evl_Commands["Disarm"],
+            str(partitionNumber) + str(code),
+            code,
+            priority=PRIORITY_LIFE_SAFETY,
+        )
 
     async def panic_alarm(self, panicType):
         """Public method to raise a panic alarm."""
-        await self.queue_command(evl_Commands["Panic"], evl_PanicTypes[panicType])
+        await self.queue_command(
+            evl_Commands["Panic"], evl_PanicTypes[panicType], priority=PRIORITY_LIFE_SAFETY
+        )
 
     async def bypass_zone(self, zone, partition, enable):
         """Public method to toggle a zone's bypass state."""
@@ -110,37 +146,16 @@ class DSCClient(EnvisalinkClient):
             code,
         )
 
-    def parseHandler(self, rawInput):
+    def parseHandler(self, buffer, start, end):
         """When the envisalink contacts us- parse out which command and data."""
-        cmd = {}
-        dataoffset = 0
-        if rawInput != "":
-            if re.match(r"\d\d:\d\d:\d\d\s", rawInput):
-                dataoffset = dataoffset + 9
-            code = rawInput[dataoffset : dataoffset + 3]
-            cmd["code"] = code
-            cmd["data"] = rawInput[dataoffset + 3 :][:-2]
-
-            try:
-                # Interpret the login command further to see what our handler is.
-                if evl_ResponseTypes[code]["handler"] == "login":
-                    if cmd["data"] == "3":
-                        handler = "login"
-                    elif cmd["data"] == "2":
-                        handler = "login_timeout"
-                    elif cmd["data"] == "1":
-                        handler = "login_success"
-                    elif cmd["data"] == "0":
-                        handler = "login_failure"
-
-                    cmd["handler"] = "handle_%s" % handler
-                else:
-                    cmd["handler"] = "handle_%s" % evl_ResponseTypes[code]["handler"]
-                cmd["state_change"] = evl_ResponseTypes[code].get("state_change", False)
-            except KeyError:
-                _LOGGER.debug(str.format("No handler defined in config for {0}, skipping...", code))
+        return self._frameParser.parse(buffer, start, end)
 
-        return cmd
+    def handle_login_response(self, code, data):
+        """Interpret the login command further to see what our handler is."""
+        handler = self._loginHandlers.get(data)
+        if handler:
+            return handler(code, data)
+        _LOGGER.error("Unrecognized login response received: '%s'", data)
 
     def handle_login(self, code, data):
         """When the envisalink asks us for our password- send it."""
@@ -176,8 +191,13 @@ class DSCClient(EnvisalinkClient):
 
     async def complete_login(self):
         dt = datetime.datetime.now().strftime("%H%M%m%d%y")
-        await self.queue_command(evl_Commands["SetTime"], dt)
-        await self.queue_command(evl_Commands["StatusReport"], "")
+        await self.queue_commands(
+            [
+                {"cmd": evl_Commands["SetTime"], "data": dt},
+                {"cmd": evl_Commands["StatusReport"], "data": ""},
+            ],
+            priority=PRIORITY_MAINTENANCE,
+        )
 
     def handle_command_response(self, code, data):
         """Handle the envisalink's initial response to our commands."""
@@ -186,7 +206,7 @@ class DSCClient(EnvisalinkClient):
             self.command_succeeded(data)
         elif code == "501":
             _LOGGER.error("Issued command resulted in a checksum failure.")
-            self.command_failed(retry=True)
+            self.command_failed(retry=True, reason="Checksum failure")
         elif code == "502":
             retry = False
             if data in evl_TPI_Response_Codes:
@@ -200,7 +220,7 @@ class DSCClient(EnvisalinkClient):
 
             else:
                 _LOGGER.error(f"Unrecognized system error for issued command: '{data}'")
-            self.command_failed(retry=retry)
+            self.command_failed(retry=retry, failureCode=data)
 
     def handle_zone_state_change(self, code, data):
         """Handle when the envisalink sends us a zone change."""
@@ -209,20 +229,23 @@ class DSCClient(EnvisalinkClient):
         parse = re.match("^[0-9]{3,4}$", data)
         if parse:
             zoneNumber = int(data[-3:])
-            self._alarmPanel.alarm_state["zone"][zoneNumber]["status"].update(
+            if zoneNumber not in self._alarmPanel.alarm_state.zones:
+                _LOGGER.debug("Zone state change received for unknown zone %d", zoneNumber)
+                return
+            changed = self._alarmPanel.alarm_state["zone"][zoneNumber]["status"].update(
                 evl_ResponseTypes[code]["status"]
             )
-            self._alarmPanel.alarm_state["zone"][zoneNumber]["updated"] = now
+            self._alarmPanel.alarm_state.zones.updated[zoneNumber] = now
+            if not changed:
+                return {}
 
             if evl_ResponseTypes[code]["is_fault"]:
-                self._alarmPanel.alarm_state["zone"][zoneNumber]["last_fault"] = now
+                self._alarmPanel.alarm_state.zones.last_fault[zoneNumber] = now
 
             _LOGGER.debug(
-                str.format(
-                    "(zone {0}) state has updated: {1}",
-                    zoneNumber,
-                    json.dumps(evl_ResponseTypes[code]["status"]),
-                )
+                "(zone %d) state has updated: %s",
+                zoneNumber,
+                LazyJson(evl_ResponseTypes[code]["status"]),
             )
             return {STATE_CHANGE_ZONE: [zoneNumber]}
         else:
@@ -236,17 +259,15 @@ class DSCClient(EnvisalinkClient):
             parse = re.match("^[0-9]{2}$", data)
             if parse:
                 partitionNumber = int(data[0])
-                self._alarmPanel.alarm_state["partition"][partitionNumber]["status"].update(
-                    evl_ArmModes[data[1]]["status"]
-                )
+                changed = self._alarmPanel.alarm_state["partition"][partitionNumber][
+                    "status"
+                ].update(evl_ArmModes[data[1]]["status"])
                 _LOGGER.debug(
-                    str.format(
-                        "(partition {0}) state has updated: {1}",
-                        partitionNumber,
-                        json.dumps(evl_ArmModes[data[1]]["status"]),
-                    )
+                    "(partition %d) state has updated: %s",
+                    partitionNumber,
+                    LazyJson(evl_ArmModes[data[1]]["status"]),
                 )
-                return {STATE_CHANGE_PARTITION: [partitionNumber]}
+                return {STATE_CHANGE_PARTITION: {partitionNumber: changed} if changed else {}}
             else:
                 _LOGGER.error("Invalid data has been passed when arming the alarm.")
         else:
@@ -254,27 +275,25 @@ class DSCClient(EnvisalinkClient):
             if parse:
                 partitionNumber = int(data[0])
                 status = self._alarmPanel.alarm_state["partition"][partitionNumber]["status"]
-                status.update(evl_ResponseTypes[code]["status"])
+                changed = status.update(evl_ResponseTypes[code]["status"])
                 _LOGGER.debug(
-                    str.format(
-                        "(partition {0}) state has updated: {1}",
-                        partitionNumber,
-                        json.dumps(evl_ResponseTypes[code]["status"]),
-                    )
+                    "(partition %d) state has updated: %s",
+                    partitionNumber,
+                    LazyJson(evl_ResponseTypes[code]["status"]),
                 )
 
                 """Log the user who last armed or disarmed the alarm"""
                 if code == "700":
                     lastArmedBy = {"last_armed_by_user": int(data[1:5])}
-                    status.update(lastArmedBy)
+                    changed += status.update(lastArmedBy)
                 elif code == "750":
                     lastDisarmedBy = {"last_disarmed_by_user": int(data[1:5])}
-                    status.update(lastDisarmedBy)
+                    changed += status.update(lastDisarmedBy)
                 elif code == "654":
                     # Update the alpha based on whether fire/panic are set
-                    self.set_in_alarm_alpha(partitionNumber)
+                    changed += self.set_in_alarm_alpha(partitionNumber)
 
-                result = {STATE_CHANGE_PARTITION: [partitionNumber]}
+                result = {STATE_CHANGE_PARTITION: {partitionNumber: changed} if changed else {}}
                 if code == "655":
                     if self._alarmPanel._zoneBypassEnabled:
                         """Partition was disarmed so any zone bypasses will have been reset"""
@@ -296,7 +315,11 @@ class DSCClient(EnvisalinkClient):
         if self._cachedCode is None:
             _LOGGER.error("The envisalink asked for a code, but we have no code in our cache.")
         else:
-            await self.queue_command(evl_Commands["SendCode"], self._cachedCode)
+            # The EVL is holding up the command which triggered the challenge until it
+            # gets the code so don't leave it waiting behind other commands.
+            await self.queue_command(
+                evl_Commands["SendCode"], self._cachedCode, priority=PRIORITY_LIFE_SAFETY
+            )
             self._cachedCode = None
 
     def handle_keypad_update(self, code, data):
@@ -316,11 +339,11 @@ class DSCClient(EnvisalinkClient):
         else:
             new_status = evl_ResponseTypes[code]["status"]
 
-        updatedPartitions = []
-        for part in self._alarmPanel.alarm_state["partition"]:
-            self._alarmPanel.alarm_state["partition"][part]["status"].update(new_status)
-            updatedPartitions.append(part)
-        _LOGGER.debug(str.format("(All partitions) state has updated: {0}", json.dumps(new_status)))
+        updatedPartitions = {}
+        for part, partition in self._alarmPanel.alarm_state["partition"].items():
+            if changed := partition["status"].update(new_status):
+                updatedPartitions[part] = changed
+        _LOGGER.debug("(All partitions) state has updated: %s", LazyJson(new_status))
         return {STATE_CHANGE_KEYPAD: updatedPartitions}
 
     def handle_zone_bypass_update(self, code, data):
@@ -329,25 +352,17 @@ class DSCClient(EnvisalinkClient):
             return
 
         if len(data) == 16:
-            updates = []
-            for byte in range(8):
-                bypassBitfield = int("0x" + data[byte * 2] + data[(byte * 2) + 1], 0)
-
-                for bit in range(8):
-                    zoneNumber = (byte * 8) + bit + 1
-                    bypassed = bypassBitfield & (1 << bit) != 0
-                    if self._alarmPanel.alarm_state["zone"][zoneNumber]["bypassed"] != bypassed:
-                        updates.append(zoneNumber)
-                    self._alarmPanel.alarm_state["zone"][zoneNumber]["bypassed"] = bypassed
+            bits, mask = decode_zone_bitmap(data)
+            updates = self._alarmPanel.alarm_state.zones.update_bitmap(ZONE_BYPASSED, bits, mask)
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                for zoneNumber in updates:
                     _LOGGER.debug(
-                        str.format(
-                            "(zone {0}) bypass state has updated: {1}",
-                            zoneNumber,
-                            bypassed,
-                        )
+                        "(zone %d) bypass state has updated: %s",
+                        zoneNumber,
+                        bool(bits >> zoneNumber & 1),
                     )
 
-            _LOGGER.debug(str.format("zone bypass updates: {0}", updates))
+            _LOGGER.debug("zone bypass updates: %s", updates)
             return {STATE_CHANGE_ZONE_BYPASS: updates}
         else:
             _LOGGER.error(
@@ -364,12 +379,15 @@ class DSCClient(EnvisalinkClient):
         API (or perhaps the panel itself) makes it impossible for this feature
         to work if the alarm panel is setup to require a code to bypass zones."""
 
-        await self.keypresses_to_partition(1, "*1#")
+        await self.keypresses_to_partition(1, "*1#", PRIORITY_MAINTENANCE)
 
     def is_zone_open_from_zonedump(self, zone, ticks) -> bool:
         # DSC seems to report accurately to 0 means open, anything else means closed
         return ticks == 0
 
+    def zone_dump_open_bits(self, ticks, count) -> int:
+        return sum(1 << zone for zone, zoneTicks in enumerate(ticks[:count], 1) if not zoneTicks)
+
     def handle_keypad_led_state_update(self, code, data):
         if len(data) != 2:
             return None
@@ -377,16 +395,16 @@ class DSCClient(EnvisalinkClient):
         flags = KeypadLED_Flags()
         flags.asByte = int(data, 16)
 
-        _LOGGER.debug(f"Keypad LED state update: {flags}")
+        _LOGGER.debug("Keypad LED state update: %s", flags)
 
-        updatedPartitions = []
+        updatedPartitions = {}
         new_status = {
             "alarm_fire_zone": bool(flags.fire),
             "alarm_in_memory": bool(flags.memory),
         }
-        for part in self._alarmPanel.alarm_state["partition"]:
-            self._alarmPanel.alarm_state["partition"][part]["status"].update(new_status)
-            updatedPartitions.append(part)
+        for part, partition in self._alarmPanel.alarm_state["partition"].items():
+            if changed := partition["status"].update(new_status):
+                updatedPartitions[part] = changed
 
         if (
             self._alarmPanel._zoneBypassEnabled
@@ -410,7 +428,7 @@ class DSCClient(EnvisalinkClient):
         self.handle_keypad_led_state_update(code, data)
 
 
-    def set_in_alarm_alpha(self, partition_number):
+    def set_in_alarm_alpha(self, partition_number) -> list:
         status = self._alarmPanel.alarm_state["partition"][partition_number]["status"]
         alpha = "Alarm"
         if status["fire"]:
@@ -418,7 +436,7 @@ class DSCClient(EnvisalinkClient):
         elif status["panic"]:
             alpha = "Panic Alarm"
 
-        status["alpha"] = alpha
+        return status.update({"alpha": alpha})
 
     def handle_command_output_pressed(self, code, data):
         """Handle PGM output triggered"""
@@ -427,12 +445,12 @@ class DSCClient(EnvisalinkClient):
             partitionNumber = int(data[0])
             pgm = int(data[1])
 
-            self._alarmPanel.alarm_state["partition"][partitionNumber]["status"].update(
-                { f"pgm_{pgm}_last_triggered": datetime.datetime.now().isoformat() }
-            )
+            changed = self._alarmPanel.alarm_state["partition"][partitionNumber][
+                "status"
+            ].update({f"pgm_{pgm}_last_triggered": datetime.datetime.now().isoformat()})
             #_LOGGER.debug(f"Command output pressed on partition {partitionNumber} for PGM {pgm}")
             _LOGGER.debug("Command output pressed on partition %d for PGM %d", partitionNumber, pgm)
-            return {STATE_CHANGE_KEYPAD: [partitionNumber]}
+            return {STATE_CHANGE_KEYPAD: {partitionNumber: changed}}
         else:
             _LOGGER.error("Invalid data has been passed in the command output update.")
 
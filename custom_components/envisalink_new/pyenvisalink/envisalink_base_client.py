@@ -1,24 +1,136 @@
 import asyncio
+import heapq
 import logging
-import re
+import sys
 import time
+from array import array
+from collections import deque
 from enum import Enum
 
+from .alarm_state import ZONE_BYPASSED, ZONE_FAULT, ZONE_OPEN
 from .const import (
+    COMMAND_PRIORITY_NAMES,
+    PRIORITY_USER_ACTION,
     STATE_CHANGE_KEYPAD,
     STATE_CHANGE_PARTITION,
     STATE_CHANGE_ZONE,
     STATE_CHANGE_ZONE_BYPASS,
 )
+from .congestion import CongestionController
+from .log_helpers import WireTrace
+from .metrics import CommandMetrics, LatencyHistogram, ZoneDumpMetrics
 
 _LOGGER = logging.getLogger(__name__)
 
 _RECONNECT_MIN_TIME = 2
 _RECONNECT_MAX_TIME = 128
 
+# Initial size of the receive buffer used by the buffered transport.  TPI frames are
+# well under this size so the buffer only grows if the EVL sends garbage.
+_READ_BUFFER_SIZE = 4096
+
+# Each zone timer in a zone dump counts down from 0xFFFF by one tick every 5 seconds.
+# Inverting every byte of the dump turns the raw timers straight into tick counts.
+_ZONE_TIMER_TICK_SECONDS = 5
+_INVERT_BYTES = bytes(255 - b for b in range(256))
+
+
+class EnvisalinkProtocol(asyncio.BufferedProtocol):
+    """Buffered transport for the TPI connection.  Received bytes are written directly
+    into a single reusable buffer and every complete frame found in a read is handed to
+    the client as one batch."""
+
+    def __init__(self, client):
+        self._client = client
+        self._buffer = bytearray(_READ_BUFFER_SIZE)
+        self._pending = 0
+        self._transport = None
+        self._closed = client._eventLoop.create_future()
+        self._drainWaiter = None
+
+    def connection_made(self, transport):
+        self._transport = transport
+
+    def connection_lost(self, exc):
+        if not self._closed.done():
+            self._closed.set_result(exc)
+        self._wake_drain_waiter(exc)
+
+    def get_buffer(self, sizehint):
+        if self._pending == len(self._buffer):
+            # No room left for more data because a frame is larger than the buffer
+            self._buffer = self._buffer + bytes(len(self._buffer))
+        return memoryview(self._buffer)[self._pending :]
+
+    def buffer_updated(self, nbytes):
+        buffer = self._buffer
+        end = self._pending + nbytes
+        start = 0
+        frames = []
+        while True:
+            idx = buffer.find(b"\n", start, end)
+            if idx == -1:
+                break
+            frames.append((start, idx + 1))
+            start = idx + 1
+
+        # Frames are parsed in place so process them before the buffer is compacted
+        if frames:
+            self._client.process_frames(buffer, frames)
+
+        # Move any partial frame to the front of the buffer for the next read
+        if start:
+            buffer[0 : end - start] = buffer[start:end]
+        self._pending = end - start
+
+    def eof_received(self):
+        # Returning a false value closes the transport
+        return False
+
+    def pause_writing(self):
+        if self._drainWaiter is None:
+            self._drainWaiter = self._client._eventLoop.create_future()
+
+    def resume_writing(self):
+        self._wake_drain_waiter(None)
+
+    def _wake_drain_waiter(self, exc):
+        waiter = self._drainWaiter
+        self._drainWaiter = None
+        if waiter and not waiter.done():
+            if exc:
+                waiter.set_exception(exc)
+            else:
+                waiter.set_result(None)
+
+    # The methods below mirror the subset of the asyncio.StreamWriter interface used by
+    # the client so that either transport can be used interchangeably.
+    def write(self, data):
+        self._transport.write(data)
+
+    async def drain(self):
+        if self._transport.is_closing():
+            raise ConnectionResetError("Connection lost")
+        if self._drainWaiter:
+            await self._drainWaiter
+
+    def close(self):
+        if self._transport:
+            self._transport.close()
+
+    async def wait_closed(self):
+        await asyncio.shield(self._closed)
+
+
 class EnvisalinkClient:
     """Abstract base class for the envisalink TPI client."""
 
+    # Response code definitions for the panel family; overridden by each client
+    _evl_ResponseTypes = {}
+    _evl_TPI_Response_Codes = {}
+    # Base the command codes of the panel family are written in
+    _commandBase = 16
+
     class Operation:
         class State(Enum):
             QUEUED = "queued"
@@ -27,16 +139,44 @@ class EnvisalinkClient:
             RETRY = "retry"
             FAILED = "failed"
 
-        def __init__(self, cmd, data, code, logData):
+        def __init__(self, cmd, data, code, logData, batch=None):
             self.cmd = cmd
             self.data = data
             self.code = code
             self.logData = logData
+            self.batch = batch
             self.state = self.State.QUEUED
             self.retryDelay = 0.1  # Start the retry backoff at 100ms
             self.retryTime = 0
             self.expiryTime = 0
-            self.responseEvent = asyncio.Event()
+            self.queuedTime = 0
+            self.sentTime = 0
+            self.failureCode = None
+            self.failureReason = None
+
+    class Batch:
+        """A group of operations queued by a single caller.  The caller waits on a single
+        future which resolves once every operation in the batch has completed.  If
+        abortOnFailure is set, a failed operation fails the rest of the batch without
+        sending it."""
+
+        def __init__(self, future, priority=PRIORITY_USER_ACTION, abortOnFailure=False):
+            self.future = future
+            self.priority = priority
+            self.abortOnFailure = abortOnFailure
+            self.operations = []
+            self.remaining = 0
+            self.unsent = 0
+            self.succeeded = False
+
+        def operation_completed(self, op):
+            self.remaining -= 1
+            if self.remaining <= 0 and not self.future.done():
+                # The result of the batch is the result of its last operation, whichever
+                # order the operations completed in
+                last = self.operations[-1]
+                self.succeeded = last.state == last.State.SUCCEEDED
+                self.future.set_result(self.succeeded)
 
     def __init__(self, panel):
         self._loggedin = False
@@ -50,10 +190,27 @@ class EnvisalinkClient:
         self._readLoopTask = None
         self._keepAliveTask = None
         self._commandEvent = asyncio.Event()
-        self._commandQueue = []
+        self._commandQueues = [deque() for _ in COMMAND_PRIORITY_NAMES]
+        self._activeBatch = None
+        self._inFlight = deque()
+        self._pipelineWindow = 1
+        self._serialFallback = False
+        self._congestion = CongestionController() if panel.congestion_control else None
+        self._timerHeap = []
+        self._timerSequence = 0
+        self._timerHandle = None
+        self._timerDeadline = None
         self._activeTasks = set()
         self._reconnect_time = _RECONNECT_MIN_TIME
         self._connect_time = 0
+        self._loginTimer = None
+        self._dispatchTable = self.build_dispatch_table()
+        self._queueWait = [LatencyHistogram() for _ in COMMAND_PRIORITY_NAMES]
+        self._commandMetrics = {}
+        self._zoneDumpMetrics = ZoneDumpMetrics()
+        self._wireTrace = WireTrace(
+            _LOGGER, panel.wire_trace_sample_rate, panel.wire_trace_max_per_second
+        )
 
     def create_internal_task(self, coro, name=None):
         task = self._eventLoop.create_task(coro, name=name)
@@ -79,7 +236,9 @@ class EnvisalinkClient:
 
         if self._alarmPanel.zone_timer_interval > 0:
             self.create_internal_task(
-                self.periodic_command(self.dump_zone_timers, self._alarmPanel.zone_timer_interval),
+                self.periodic_command(
+                    self.reconcile_zone_state, self._alarmPanel.zone_timer_interval
+                ),
                 name="zone_timer_dump",
             )
 
@@ -97,6 +256,9 @@ class EnvisalinkClient:
 
         await self.disconnect()
 
+        # Release any callers still waiting on commands that were never sent
+        self.fail_all_operations()
+
         _LOGGER.info(
             "An event loop was given to us- we will shutdown when that event loop shuts down."
         )
@@ -112,7 +274,14 @@ class EnvisalinkClient:
             try:
                 await self.connect()
 
-                if self._reader and self._writer:
+                if self._reader and self._writer and self._alarmPanel.buffered_transport:
+                    # Connected to EVL; received data is processed by the protocol so just
+                    # wait here until the connection goes away.
+                    await self._reader.wait_closed()
+                    if self._writer:
+                        _LOGGER.error("The server closed the connection.")
+                        await self.disconnect()
+                elif self._reader and self._writer:
                     # Connected to EVL; start reading data from the connection
                     while not self._shutdown and self._reader:
                         _LOGGER.debug("Waiting for data from EVL")
@@ -134,11 +303,10 @@ class EnvisalinkClient:
                                 await self.disconnect()
                             break
 
-                        data = data.decode("ascii")
                         _LOGGER.debug("{---------------------------------------")
-                        _LOGGER.debug(str.format("RX < {0}", data))
+                        self._wireTrace.rx(data)
 
-                        self.process_data(data.strip())
+                        self.process_frame(data, 0, len(data))
                         _LOGGER.debug("}---------------------------------------")
 
             except Exception as ex:
@@ -174,10 +342,24 @@ class EnvisalinkClient:
         )
         self._loggedin = False
         try:
-            coro = asyncio.open_connection(self._alarmPanel.host, self._alarmPanel.port)
-            self._reader, self._writer = await asyncio.wait_for(
-                coro, self._alarmPanel.connection_timeout
-            )
+            if self._alarmPanel.buffered_transport:
+                coro = self._eventLoop.create_connection(
+                    lambda: EnvisalinkProtocol(self),
+                    self._alarmPanel.host,
+                    self._alarmPanel.port,
+                )
+                _, protocol = await asyncio.wait_for(coro, self._alarmPanel.connection_timeout)
+                self._reader = self._writer = protocol
+
+                # A single timer covers the whole login handshake
+                self._loginTimer = self._eventLoop.call_later(
+                    self._alarmPanel.connection_timeout, self.login_timer_expired
+                )
+            else:
+                coro = asyncio.open_connection(self._alarmPanel.host, self._alarmPanel.port)
+                self._reader, self._writer = await asyncio.wait_for(
+                    coro, self._alarmPanel.connection_timeout
+                )
             _LOGGER.info("Connection Successful!")
 
             self._alarmPanel.handle_connection_status(True)
@@ -204,9 +386,22 @@ class EnvisalinkClient:
         if self._reconnect_time > _RECONNECT_MAX_TIME:
             self._reconnect_time = _RECONNECT_MIN_TIME
 
+    def login_timer_expired(self):
+        """Tear down the connection if the login handshake has not completed in time."""
+        self._loginTimer = None
+        if not self._loggedin and self._writer:
+            _LOGGER.error("Timed out waiting to complete login handshake; disconnecting.")
+            self.create_internal_task(self.disconnect(), name="login_timeout")
+
+    def cancel_login_timer(self):
+        if self._loginTimer:
+            self._loginTimer.cancel()
+            self._loginTimer = None
+
     async def disconnect(self):
         """Internal method for forcing connection closure if hung."""
         _LOGGER.debug("Cleaning up from disconnection with server.")
+        self.cancel_login_timer()
 
         if not self._writer:
             # Already disconnected so don't do anything
@@ -219,8 +414,7 @@ class EnvisalinkClient:
         self._loggedin = False
 
         # Fail all outstanding commands
-        for op in self._commandQueue:
-            op.state = self.Operation.State.FAILED
+        self.fail_all_operations()
 
         # Tear down the connection
         try:
@@ -237,10 +431,11 @@ class EnvisalinkClient:
 
     async def send_data(self, data, logData=None):
         """Raw data send- just make sure it's encoded properly and logged."""
-        # Scrub the password and alarm code if necessary
-        if not logData:
-            logData = self.scrub_sensitive_data(data)
-        _LOGGER.debug("TX > %s", str(logData))
+        if self._wireTrace.enabled():
+            # Scrub the password and alarm code if necessary
+            if not logData:
+                logData = self.scrub_sensitive_data(data)
+            self._wireTrace.tx(logData)
 
         if not self._writer:
             _LOGGER.debug("Unable to send data; not connected.")
@@ -261,6 +456,21 @@ class EnvisalinkClient:
         """Public method for dumping zone timers."""
         raise NotImplementedError()
 
+    async def reconcile_zone_state(self):
+        """Periodically request a zone timer dump to correct any zone state which has
+        drifted.  The dump is skipped if other commands are waiting to be sent so it
+        never delays them."""
+        if self.command_queue_busy():
+            self._zoneDumpMetrics.skipped += 1
+            _LOGGER.debug("Command queue is busy; skipping zone timer dump")
+            return
+
+        self._zoneDumpMetrics.requested += 1
+        await self.dump_zone_timers()
+
+    def command_queue_busy(self) -> bool:
+        return bool(self._inFlight) or any(self._commandQueues)
+
     async def keep_alive(self):
         """Send a keepalive command to reset it's watchdog timer."""
         raise NotImplementedError()
@@ -273,7 +483,9 @@ class EnvisalinkClient:
         """Public method for sending a key to a particular partition."""
         self.send_data(keypresses)
 
-    async def keypresses_to_partition(self, partitionNumber, keypresses):
+    async def keypresses_to_partition(
+        self, partitionNumber, keypresses, priority=PRIORITY_USER_ACTION
+    ):
         """Public method to send a key to the default partition."""
         raise NotImplementedError()
 
@@ -313,40 +525,74 @@ class EnvisalinkClient:
         """Public method to activate the selected command output"""
         raise NotImplementedError()
 
-    def parseHandler(self, rawInput):
-        """When the envisalink contacts us- parse out which command and data."""
+    def parseHandler(self, buffer, start, end):
+        """When the envisalink contacts us- parse out which command and data.  Returns a
+        (code, data) tuple or None if the frame should be ignored."""
         raise NotImplementedError()
 
-    def process_data(self, data) -> str:
-        cmd = self.parseHandler(data)
+    def process_frames(self, buffer, frames):
+        """Process a batch of raw frames received from the EVL.  Each frame is given as
+        a (start, end) offset pair into the buffer."""
+        _LOGGER.debug("{---------------------------------------")
+        for start, end in frames:
+            self._wireTrace.rx(buffer, start, end)
+            self.process_frame(buffer, start, end)
+        _LOGGER.debug("}---------------------------------------")
+
+    def process_data(self, data):
+        """Process a single frame given as a string."""
+        raw = data.encode("ascii")
+        self.process_frame(raw, 0, len(raw))
+
+    def build_dispatch_table(self) -> dict:
+        """Build the mapping from each response code to its bound handler and whether
+        the handler's result should trigger the state change callbacks."""
+        table = {}
+        for code, info in self._evl_ResponseTypes.items():
+            handler = getattr(self, "handle_%s" % info["handler"], None)
+            if handler is None:
+                _LOGGER.debug("No handler implemented for %s (%s)", code, info["handler"])
+                continue
+            table[code] = (handler, info.get("state_change", False))
+        return table
+
+    def process_frame(self, buffer, start, end):
+        cmd = self.parseHandler(buffer, start, end)
+        if cmd is None:
+            return
+
+        code, data = cmd
+        try:
+            handler, state_change = self._dispatchTable[code]
+        except KeyError:
+            _LOGGER.debug("No handler defined in config for %s, skipping...", code)
+            return
 
         result = None
         try:
-            _LOGGER.debug(
-                str.format(
-                    "calling handler: {0} for code: {1} with data: {2}",
-                    cmd["handler"],
-                    cmd["code"],
-                    cmd["data"],
-                )
-            )
-            handlerFunc = getattr(self, cmd["handler"])
-            result = handlerFunc(cmd["code"], cmd["data"])
+            _LOGGER.debug("calling handler: %s for code: %s with data: %s", handler, code, data)
+            result = handler(code, data)
 
         except (AttributeError, TypeError, KeyError) as err:
             _LOGGER.debug("No handler configured for evl command.")
 
         try:
             _LOGGER.debug("Invoking state change callbacks")
-            if result and cmd["state_change"]:
+            if result and state_change:
                 self.handle_state_change_callbacks(result)
+            self.handle_confirmed_partitions(result)
 
         except (AttributeError, TypeError, KeyError) as ex:
             _LOGGER.debug("No callback configured for evl command. %r", ex)
 
     def handle_state_change_callbacks(self, updates):
+        journal = self._alarmPanel.journal
         for change_type, values in updates.items():
             if values:
+                if journal is not None:
+                    journal.record_state_changes(
+                        self._alarmPanel.alarm_state, change_type, values
+                    )
                 _LOGGER.debug("Triggering state change callback for %s: %s", change_type, values)
                 if change_type == STATE_CHANGE_PARTITION:
                     self._alarmPanel.callback_partition_state_change(values)
@@ -359,35 +605,47 @@ class EnvisalinkClient:
                 else:
                     _LOGGER.error("Unhandled state change update: %s: %s", change_type, values)
 
+    def handle_confirmed_partitions(self, updates):
+        """Trigger the partitions whose restored status the panel has just confirmed and
+        which weren't otherwise updated.  Nothing in their status changed so no fields are
+        given, which leaves out the listeners for single fields, and nothing is journaled."""
+        confirmed = self._alarmPanel.alarm_state.take_confirmed_partitions()
+        if not confirmed:
+            return
+        if updates:
+            for change_type in (STATE_CHANGE_PARTITION, STATE_CHANGE_KEYPAD):
+                confirmed.difference_update(updates.get(change_type) or ())
+        if confirmed:
+            _LOGGER.debug("Restored status confirmed for partitions %s", sorted(confirmed))
+            self._alarmPanel.callback_partition_state_change(
+                {partition: [] for partition in sorted(confirmed)}
+            )
+
+    @staticmethod
+    def decode_zone_timers(data) -> array:
+        """Decode a zone timer dump into an array of the ticks elapsed for each zone."""
+        raw = bytes.fromhex(data[: len(data) // 4 * 4]).translate(_INVERT_BYTES)
+        ticks = array("H", raw)
+        if sys.byteorder != "little":
+            ticks.byteswap()
+        return ticks
+
     def convertZoneDump(self, theString):
         """Interpret the zone dump result, and convert to readable times."""
         returnItems = []
-        zoneNumber = 1
-        # every four characters
-        inputItems = re.findall("....", theString)
-        for inputItem in inputItems:
-            # Swap the couples of every four bytes (little endian to big endian)
-            swapedBytes = []
-            swapedBytes.insert(0, inputItem[0:2])
-            swapedBytes.insert(0, inputItem[2:4])
-
-            # add swapped set of four bytes to our return items, converting from hex to int
-            itemHexString = "".join(swapedBytes)
-            itemInt = int(itemHexString, 16)
-
-            # each value is a timer for a zone that ticks down every five seconds from maxint
-            MAXINT = 0xFFFF
-            itemTicks = MAXINT - itemInt
-            itemSeconds = itemTicks * 5
-
-            status = ""
+        for zoneNumber, itemTicks in enumerate(self.decode_zone_timers(theString), start=1):
             if self.is_zone_open_from_zonedump(zoneNumber, itemTicks):
                 status = "open"
             else:
                 status = "closed"
 
-            returnItems.append({"zone": zoneNumber, "status": status, "seconds": itemSeconds})
-            zoneNumber += 1
+            returnItems.append(
+                {
+                    "zone": zoneNumber,
+                    "status": status,
+                    "seconds": itemTicks * _ZONE_TIMER_TICK_SECONDS,
+                }
+            )
         return returnItems
 
     def handle_login(self, code, data):
@@ -397,6 +655,8 @@ class EnvisalinkClient:
     def handle_login_success(self, code, data):
         """Handler for when the envisalink accepts our credentials."""
         self._loggedin = True
+        self._serialFallback = False
+        self.cancel_login_timer()
         _LOGGER.debug("Password accepted, session created")
         self._alarmPanel.handle_login_success()
 
@@ -439,33 +699,62 @@ class EnvisalinkClient:
         ticks in a zone dump timer update"""
         raise NotImplementedError()
 
+    def zone_dump_open_bits(self, ticks, count) -> int:
+        """Classify the first count zones of a decoded zone dump.  Returns a bit vector
+        (bit n = zone n) of the zones which should be considered open."""
+        isOpen = self.is_zone_open_from_zonedump
+        openBits = 0
+        for zoneNumber in range(1, count + 1):
+            if isOpen(zoneNumber, ticks[zoneNumber - 1]):
+                openBits |= 1 << zoneNumber
+        return openBits
+
     def handle_zone_timer_dump(self, code, data):
         """Handle the zone timer data."""
-        results = []
         now = time.time()
-        zoneInfoArray = self.convertZoneDump(data)
-        for zoneNumber, zoneInfo in enumerate(zoneInfoArray, start=1):
-            currentStatus = self._alarmPanel.alarm_state["zone"][zoneNumber]["status"]
-            newOpen = zoneInfo["status"] == "open"
-            newFault = zoneInfo["status"] == "open"
-            if newOpen != currentStatus["open"] or newFault != currentStatus["fault"]:
-                # State changed so add to result list
-                results.append(zoneNumber)
-
-            self._alarmPanel.alarm_state["zone"][zoneNumber]["status"].update(
-                {"open": newOpen, "fault": newFault}
-            )
-            self._alarmPanel.alarm_state["zone"][zoneNumber]["last_fault"] = (
-                now - zoneInfo["seconds"]
-            )
-            _LOGGER.debug("(zone %i) %s", zoneNumber, zoneInfo["status"])
+        ticks = self.decode_zone_timers(data)
+        zones = self._alarmPanel.alarm_state.zones
+        lastFault = zones.last_fault
+        count = min(len(ticks), zones.count)
+        openBits = self.zone_dump_open_bits(ticks, count)
+        for zoneNumber in range(1, count + 1):
+            lastFault[zoneNumber] = now - ticks[zoneNumber - 1] * _ZONE_TIMER_TICK_SECONDS
+
+        # Only the zones whose state differs from the dump are written back and reported
+        mask = ((1 << count) - 1) << 1
+        openChanged = zones.update_bitmap(ZONE_OPEN, openBits, mask)
+        faultChanged = zones.update_bitmap(ZONE_FAULT, openBits, mask)
+        results = sorted(set(openChanged).union(faultChanged))
+        self._zoneDumpMetrics.record_dump(len(results))
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            for zoneNumber in results:
+                _LOGGER.debug(
+                    "(zone %i) %s", zoneNumber, "open" if openBits >> zoneNumber & 1 else "closed"
+                )
         return {STATE_CHANGE_ZONE: results}
 
-    async def queue_command(self, cmd, data, code=None):
-        return await self.queue_commands([{"cmd": cmd, "data": data, "code": code}])
+    async def queue_command(self, cmd, data, code=None, priority=PRIORITY_USER_ACTION):
+        return await self.queue_commands(
+            [{"cmd": cmd, "data": data, "code": code}], priority=priority
+        )
 
-    async def queue_commands(self, command_list: list):
-        operations = []
+    async def queue_commands(
+        self, command_list: list, abortOnFailure=False, priority=PRIORITY_USER_ACTION
+    ):
+        batch = await self.queue_batch(command_list, abortOnFailure, priority)
+        return batch.succeeded
+
+    async def queue_batch(
+        self, command_list: list, abortOnFailure=False, priority=PRIORITY_USER_ACTION
+    ):
+        """Queue a list of commands to be sent back to back and wait for them to complete.
+        Commands are sent in order of their priority class (see const.py) and then in the
+        order they were queued.  Returns the Batch so the caller can inspect the individual
+        operations."""
+        batch = self.Batch(self._eventLoop.create_future(), priority, abortOnFailure)
+        queue = self._commandQueues[priority]
+        now = self._eventLoop.time()
+        debug = _LOGGER.isEnabledFor(logging.DEBUG)
         for command in command_list:
             cmd = command["cmd"]
             data = command["data"]
@@ -475,158 +764,360 @@ class EnvisalinkClient:
             # Scrub the password and alarm code if necessary
             if not logData:
                 logData = self.scrub_sensitive_data(data, code)
-            _LOGGER.debug(
-                "Queueing command '%s' data: '%s' ; calling_task=%s",
-                cmd,
-                logData,
-                asyncio.current_task().get_name(),
-            )
+            if debug:
+                _LOGGER.debug(
+                    "Queueing %s command '%s' data: '%s' ; calling_task=%s",
+                    COMMAND_PRIORITY_NAMES[priority],
+                    cmd,
+                    logData,
+                    asyncio.current_task().get_name(),
+                )
 
-            op = self.Operation(cmd, data, code, logData)
-            op.expiryTime = time.time() + self._alarmPanel.command_timeout
-            operations.append(op)
-            self._commandQueue.append(op)
+            op = self.Operation(cmd, data, code, logData, batch)
+            op.queuedTime = now
+            queue.append(op)
+            batch.operations.append(op)
 
-        self._commandEvent.set()
-        for op in operations:
-            await op.responseEvent.wait()
-        return op.state == op.State.SUCCEEDED
+        batch.remaining = batch.unsent = len(batch.operations)
+        if batch.remaining:
+            self._commandEvent.set()
+            await batch.future
+        return batch
 
     async def process_command_queue(self):
-        """Manage processing of commands to be issued to the EVL.  Commands are serialized to
-        the EVL to avoid overwhelming it and to make it easy to pair up responses (since there
-        are no sequence numbers for requests).
+        """Manage processing of commands to be issued to the EVL.  By default commands are
+        serialized to the EVL to avoid overwhelming it and to make it easy to pair up
+        responses (since there are no sequence numbers for requests).  Clients whose acks
+        identify the command can allow a window of commands to be in flight at once (see
+        in_flight_window).
 
         Operations that fail due to a recoverable error (e.g. buffer overruns) will be re-tried
-        with a backoff."""
+        with a backoff.  Response timeouts and retries are driven by a loop timer (see
+        schedule_deadline) so this task only wakes up when there is something to send."""
         _LOGGER.info("Command processing task started.")
 
         while not self._shutdown:
             try:
-                now = time.time()
-                op = None
-
-                # Default timeout to ensure we wake up periodically.
-                timeout = self._alarmPanel.command_timeout
-
-                while self._commandQueue:
-                    _LOGGER.debug(f"Checking command queue: len={len(self._commandQueue)}")
-                    op = self._commandQueue[0]
-                    timeout = op.expiryTime - now
-
-                    if op.state == self.Operation.State.SENT:
-                        # Still waiting on a response from the EVL so break out of loop and wait
-                        # for the response
-                        if now >= op.expiryTime:
-                            # Timeout waiting for response from the EVL so fail the command,
-                            # This is likely due to the EVL becoming unresponsive so tear down the
-                            # connection to start a recovery.
-                            _LOGGER.error(
-                                (
-                                    "Command '%s' failed due to timeout waiting for response "
-                                    "from EVL"
-                                ),
-                                op.cmd,
-                            )
-                            op.state = self.Operation.State.FAILED
-                            await self.disconnect()
-                        break
-                    elif op.state == self.Operation.State.QUEUED:
-                        # Send command to the EVL
-                        op.state = self.Operation.State.SENT
-                        op.expiryTime = time.time() + self._alarmPanel.command_timeout
-                        self._cachedCode = op.code
-                        try:
-                            await self.send_command(op.cmd, op.data, op.logData)
-                        except Exception as ex:
-                            _LOGGER.error(f"Unexpected exception trying to send command: {ex}")
-                            op.state = self.Operation.State.FAILED
-                    elif op.state == self.Operation.State.SUCCEEDED:
-                        # Remove completed command from head of the queue
-                        self._commandQueue.pop(0)
-                        op.responseEvent.set()
-                    elif op.state == self.Operation.State.RETRY:
-                        if now >= op.retryTime:
-                            # Time to re-issue the command
-                            op.state = self.Operation.State.QUEUED
-                        else:
-                            # Not time to re-issue yet so go back to sleep
-                            timeout = op.retryTime - now
-                            break
-                    elif op.state == self.Operation.State.FAILED:
-                        # Command completed; check the queue for more
-                        op.responseEvent.set()
-                        self._commandQueue.pop(0)
-
-                # Wait until there is more work to do
-                try:
+                if self._congestion:
+                    # Pace commands at the rate the EVL is estimated to be able to handle
+                    delay = self._congestion.delay(self._eventLoop.time())
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                        continue
+
+                op = self.next_operation()
+                if op is None:
+                    # Wait until there is more work to do
                     self._commandEvent.clear()
-                    await asyncio.wait_for(self._commandEvent.wait(), timeout=timeout)
+                    await self._commandEvent.wait()
                     _LOGGER.debug("Command processor woke up.")
-                except asyncio.exceptions.TimeoutError:
-                    pass
+                    continue
+
+                # Send command to the EVL
+                op.state = self.Operation.State.SENT
+                op.sentTime = self._eventLoop.time()
+                self.metrics_for(op.cmd).sent += 1
+                if self._congestion:
+                    self._congestion.on_send(op.sentTime)
+                self._cachedCode = op.code
+                self.schedule_deadline(op, self._alarmPanel.command_timeout)
+                try:
+                    await self.send_command(op.cmd, op.data, op.logData)
                 except Exception as ex:
-                    _LOGGER.error(f"Command processor woke up due unexpected exception {ex}")
+                    _LOGGER.error("Unexpected exception trying to send command: %s", ex)
+                    op.failureReason = "Send error"
+                    self.complete_operation(op, self.Operation.State.FAILED)
 
             except Exception as ex:
-                _LOGGER.error(f"Command processor caught unexpected exception {ex}")
+                _LOGGER.error("Command processor caught unexpected exception %s", ex)
 
         _LOGGER.info("Command processing task exited.")
 
-    def command_succeeded(self, cmd):
-        """Indicate that a command has been successfully processed by the EVL."""
+    def in_flight_window(self) -> int:
+        """Number of commands which may be awaiting a response from the EVL at once."""
+        return 1 if self._serialFallback else self._pipelineWindow
+
+    def next_operation(self):
+        """Return the next operation which is ready to be sent, if any.  Operations which
+        are due to be retried are re-sent first, followed by the rest of a batch which
+        has been partly sent, and then new operations in priority order."""
+        inFlight = self._inFlight
+        for op in inFlight:
+            if op.state == self.Operation.State.QUEUED:
+                return op
+
+        if len(inFlight) >= self.in_flight_window():
+            return None
+
+        active = self._activeBatch
+        if active is not None and active.unsent:
+            # Never interrupt a batch which has been partly sent
+            queue = self._commandQueues[active.priority]
+        else:
+            queue = None
+            for queue in self._commandQueues:
+                if queue:
+                    break
+            if not queue:
+                return None
+
+        if inFlight and (inFlight[-1].code or queue[0].code):
+            # Commands carrying an alarm code are never overlapped with other commands
+            # since the EVL may challenge for the code with no indication of which
+            # command it is for.
+            return None
+
+        op = queue.popleft()
+        op.batch.unsent -= 1
+        self._activeBatch = op.batch
+        wait = self._eventLoop.time() - op.queuedTime
+        self._queueWait[op.batch.priority].record(wait)
+        self.metrics_for(op.cmd).queueWait.record(wait)
+        inFlight.append(op)
+        return op
+
+    def complete_operation(self, op, state):
+        """Record the final state of an operation, remove it from the queue and let its
+        batch know."""
+        op.state = state
+        batch = op.batch
+        if self._inFlight and self._inFlight[0] is op:
+            self._inFlight.popleft()
+        elif op in self._inFlight:
+            self._inFlight.remove(op)
+        elif op in self._commandQueues[batch.priority]:
+            self._commandQueues[batch.priority].remove(op)
+            batch.unsent -= 1
+        if not self._inFlight:
+            # Nothing left waiting on a deadline so drop any stale timer entries
+            self.cancel_deadlines()
+        self.record_completion(op)
+        batch.operation_completed(op)
+
+        if state == self.Operation.State.FAILED and batch.abortOnFailure and batch.unsent:
+            # Drop the rest of the batch that has not been sent yet
+            queue = self._commandQueues[batch.priority]
+            for queued in [q for q in queue if q.batch is batch]:
+                queue.remove(queued)
+                queued.state = self.Operation.State.FAILED
+                queued.failureReason = "Aborted"
+                batch.unsent -= 1
+                self.record_completion(queued)
+                batch.operation_completed(queued)
+
+        # Wake up the command processing task to send the next command
+        self._commandEvent.set()
 
-        if self._commandQueue:
-            op = self._commandQueue[0]
-            if cmd and op.cmd != cmd:
+    def fail_all_operations(self):
+        """Fail every outstanding operation (e.g. when the connection is lost)."""
+        operations = list(self._inFlight)
+        self._inFlight.clear()
+        for queue in self._commandQueues:
+            operations.extend(queue)
+            queue.clear()
+        self._activeBatch = None
+        self.cancel_deadlines()
+        for op in operations:
+            op.state = self.Operation.State.FAILED
+            op.failureReason = "Disconnected"
+            op.batch.unsent = 0
+            self.record_completion(op)
+            op.batch.operation_completed(op)
+        self._commandEvent.set()
+
+    def metrics_for(self, cmd) -> CommandMetrics:
+        metrics = self._commandMetrics.get(cmd)
+        if metrics is None:
+            metrics = self._commandMetrics[cmd] = CommandMetrics()
+        return metrics
+
+    def record_completion(self, op):
+        metrics = self.metrics_for(op.cmd)
+        succeeded = op.state == self.Operation.State.SUCCEEDED
+        if (journal := self._alarmPanel.journal) is not None:
+            journal.record_command(op.cmd, succeeded, self._commandBase)
+        if succeeded:
+            metrics.succeeded += 1
+            metrics.wireTime.record(self._eventLoop.time() - op.sentTime)
+        else:
+            metrics.record_failure(op.failureReason or self.describe_failure(op.failureCode))
+
+    def describe_failure(self, failureCode) -> str:
+        """Human readable reason for a failure code reported by the EVL."""
+        if failureCode is None:
+            return "Unknown"
+        info = self._evl_TPI_Response_Codes.get(failureCode)
+        return info["msg"] if info else failureCode
+
+    def queue_wait_latency(self) -> dict:
+        """Time spent by commands waiting to be sent, for each priority class."""
+        return {
+            name: histogram.snapshot()
+            for name, histogram in zip(COMMAND_PRIORITY_NAMES, self._queueWait)
+        }
+
+    def get_metrics(self) -> dict:
+        """Snapshot of the command metrics collected since the client was created."""
+        commands = {cmd: metrics.snapshot() for cmd, metrics in self._commandMetrics.items()}
+        totals = {}
+        for key in ("sent", "succeeded", "failed", "retries", "timeouts"):
+            totals[key] = sum(snapshot[key] for snapshot in commands.values())
+        metrics = {
+            "totals": totals,
+            "commands": commands,
+            "queue_wait": self.queue_wait_latency(),
+            "zone_dump": self._zoneDumpMetrics.snapshot(),
+        }
+        if self._congestion:
+            metrics["congestion"] = self._congestion.snapshot()
+        return metrics
+
+    def schedule_deadline(self, op, delay):
+        """Arrange for the operation to be revisited by the deadline timer once the delay
+        has elapsed.  The deadline applies to whichever of the response timeout (SENT) or
+        retry backoff (RETRY) the operation is currently waiting on."""
+        deadline = self._eventLoop.time() + delay
+        if op.state == self.Operation.State.RETRY:
+            op.retryTime = deadline
+        else:
+            op.expiryTime = deadline
+
+        self._timerSequence += 1
+        heapq.heappush(self._timerHeap, (deadline, self._timerSequence, op))
+        self.arm_deadline_timer()
+
+    def arm_deadline_timer(self):
+        """Make sure the loop timer fires for the earliest pending deadline."""
+        if not self._timerHeap:
+            return
+        deadline = self._timerHeap[0][0]
+        if self._timerHandle and self._timerDeadline <= deadline:
+            return
+        if self._timerHandle:
+            self._timerHandle.cancel()
+        self._timerDeadline = deadline
+        self._timerHandle = self._eventLoop.call_at(deadline, self.deadline_timer_expired)
+
+    def cancel_deadlines(self):
+        self._timerHeap.clear()
+        if self._timerHandle:
+            self._timerHandle.cancel()
+            self._timerHandle = None
+            self._timerDeadline = None
+
+    def deadline_timer_expired(self):
+        """Handle every deadline which has passed.  Heap entries are not removed when an
+        operation completes so stale entries are skipped here."""
+        self._timerHandle = None
+        self._timerDeadline = None
+        now = self._eventLoop.time()
+        heap = self._timerHeap
+        while heap and heap[0][0] <= now:
+            deadline, _, op = heapq.heappop(heap)
+            if op.state == self.Operation.State.SENT and op.expiryTime == deadline:
+                # Timeout waiting for response from the EVL so fail the command,
+                # This is likely due to the EVL becoming unresponsive so tear down the
+                # connection to start a recovery.
                 _LOGGER.error(
-                    (
-                        "Command acknowledgement received is different for a different command "
-                        "(%s) than was issued (%s)"
-                    ),
-                    cmd,
+                    "Command '%s' failed due to timeout waiting for response from EVL",
                     op.cmd,
                 )
-            else:
-                op.state = self.Operation.State.SUCCEEDED
-        else:
+                self.metrics_for(op.cmd).timeouts += 1
+                op.failureReason = "Timeout"
+                self.complete_operation(op, self.Operation.State.FAILED)
+                self.create_internal_task(self.disconnect(), name="command_timeout")
+            elif op.state == self.Operation.State.RETRY and op.retryTime == deadline:
+                # Time to re-issue the command
+                op.state = self.Operation.State.QUEUED
+                self._commandEvent.set()
+
+        self.arm_deadline_timer()
+
+    def oldest_sent_operation(self, cmd=None):
+        """Find the operation a response from the EVL refers to: the oldest command awaiting
+        a response, optionally restricted to a particular command code."""
+        for op in self._inFlight:
+            if op.state == self.Operation.State.SENT and (not cmd or op.cmd == cmd):
+                return op
+        return None
+
+    def command_succeeded(self, cmd):
+        """Indicate that a command has been successfully processed by the EVL."""
+
+        op = self.oldest_sent_operation(cmd)
+        if op:
+            if self._congestion:
+                self._congestion.on_success()
+            self.complete_operation(op, self.Operation.State.SUCCEEDED)
+        elif self._inFlight:
             _LOGGER.error(
-                f"Command acknowledgement received for '{cmd}' when no command was issued."
+                (
+                    "Command acknowledgement received is different for a different command "
+                    "(%s) than was issued (%s)"
+                ),
+                cmd,
+                self._inFlight[0].cmd,
             )
+        else:
+            _LOGGER.error("Command acknowledgement received for '%s' when no command was issued.", cmd)
 
-        # Wake up the command processing task to process this result
-        self._commandEvent.set()
+    def command_failed(self, retry=False, failureCode=None, reason=None):
+        """Indicate that a command issued to the EVL has failed.  The failure code reported
+        by the EVL (if any) is recorded against the operation; the reason defaults to the
+        description of the failure code."""
 
-    def command_failed(self, retry=False):
-        """Indicate that a command issued to the EVL has failed."""
+        if not self._inFlight:
+            _LOGGER.error("Command/system error received when no command is active.")
+            return
 
-        if self._commandQueue:
-            op = self._commandQueue[0]
-            if op.state != self.Operation.State.SENT:
-                _LOGGER.error("Command/system error received when no command was issued.")
-            elif retry is False:
-                # No retry request so tag the command as failed
-                op.state = self.Operation.State.FAILED
-            else:
-                # Update the retry delay based on an exponential backoff
-                op.retryDelay *= 2
+        op = self.oldest_sent_operation()
+        if not op:
+            _LOGGER.error("Command/system error received when no command was issued.")
+            return
 
-                if op.retryDelay >= self._alarmPanel.command_timeout:
-                    # Don't extend the retry delay beyond the overall command timeout
-                    _LOGGER.error("Maximum command retries attempted; aborting command.")
-                    op.state = self.Operation.State.FAILED
-                else:
-                    # Tag the command to be retried in the future by the command processor task
-                    op.state = self.Operation.State.RETRY
-                    op.retryTime = time.time() + op.retryDelay
-                    _LOGGER.warn(
-                        f"Command '{op.cmd} {op.data}' failed; retry in {op.retryDelay} seconds."
-                    )
-        else:
-            _LOGGER.error("Command/system error received when no command is active.")
+        if self.in_flight_window() > 1:
+            # Errors don't identify the command they are for so it is assumed to be the
+            # oldest one.  Stop overlapping commands until the next login so that any
+            # further errors are attributed correctly.
+            _LOGGER.warning("Command error received while pipelining; reverting to serial mode.")
+            self._serialFallback = True
 
-        # Wake up the command processing task to process this result
-        self._commandEvent.set()
+        op.failureCode = failureCode
+        if reason is None:
+            reason = self.describe_failure(failureCode)
+
+        if retry is False:
+            # No retry request so tag the command as failed
+            self.complete_operation(op, self.Operation.State.FAILED)
+        else:
+            # Update the retry delay based on an exponential backoff
+            op.retryDelay *= 2
+            retryDelay = op.retryDelay
+            if self._congestion and failureCode is not None:
+                # A retryable error code from the EVL means it couldn't keep up.  The
+                # congestion controller slows down all commands so the retry only needs
+                # to wait for its turn at the new rate.  The per-op backoff still limits
+                # the number of attempts.
+                now = self._eventLoop.time()
+                self._congestion.on_overrun(op.sentTime, now)
+                retryDelay = self._congestion.delay(now)
+
+            if op.retryDelay >= self._alarmPanel.command_timeout:
+                # Don't extend the retry delay beyond the overall command timeout
+                _LOGGER.error("Maximum command retries attempted; aborting command.")
+                op.failureReason = "Maximum retries: %s" % reason
+                self.complete_operation(op, self.Operation.State.FAILED)
+            else:
+                # Tag the command to be retried in the future by the deadline timer
+                op.state = self.Operation.State.RETRY
+                self.metrics_for(op.cmd).record_retry(reason)
+                self.schedule_deadline(op, retryDelay)
+                _LOGGER.warning(
+                    "Command '%s %s' failed; retry in %.3f seconds.",
+                    op.cmd,
+                    op.logData,
+                    retryDelay,
+                )
 
     def scrub_sensitive_data(self, data, code=None):
         if not self._loggedin:
@@ -635,8 +1126,8 @@ class EnvisalinkClient:
         else:
             logData = data
 
-        if not code and self._commandQueue and self._commandQueue[0].code:
-            code = str(self._commandQueue[0].code)
+        if not code and self._cachedCode:
+            code = str(self._cachedCode)
         if code:
             logData = logData.replace(code, "*" * len(code))
         return logData
@@ -646,11 +1137,10 @@ class EnvisalinkClient:
         return self._loggedin
 
     def clear_zone_bypass_state(self) -> list:
-        cleared_zones = []
-        for zone_number, zone_info in enumerate(
-            self._alarmPanel.alarm_state["zone"].values(), start=1
-        ):
-            if zone_info["bypassed"]:
-                cleared_zones.append(zone_number)
-            zone_info["bypassed"] = False
+        zones = self._alarmPanel.alarm_state.zones
+        bypassed = zones.bitmap(ZONE_BYPASSED)
+        cleared_zones = [
+            zone_number for zone_number in range(1, zones.count + 1) if bypassed >> zone_number & 1
+        ]
+        zones.set_bitmap(ZONE_BYPASSED, 0)
         return cleared_zones
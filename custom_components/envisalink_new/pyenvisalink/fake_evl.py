@@ -0,0 +1,148 @@
+"""Fake Envisalink TPI server used by the tests and benchmarks to exercise the clients
+over a real socket."""
+
+import asyncio
+
+from .alarm_panel import EnvisalinkAlarmPanel
+from .alarm_state import AlarmState
+from .const import MAX_PARTITIONS, PANEL_TYPE_DSC
+
+
+def dsc_frame(code, data="") -> bytes:
+    """A DSC TPI frame with its checksum."""
+    checksum = ("%02X" % sum((code + data).encode("ascii")))[-2:]
+    return f"{code}{data}{checksum}\r\n".encode("ascii")
+
+
+def honeywell_frame(code, data=None) -> bytes:
+    """A Honeywell TPI frame; code includes the % or ^ sentinel."""
+    if data is None:
+        return f"{code}$\r\n".encode("ascii")
+    return f"{code},{data}$\r\n".encode("ascii")
+
+
+def build_panel(panelType, port=4025, **kwargs) -> EnvisalinkAlarmPanel:
+    """A panel for a FakeEvl which skips discovery and the periodic commands."""
+    kwargs.setdefault("zoneTimerInterval", 0)
+    kwargs.setdefault("keepAliveInterval", 0)
+    panel = EnvisalinkAlarmPanel("127.0.0.1", port, "user", "user", **kwargs)
+    panel.panel_type = panelType
+    panel.envisalink_version = "4"
+    panel._alarmState = AlarmState.get_initial_alarm_state(panel.zone_count, MAX_PARTITIONS)
+    return panel
+
+
+class FakeEvl:
+    """A TPI server for a single client connection.  It runs the login handshake for the
+    panel family, then acks every command it receives after an optional latency.  If
+    maxRate is set, commands arriving sooner than 1/maxRate seconds after the last one
+    accepted are rejected with a buffer overrun the way a busy EVL does.
+
+    Subclasses (or tests) can override respond() to return other responses, and frames
+    can be pushed to the client at any time with send().  Every command received is
+    recorded in commands as a (code, data) tuple."""
+
+    def __init__(self, panelType, password="user", latency=0, maxRate=None):
+        self.panelType = panelType
+        self.password = password
+        self.latency = latency
+        self.maxRate = maxRate
+        self.commands = []
+        self.overruns = 0
+        self.loggedIn = asyncio.Event()
+        self._server = None
+        self._writer = None
+        self._handler = None
+        self._tasks = set()
+
+    @property
+    def dsc(self) -> bool:
+        return self.panelType == PANEL_TYPE_DSC
+
+    async def start(self) -> int:
+        """Start listening and return the port number."""
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        if self._writer:
+            self._writer.close()
+        if self._handler:
+            self._handler.cancel()
+            await asyncio.gather(self._handler, return_exceptions=True)
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def send(self, data: bytes):
+        if self._writer:
+            self._writer.write(data)
+
+    def ack(self, code) -> bytes:
+        if self.dsc:
+            return dsc_frame("500", code)
+        return honeywell_frame("^" + code, "00")
+
+    def overrun(self, code) -> bytes:
+        if self.dsc:
+            return dsc_frame("502", "001")
+        return honeywell_frame("^" + code, "01")
+
+    def respond(self, code, data):
+        """The response to a command, or None to ignore it."""
+        return self.ack(code)
+
+    def parse_command(self, line: bytes) -> tuple:
+        text = line.decode("ascii").strip()
+        if self.dsc:
+            # Drop the checksum
+            return text[:3], text[3:-2]
+        code, _, data = text[1:].rstrip("$").partition(",")
+        return code, data
+
+    async def _handle(self, reader, writer):
+        self._writer = writer
+        self._handler = asyncio.current_task()
+        try:
+            if self.dsc:
+                writer.write(dsc_frame("505", "3"))
+                await reader.readuntil(b"\n")
+                writer.write(dsc_frame("500", "005") + dsc_frame("505", "1"))
+            else:
+                writer.write(b"Login:\r\n")
+                await reader.readuntil(b"\n")
+                writer.write(b"OK\r\n")
+            self.loggedIn.set()
+
+            loop = asyncio.get_running_loop()
+            lastAccepted = None
+            while True:
+                line = await reader.readuntil(b"\n")
+                code, data = self.parse_command(line)
+                if self.maxRate:
+                    now = loop.time()
+                    if lastAccepted is not None and now - lastAccepted < 1 / self.maxRate:
+                        self.overruns += 1
+                        writer.write(self.overrun(code))
+                        continue
+                    lastAccepted = now
+                self.commands.append((code, data))
+                if self.latency:
+                    task = loop.create_task(self._reply(code, data))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                else:
+                    self._write_response(code, data)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+
+    async def _reply(self, code, data):
+        await asyncio.sleep(self.latency)
+        self._write_response(code, data)
+
+    def _write_response(self, code, data):
+        response = self.respond(code, data)
+        if response and not self._writer.is_closing():
+            self._writer.write(response)
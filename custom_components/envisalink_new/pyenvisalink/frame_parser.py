@@ -0,0 +1,100 @@
+"""Parsers that locate the fields of a raw TPI frame by byte offset.
+
+Frames are parsed in place from the receive buffer; only the code and data fields are
+decoded to strings since those are the only parts the handlers read."""
+
+_WHITESPACE = b" \t\r\n"
+_ZERO = ord("0")
+_NINE = ord("9")
+_COLON = ord(":")
+_PERCENT = ord("%")
+_CARET = ord("^")
+
+
+def _trim(buffer, start, end):
+    """Return the start/end offsets of the frame with surrounding whitespace removed."""
+    while start < end and buffer[start] in _WHITESPACE:
+        start += 1
+    while end > start and buffer[end - 1] in _WHITESPACE:
+        end -= 1
+    return start, end
+
+
+def _decode(view, start, end) -> str:
+    return str(view[start:end], "ascii")
+
+
+class FrameParser:
+    """Base class for the frame parsers."""
+
+    def __init__(self):
+        self._buffer = None
+        self._view = None
+
+    def view(self, buffer):
+        """Return a memoryview of the buffer.  The view is reused for as long as frames
+        keep arriving in the same (reusable) receive buffer."""
+        if buffer is not self._buffer:
+            self._buffer = buffer
+            self._view = memoryview(buffer)
+        return self._view
+
+    def parse(self, buffer, start, end):
+        raise NotImplementedError()
+
+
+class HoneywellFrameParser(FrameParser):
+    """Parser for the Honeywell (and UNO) TPI frame format: '%CC,data$' or '^CC,data$'.
+    Lines without a sentinel are only sent during the login handshake."""
+
+    def parse(self, buffer, start, end):
+        """Returns a (code, data) tuple for the frame.  For lines without a sentinel the
+        whole line is returned as the code and the data is None."""
+        start, end = _trim(buffer, start, end)
+        if start == end:
+            return None
+
+        view = self.view(buffer)
+        first = buffer[start]
+        if first == _PERCENT or first == _CARET:
+            # Keep the first sentinel char to tell the difference between TPI and
+            # Envisalink command responses.  Drop the trailing $ sentinel.
+            dollar = buffer.rfind(b"$", start + 2, end)
+            if dollar != -1:
+                comma = buffer.find(b",", start, dollar)
+                if comma == -1:
+                    return _decode(view, start, dollar), ""
+                return _decode(view, start, comma), _decode(view, comma + 1, dollar)
+
+        return _decode(view, start, end), None
+
+
+class DSCFrameParser(FrameParser):
+    """Parser for the DSC TPI frame format: '[hh:mm:ss ]CCCdata..KK' where CCC is the
+    command code and KK is the checksum."""
+
+    def parse(self, buffer, start, end):
+        """Returns a (code, data) tuple for the frame."""
+        start, end = _trim(buffer, start, end)
+        if start == end:
+            return None
+
+        if end - start > 9 and buffer[start + 2] == _COLON and self._has_timestamp(buffer, start):
+            start += 9
+
+        view = self.view(buffer)
+        codeEnd = min(start + 3, end)
+        dataEnd = max(codeEnd, end - 2)
+        return _decode(view, start, codeEnd), _decode(view, codeEnd, dataEnd)
+
+    @staticmethod
+    def _has_timestamp(buffer, start) -> bool:
+        """Check for an 'hh:mm:ss ' prefix on the frame."""
+        if buffer[start + 2] != _COLON or buffer[start + 5] != _COLON:
+            return False
+        if buffer[start + 8] not in _WHITESPACE:
+            return False
+        for offset in (0, 1, 3, 4, 6, 7):
+            if not _ZERO <= buffer[start + offset] <= _NINE:
+                return False
+        return True
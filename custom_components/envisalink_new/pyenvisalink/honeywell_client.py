@@ -1,10 +1,21 @@
-import json
 import logging
-import re
 import time
-
-from .const import STATE_CHANGE_PARTITION, STATE_CHANGE_ZONE, STATE_CHANGE_ZONE_BYPASS
+from collections import namedtuple
+from functools import lru_cache
+
+from .alarm_state import ZONE_BYPASSED, ZONE_FAULT, ZONE_OPEN, bit_positions
+from .const import (
+    PRIORITY_LIFE_SAFETY,
+    PRIORITY_MAINTENANCE,
+    PRIORITY_USER_ACTION,
+    STATE_CHANGE_PARTITION,
+    STATE_CHANGE_ZONE,
+    STATE_CHANGE_ZONE_BYPASS,
+)
 from .envisalink_base_client import EnvisalinkClient
+from .frame_parser import HoneywellFrameParser
+from .log_helpers import LazyJson
+from .metrics import LatencyHistogram
 from .honeywell_envisalinkdefs import (
     Beep_Flags,
     IconLED_Flags,
@@ -17,25 +28,58 @@ from .honeywell_envisalinkdefs import (
     evl_TPI_Response_Codes,
     evl_Virtual_Keypad_How_To_Beep,
 )
+from .zone_tracker import ZONE_REPORT_RESTORED, ZONE_REPORT_STATE, ZoneFaultTracker
 
 _LOGGER = logging.getLogger(__name__)
 
+# A decoded %00 keypad update.  status holds the partition status fields carried by the
+# update as (key, value) pairs ready to be passed to the partition status' update().
+KeypadUpdate = namedtuple(
+    "KeypadUpdate",
+    (
+        "status",
+        "partition_status",
+        "zone_code",
+        "bypass",
+        "partition_report",
+        "low_battery",
+    ),
+)
+
+# Number of distinct (flags, beep, alpha) combinations kept decoded.  The keypad repeats
+# a small set of these over and over; countdown messages are the main source of new ones.
+_KEYPAD_DECODE_CACHE_SIZE = 512
+
+# Zones whose timer in a zone dump is at or below this many ticks are considered open
+_ZONE_DUMP_OPEN_TICKS = 3
+
+# Responses to a multi-key ^03 command which indicate the EVL won't accept more than one
+# key per command (Unknown Command / Syntax Error).
+_KEYPRESS_BATCH_REJECTED = ("02", "03")
+
 
 class HoneywellClient(EnvisalinkClient):
     """Represents a honeywell alarm client."""
 
+    _evl_ResponseTypes = evl_ResponseTypes
+    _evl_TPI_Response_Codes = evl_TPI_Response_Codes
+
     def __init__(self, panel):
         super().__init__(panel)
-        self._zoneTimers = {}
-        self._evl_ResponseTypes = evl_ResponseTypes
-        self._evl_TPI_Response_Codes = evl_TPI_Response_Codes
+        self._zoneTrackers = {}
+        self._lastKeypadFrames = {}
+        self._keypadFrameHits = 0
+        self._keypadFrameMisses = 0
+        self._frameParser = HoneywellFrameParser()
+        self._keypressBatchSize = max(1, panel.keypress_batch_size)
+        self._keypressLatency = {"batched": LatencyHistogram(), "per_key": LatencyHistogram()}
 
     def detect(prompt):
         """Given the initial connection data, determine if this is a Honeywell panel."""
         return prompt == "Login:"
 
     async def keep_alive(self):
-        await self.queue_command(evl_Commands["KeepAlive"], "")
+        await self.queue_command(evl_Commands["KeepAlive"], "", priority=PRIORITY_MAINTENANCE)
 
     async def send_command(self, code, data, logData=None):
         """Send a command in the proper honeywell format."""
@@ -46,14 +90,52 @@ class HoneywellClient(EnvisalinkClient):
 
     async def dump_zone_timers(self):
         """Send a command to dump out the zone timers."""
-        await self.queue_command(evl_Commands["DumpZoneTimers"], "")
+        await self.queue_command(evl_Commands["DumpZoneTimers"], "", priority=PRIORITY_MAINTENANCE)
+
+    async def queue_keypresses_to_partition(
+        self, partitionNumber, keypresses, logData, priority=PRIORITY_USER_ACTION
+    ):
+        """Queue keypresses to a partition.  Keys are normally sent one per command but
+        when keypress batching is enabled they are sent in chunks of up to
+        keypressBatchSize keys per command.  If the EVL rejects a chunk, the remaining
+        keys are re-sent one at a time and batching is disabled.  Returns a
+        (succeeded, batched) tuple."""
+        batchSize = self._keypressBatchSize
+        batch = await self.queue_batch(
+            self.build_keypress_commands(partitionNumber, keypresses, logData, 0, batchSize),
+            abortOnFailure=batchSize > 1,
+            priority=priority,
+        )
+        if batch.succeeded or batchSize == 1:
+            return batch.succeeded, batchSize > 1
+
+        # Find the chunk which failed; everything before it was accepted by the EVL
+        for chunk, op in enumerate(batch.operations):
+            if op.state != op.State.SUCCEEDED:
+                break
+
+        if op.failureCode not in _KEYPRESS_BATCH_REJECTED:
+            return False, True
+
+        _LOGGER.warning(
+            "EVL rejected a batch of %d keypresses; reverting to one keypress per command.",
+            batchSize,
+        )
+        self._keypressBatchSize = 1
+        commands = self.build_keypress_commands(
+            partitionNumber, keypresses, logData, chunk * batchSize, 1
+        )
+
+        # Queue up all the keypresses together to ensure an unrelated command cannot
+        # be inserted in the middle.
+        return await self.queue_commands(commands, priority=priority), False
 
-    async def queue_keypresses_to_partition(self, partitionNumber, keypresses, logData):
+    def build_keypress_commands(self, partitionNumber, keypresses, logData, start, batchSize):
         commands = []
-        for idx, char in enumerate(keypresses):
-            log = data = f"{partitionNumber},{char}"
+        for idx in range(start, len(keypresses), batchSize):
+            log = data = f"{partitionNumber},{keypresses[idx:idx + batchSize]}"
             if logData:
-                log = f"{partitionNumber},{logData[idx]}"
+                log = f"{partitionNumber},{logData[idx:idx + batchSize]}"
 
             commands.append(
                 {
@@ -62,95 +144,100 @@ class HoneywellClient(EnvisalinkClient):
                     "log": log,
                 }
             )
-
-        # Queue up all the keypresses together to ensure an unrelated command cannot
-        # be inserted in the middle.
-        await self.queue_commands(commands)
-
-    async def keypresses_to_partition(self, partitionNumber, keypresses):
+        return commands
+
+    async def queue_code_keypresses(
+        self, partitionNumber, code, keys, priority=PRIORITY_USER_ACTION
+    ):
+        """Send an alarm code followed by the given keys (used to arm and disarm) with
+        the code masked in the logs, recording how long the EVL took to accept it."""
+        start = time.monotonic()
+        succeeded, batched = await self.queue_keypresses_to_partition(
+            partitionNumber, code + keys, ("*" * len(code)) + keys, priority
+        )
+        if succeeded:
+            elapsed = time.monotonic() - start
+            self._keypressLatency["batched" if batched else "per_key"].record(elapsed)
+            _LOGGER.debug("Arm/disarm keypresses accepted in %.3fs", elapsed)
+
+    def keypress_latency(self) -> dict:
+        """Arm/disarm latency statistics for each of the keypress modes."""
+        return {mode: histogram.snapshot() for mode, histogram in self._keypressLatency.items()}
+
+    def get_metrics(self) -> dict:
+        metrics = super().get_metrics()
+        metrics["keypress_latency"] = self.keypress_latency()
+        cache = decode_keypad_update.cache_info()
+        metrics["keypad_frame_cache"] = {
+            "hits": self._keypadFrameHits,
+            "misses": self._keypadFrameMisses,
+        }
+        metrics["keypad_decode_cache"] = {
+            "hits": cache.hits,
+            "misses": cache.misses,
+            "size": cache.currsize,
+        }
+        return metrics
+
+    async def keypresses_to_partition(
+        self, partitionNumber, keypresses, priority=PRIORITY_USER_ACTION
+    ):
         """Send keypresses to a particular partition."""
-        await self.queue_keypresses_to_partition(partitionNumber, keypresses, None)
+        await self.queue_keypresses_to_partition(partitionNumber, keypresses, None, priority)
 
     async def arm_stay_partition(self, code, partitionNumber):
         """Public method to arm/stay a partition."""
-        await self.queue_keypresses_to_partition(
-            partitionNumber,
-            code + "3",
-            ("*" * len(code)) + "3",
-        )
+        await self.queue_code_keypresses(partitionNumber, code, "3")
 
     async def arm_away_partition(self, code, partitionNumber):
         """Public method to arm/away a partition."""
-        await self.queue_keypresses_to_partition(
-            partitionNumber,
-            code + "2",
-            ("*" * len(code)) + "2",
-        )
+        await self.queue_code_keypresses(partitionNumber, code, "2")
 
     async def arm_max_partition(self, code, partitionNumber):
         """Public method to arm/max a partition."""
-        await self.queue_keypresses_to_partition(
-            partitionNumber,
-            code + "4",
-            ("*" * len(code)) + "4",
-        )
+        await self.queue_code_keypresses(partitionNumber, code, "4")
 
     async def arm_night_partition(self, code, partitionNumber, mode=None):
         """Public method to arm/max a partition."""
         mode_keys = "33"
         if mode is not None:
             mode_keys = mode
-        await self.queue_keypresses_to_partition(
-            partitionNumber,
-            code + mode_keys,
-            ("*" * len(code)) + mode_keys,
-        )
+        await self.queue_code_keypresses(partitionNumber, code, mode_keys)
 
     async def disarm_partition(self, code, partitionNumber):
         """Public method to disarm a partition."""
-        await self.queue_keypresses_to_partition(
-            partitionNumber,
-            code + "1",
-            ("*" * len(code)) + "1",
-        )
+        await self.queue_code_keypresses(partitionNumber, code, "1", PRIORITY_LIFE_SAFETY)
 
     async def panic_alarm(self, panicType):
         """Public method to raise a panic alarm."""
-        await self.keypresses_to_partition(1, evl_PanicTypes[panicType])
+        await self.keypresses_to_partition(1, evl_PanicTypes[panicType], PRIORITY_LIFE_SAFETY)
 
     async def toggle_chime(self, code):
         """Public method to toggle a zone's bypass state."""
         await self.keypresses_to_partition(1, '%s9' % (code))
 
-    def parseHandler(self, rawInput):
+    def parseHandler(self, buffer, start, end):
         """When the envisalink contacts us- parse out which command and data."""
-        cmd = {}
-        _LOGGER.debug(str.format("Data received:{0}", rawInput))
-
-        parse = re.match(r"([%\^].+)\$", rawInput)
-        if parse and parse.group(1):
-            # keep first sentinel char to tell difference between tpi and
-            # Envisalink command responses.  Drop the trailing $ sentinel.
-            inputList = parse.group(1).split(",")
-            code = inputList[0]
-            cmd["code"] = code
-            cmd["data"] = ",".join(inputList[1:])
-            _LOGGER.debug(str.format("Code:{0} Data:{1}", code, cmd["data"]))
+        parsed = self._frameParser.parse(buffer, start, end)
+        if parsed is None:
+            return None
+
+        code, data = parsed
+        if data is not None:
+            _LOGGER.debug("Code:%s Data:%s", code, data)
+            return parsed
         elif not self._loggedin:
             # assume it is login info
-            code = rawInput
-            cmd["code"] = code
-            cmd["data"] = ""
-        else:
-            _LOGGER.error("Unrecognized data received from the envisalink. Ignoring.")
-            return None
-        try:
-            cmd["handler"] = "handle_%s" % self._evl_ResponseTypes[code]["handler"]
-            cmd["state_change"] = self._evl_ResponseTypes[code].get("state_change", False)
-        except KeyError:
-            _LOGGER.warning(str.format("No handler defined in config for {0}, skipping...", code))
+            return code, ""
+
+        _LOGGER.error("Unrecognized data received from the envisalink. Ignoring.")
+        return None
 
-        return cmd
+    def handle_login_success(self, code, data):
+        """Handler for when the envisalink accepts our credentials."""
+        super().handle_login_success(code, data)
+        # Process the first keypad update for each partition in full after reconnecting
+        self._lastKeypadFrames.clear()
 
     def handle_login(self, code, data):
         """When the envisalink asks us for our password- send it."""
@@ -163,171 +250,186 @@ class HoneywellClient(EnvisalinkClient):
         """Handle the envisalink's initial response to our commands."""
         if data in self._evl_TPI_Response_Codes:
             responseInfo = self._evl_TPI_Response_Codes[data]
-            _LOGGER.debug("Envisalink response: " + responseInfo["msg"])
+            _LOGGER.debug("Envisalink response: %s", responseInfo["msg"])
             if data == "00":
                 self.command_succeeded(code[1:])
             else:
                 _LOGGER.error(
                     "error sending command to envisalink.  Response was: " + responseInfo["msg"]
                 )
-                self.command_failed(retry=responseInfo["retry"])
+                self.command_failed(retry=responseInfo["retry"], failureCode=data)
         else:
             _LOGGER.error(str.format("Unrecognized response code ({0}) received", data))
-            self.command_failed(retry=False)
+            self.command_failed(retry=False, failureCode=data)
 
     def handle_keypad_update(self, code, data):
         """Handle the response to when the envisalink sends keypad updates our way."""
-        partition_updates = []
+        partition_updates = {}
         zone_updates = []
         bypass_updates = []
 
         now = time.time()
 
-        dataList = data.split(",")
-        # Custom messages and alpha fields might contain unescaped commas, so we'll recombine them:
-        if len(dataList) > 5:
-            dataList[4] = ",".join(dataList[4:])
-            del dataList[5:]
         # make sure data is in format we expect, current TPI seems to send bad data every so often
         # TODO: Make this a regex...
         if "%" in data:
             _LOGGER.error("Data format invalid from Envisalink, ignoring...")
             return
 
+        # The keypad rebroadcasts the same update over and over.  An exact repeat of the
+        # previous update for a partition can't change the partition's status so only the
+        # zone it reports needs to be refreshed.
+        partitionField = data[: data.find(",")]
+        lastFrame = self._lastKeypadFrames.get(partitionField)
+        if lastFrame is not None and lastFrame[0] == data:
+            self._keypadFrameHits += 1
+            if lastFrame[1] is not None:
+                self.handle_keypad_zone_report(
+                    *lastFrame[1], now, zone_updates, bypass_updates
+                )
+            return self.keypad_update_results(partition_updates, zone_updates, bypass_updates)
+        self._keypadFrameMisses += 1
+
+        dataList = data.split(",")
+        # Custom messages and alpha fields might contain unescaped commas, so we'll recombine them:
+        if len(dataList) > 5:
+            dataList[4] = ",".join(dataList[4:])
+            del dataList[5:]
+
         partitionNumber = int(dataList[0])
-        if not (partitionNumber in self._zoneTimers.keys()):
-            self._zoneTimers[partitionNumber] = {}
-        partition_updates.append(partitionNumber)
-        flags = IconLED_Flags()
-        flags.asShort = int(dataList[1], 16)
+        tracker = self._zoneTrackers.get(partitionNumber)
+        if tracker is None:
+            tracker = self._zoneTrackers[partitionNumber] = self.create_zone_tracker()
         try:
             user_zone_field = int(dataList[2])
         except ValueError:
             user_zone_field = None
-        beep_field = Beep_Flags()
-        beep_field.asByte = int(dataList[3], 16)
-        beep = evl_Virtual_Keypad_How_To_Beep.get(beep_field.beeps, "unknown")
-        armed_night = bool(beep_field.armed_night)
-        alpha = dataList[4]
-        partition_status = HoneywellClient.get_partition_state(flags, alpha)
-        zone_code = HoneywellClient.get_zone_report_type(flags, alpha)
-        prior_ready = self._alarmPanel.alarm_state["partition"][partitionNumber]["status"]["ready"]
-        prior_bypass = self._alarmPanel.alarm_state["partition"][partitionNumber]["status"][
-            "armed_bypass"
-        ]
-
-        # TODO "armed_bypass" is included in the state below but just passes the bypass flag.
-        # How is that used?
-        self._alarmPanel.alarm_state["partition"][partitionNumber]["status"].update(
-            {
-                "alarm": bool(flags.alarm),
-                "alarm_in_memory": bool(flags.alarm_in_memory),
-                "armed_away": bool(flags.armed_away),
-                "ac_present": bool(flags.ac_present),
-                "armed_bypass": bool(flags.bypass),
-                "chime": bool(flags.chime),
-                "armed_zero_entry_delay": bool(flags.armed_zero_entry_delay),
-                "alarm_fire_zone": bool(flags.alarm_fire_zone),
-                "trouble": bool(flags.system_trouble),
-                "ready": bool(flags.ready),
-                "fire": bool(flags.fire),
-                "armed_stay": bool(flags.armed_stay),
-                "alpha": alpha,
-                "beep": beep,
-                "armed_night": armed_night,
-            }
-        )
+        keypad = decode_keypad_update(dataList[1], dataList[3], dataList[4])
+        partition_status = keypad.partition_status
+        zone_code = keypad.zone_code
+        zones = self._alarmPanel.alarm_state.zones
+        status = self._alarmPanel.alarm_state["partition"][partitionNumber]["status"]
+        # A status restored from a snapshot doesn't count as the prior state
+        prior_ready = status["ready"] and not status.stale
+        prior_bypass = status["armed_bypass"]
+
+        changed = status.update(keypad.status)
+        zoneReport = None
 
         if (partition_status == "ready") and not prior_ready:
             # Clear all zones known to be in this partition
-            _LOGGER.debug(f"Clear partition {partitionNumber}")
-            for z in list(self._zoneTimers[partitionNumber]):
-                _LOGGER.debug(f"Timer {z} :: {self._zoneTimers[partitionNumber][z]} Closing")
-                timer = str.split(z, "|")
-                zone_updates.append(int(timer[0]))
-                if timer[1] == "state":
-                    self._alarmPanel.alarm_state["zone"][int(timer[0])]["status"].update(
-                        {"open": False, "fault": False}
-                    )
-                self._zoneTimers[partitionNumber].pop(z)
-
-        if prior_bypass and not bool(flags.bypass):
+            _LOGGER.debug("Clear partition %d", partitionNumber)
+            for zone, kind in tracker.clear():
+                _LOGGER.debug("Zone %d (%s) closing", zone, kind)
+                if kind == ZONE_REPORT_STATE and self.close_zone(zones, zone):
+                    zone_updates.append(zone)
+            # Zones restored as open from a snapshot aren't tracked, and the keypad
+            # hasn't reported them since, so they can't still be faulted either.
+            for zone in bit_positions(zones.stale & zones.bitmap(ZONE_OPEN)):
+                if self.close_zone(zones, zone):
+                    zone_updates.append(zone)
+
+        if prior_bypass and not keypad.bypass:
             # Partition has switched from bypassed to not bypassed, so clear bypass flags
             # TODO Need to know which bypassed zones are in which partition to handle this.
             # No zone timers for these - either maintain a list or add partition to zone status
             _LOGGER.debug("Clear bypassed zones")
 
-        if flags.not_used2 and flags.not_used3:
+        if keypad.partition_report:
             # Keypad update is giving partition status. Battery report applies to system battery
             _LOGGER.debug(
-                f"Keypad update is giving partition {partitionNumber} status. "
-                f"Partition: {partition_status} Zonecode: {zone_code}"
-            )
-            self._alarmPanel.alarm_state["partition"][partitionNumber]["status"].update(
-                {"bat_trouble": bool(flags.low_battery)}
+                "Keypad update is giving partition %d status. Partition: %s Zonecode: %s",
+                partitionNumber,
+                partition_status,
+                zone_code,
             )
+            changed += status.update({"bat_trouble": keypad.low_battery})
 
         elif (partition_status == "arming") and (zone_code == "notready"):
             # Keypad is counting down. Nothing to do
             # TODO Add entry_delay to %00 update handler
-            _LOGGER.debug(f"Keypad is counting down to arm partition {partitionNumber}.")
+            _LOGGER.debug("Keypad is counting down to arm partition %d.", partitionNumber)
 
-        elif user_zone_field is not None:
+        elif user_zone_field is not None and user_zone_field in zones:
             # Keypad is giving zone status. Update zone status and check zone timers
-            _LOGGER.debug(f"Keypad is giving zone status for partition {partitionNumber}.")
-
-            # Increment all existing zone timers by 1
-            for z in self._zoneTimers[partitionNumber]:
-                self._zoneTimers[partitionNumber][z] += 1
-
-            # Add a zone timer (if needed) of the appropriate type and update zone status
-            if zone_code in ["battery", "tamper"]:
-                # Battery or tamper report for a wireless zone. These are added to the keypad
-                # update queue separate from state changes, so need their own zone timers.
-                self._zoneTimers[partitionNumber][f"{user_zone_field}|{zone_code}"] = 1
-            elif zone_code == "bypass":
-                # Bypassed zones only show once in keypad updates and only clear when the
-                # partition is disarmed. No zone timer needed.
-                self._alarmPanel.alarm_state["zone"][user_zone_field]["bypassed"] = True
+            _LOGGER.debug("Keypad is giving zone status for partition %d.", partitionNumber)
+            zoneReport = (partitionNumber, user_zone_field, zone_code)
+            self.handle_keypad_zone_report(*zoneReport, now, zone_updates, bypass_updates)
+
+        self._lastKeypadFrames[partitionField] = (data, zoneReport)
+
+        _LOGGER.debug("%s", LazyJson(status))
+        if changed:
+            partition_updates[partitionNumber] = changed
+        return self.keypad_update_results(partition_updates, zone_updates, bypass_updates)
+
+    def handle_keypad_zone_report(
+        self, partitionNumber, user_zone_field, zone_code, now, zone_updates, bypass_updates
+    ):
+        """Update the state of a zone reported by a keypad update and close any zones the
+        keypad has stopped reporting."""
+        zones = self._alarmPanel.alarm_state.zones
+        tracker = self._zoneTrackers[partitionNumber]
+
+        # Age all of the zones being tracked by one keypad update
+        tracker.advance()
+
+        # Add a zone timer (if needed) of the appropriate type and update zone status
+        if zone_code in ["battery", "tamper"]:
+            # Battery or tamper report for a wireless zone. These are added to the keypad
+            # update queue separate from state changes, so need their own zone timers.
+            tracker.report(user_zone_field, zone_code)
+        elif zone_code == "bypass":
+            # Bypassed zones only show once in keypad updates and only clear when the
+            # partition is disarmed. No zone timer needed.
+            if zones.set_flag(user_zone_field, ZONE_BYPASSED, True):
                 bypass_updates.append(user_zone_field)
-            elif zone_code in ["alarm", "alarmcleared", "notready"]:
-                # Zone is open
+        elif zone_code in ["alarm", "alarmcleared", "notready"]:
+            # Zone is open
 
-                # Only update the last_fault time if the zone transitioned to a faulted state
-                current_status = self._alarmPanel.alarm_state["zone"][user_zone_field]["status"]
-                if not current_status["open"] and not current_status["fault"]:
-                    _LOGGER.debug(f"Setting last fault for {user_zone_field}: {now}")
-                    self._alarmPanel.alarm_state["zone"][user_zone_field]["last_fault"] = now
-
-                self._alarmPanel.alarm_state["zone"][user_zone_field]["status"].update(
-                    {"open": True, "fault": True}
-                )
-                self._zoneTimers[partitionNumber][f"{user_zone_field}|state"] = 1
+            # Only update the last_fault time if the zone transitioned to a faulted state
+            wasFaulted = zones.get_flag(user_zone_field, ZONE_OPEN) or zones.get_flag(
+                user_zone_field, ZONE_FAULT
+            )
+            if not wasFaulted:
+                _LOGGER.debug("Setting last fault for %d: %s", user_zone_field, now)
+                zones.last_fault[user_zone_field] = now
+
+            # A keypad fault report is authoritative so a zone dump shouldn't override it
+            zones.updated[user_zone_field] = now
+            openChanged = zones.set_flag(user_zone_field, ZONE_OPEN, True)
+            faultChanged = zones.set_flag(user_zone_field, ZONE_FAULT, True)
+            tracker.report(user_zone_field, ZONE_REPORT_STATE)
+            if openChanged or faultChanged:
                 zone_updates.append(user_zone_field)
 
-            # Check and kill any overdue timers
-            active_timers = len(self._zoneTimers[partitionNumber])
-            # TODO Is this the right margin to add?
-            max_timer = round(active_timers * 2 + 2, 0)
-            for z in list(self._zoneTimers[partitionNumber]):
-                if self._zoneTimers[partitionNumber][z] > max_timer:
-                    _LOGGER.debug(f"Timer {z} :: {self._zoneTimers[partitionNumber][z]} Closing")
-                    timer = str.split(z, "|")
-                    zone_updates.append(int(timer[0]))
-                    if timer[1] == "state":
-                        self._alarmPanel.alarm_state["zone"][int(timer[0])]["status"].update(
-                            {"open": False, "fault": False}
-                        )
-                    # else:
-                    # TODO Clear tamper/battery status
-                    self._zoneTimers[partitionNumber].pop(z)
-                else:
-                    _LOGGER.debug(f"Timer {z} :: {self._zoneTimers[partitionNumber][z]}")
-            _LOGGER.debug(f"There are ({active_timers}) active timers")
-
-        _LOGGER.debug(
-            json.dumps(self._alarmPanel.alarm_state["partition"][partitionNumber]["status"])
-        )
+        # Close any zones which the keypad has stopped reporting
+        active_timers = len(tracker)
+        for zone, kind in tracker.expire():
+            _LOGGER.debug("Zone %d (%s) closing", zone, kind)
+            if kind == ZONE_REPORT_RESTORED:
+                # Unless something has reported the zone since it was restored
+                closing = zones.is_stale(zone)
+            else:
+                closing = kind == ZONE_REPORT_STATE
+            if closing and self.close_zone(zones, zone):
+                zone_updates.append(zone)
+            # else:
+            # TODO Clear tamper/battery status
+        _LOGGER.debug("There are (%d) active timers", active_timers)
+
+    def create_zone_tracker(self) -> ZoneFaultTracker:
+        """A tracker for the zones shown by a partition's keypad.  Zones restored as open
+        from a snapshot are tracked from the start so that they close once the keypad has
+        cycled through its faults without showing them."""
+        tracker = ZoneFaultTracker()
+        zones = self._alarmPanel.alarm_state.zones
+        for zone in bit_positions(zones.stale & zones.bitmap(ZONE_OPEN)):
+            tracker.report(zone, ZONE_REPORT_RESTORED)
+        return tracker
+
+    @staticmethod
+    def keypad_update_results(partition_updates, zone_updates, bypass_updates) -> dict:
         results = {}
         if partition_updates:
             results[STATE_CHANGE_PARTITION] = partition_updates
@@ -337,6 +439,13 @@ class HoneywellClient(EnvisalinkClient):
             results[STATE_CHANGE_ZONE_BYPASS] = bypass_updates
         return results
 
+    @staticmethod
+    def close_zone(zones, zoneNumber) -> bool:
+        """Mark a zone as closed; returns True if that changed its state."""
+        openChanged = zones.set_flag(zoneNumber, ZONE_OPEN, False)
+        faultChanged = zones.set_flag(zoneNumber, ZONE_FAULT, False)
+        return openChanged or faultChanged
+
     def handle_zone_state_change(self, code, data):
         """Handle when the envisalink sends us a zone change."""
         return None
@@ -363,27 +472,52 @@ class HoneywellClient(EnvisalinkClient):
                     {"last_armed_by_user": zoneOrUser}
                 )
 
-        _LOGGER.debug("Event Type is " + eventType)
-        _LOGGER.debug("CID Type is " + cidEvent["type"])
-        _LOGGER.debug("CID Description is " + cidEvent["label"])
-        _LOGGER.debug("Partition is " + str(partitionNumber))
-        _LOGGER.debug(cidEvent["type"] + " value is " + str(zoneOrUser))
+        if (journal := self._alarmPanel.journal) is not None:
+            if cidEvent["type"] == "zone":
+                journal.record_cid(
+                    cidEventInt, eventTypeInt, partitionNumber, zone=zoneOrUser
+                )
+            else:
+                journal.record_cid(
+                    cidEventInt, eventTypeInt, partitionNumber, user=zoneOrUser
+                )
+
+        _LOGGER.debug("Event Type is %s", eventType)
+        _LOGGER.debug("CID Type is %s", cidEvent["type"])
+        _LOGGER.debug("CID Description is %s", cidEvent["label"])
+        _LOGGER.debug("Partition is %d", partitionNumber)
+        _LOGGER.debug("%s value is %d", cidEvent["type"], zoneOrUser)
 
         return cidEvent
 
     def is_zone_open_from_zonedump(self, zone, ticks) -> bool:
         now = time.time()
         last_zone_dump = now - self._alarmPanel.zone_timer_interval
-        last_update = self._alarmPanel.alarm_state["zone"][zone]["updated"]
+        zones = self._alarmPanel.alarm_state.zones
+        if zone not in zones:
+            return False
 
-        if last_zone_dump < last_update:
+        if last_zone_dump < zones.updated[zone]:
             # This zone has been explicitly updated since the last zone timer dump so honor
             # its current state
-            return self._alarmPanel.alarm_state["zone"][zone]["status"]["open"]
+            return zones.get_flag(zone, ZONE_OPEN)
 
         # The envisalink never seems to report back exactly 0 seconds for an open zone.
         # It always seems to be 1-3 ticks.  So 3 ticks or less will be considered open.
-        return ticks <= 3
+        return ticks <= _ZONE_DUMP_OPEN_TICKS
+
+    def zone_dump_open_bits(self, ticks, count) -> int:
+        zones = self._alarmPanel.alarm_state.zones
+        last_zone_dump = time.time() - self._alarmPanel.zone_timer_interval
+        updated = zones.updated
+        dumpOpen = sum(
+            1 << zone
+            for zone, zoneTicks in enumerate(ticks[:count], 1)
+            if zoneTicks <= _ZONE_DUMP_OPEN_TICKS
+        )
+        # Zones explicitly updated since the last zone timer dump keep their current state
+        recent = sum(1 << zone for zone in range(1, count + 1) if last_zone_dump < updated[zone])
+        return (dumpOpen & ~recent) | (zones.bitmap(ZONE_OPEN) & recent)
 
     def get_partition_state(flags, alpha):
         if bool(flags.alarm) or bool(flags.alarm_fire_zone) or bool(flags.fire):
@@ -428,4 +562,42 @@ class HoneywellClient(EnvisalinkClient):
     def handle_debug_info(self, code, data):
         """Handle when the envisalink sends a debug message indicating that it received
         a malformed message from the panel."""
-        _LOGGER.debug(f'EVL received a malformed message from the panel; code={code} data={data}')
+        _LOGGER.debug("EVL received a malformed message from the panel; code=%s data=%s", code, data)
+
+
+@lru_cache(maxsize=_KEYPAD_DECODE_CACHE_SIZE)
+def decode_keypad_update(iconField, beepField, alpha) -> KeypadUpdate:
+    """Decode the flag, beep and alpha fields of a %00 keypad update.  The results are
+    cached since the keypad sends the same few combinations over and over."""
+    flags = IconLED_Flags()
+    flags.asShort = int(iconField, 16)
+    beep_field = Beep_Flags()
+    beep_field.asByte = int(beepField, 16)
+
+    # TODO "armed_bypass" is included in the state below but just passes the bypass flag.
+    # How is that used?
+    status = (
+        ("alarm", bool(flags.alarm)),
+        ("alarm_in_memory", bool(flags.alarm_in_memory)),
+        ("armed_away", bool(flags.armed_away)),
+        ("ac_present", bool(flags.ac_present)),
+        ("armed_bypass", bool(flags.bypass)),
+        ("chime", bool(flags.chime)),
+        ("armed_zero_entry_delay", bool(flags.armed_zero_entry_delay)),
+        ("alarm_fire_zone", bool(flags.alarm_fire_zone)),
+        ("trouble", bool(flags.system_trouble)),
+        ("ready", bool(flags.ready)),
+        ("fire", bool(flags.fire)),
+        ("armed_stay", bool(flags.armed_stay)),
+        ("alpha", alpha),
+        ("beep", evl_Virtual_Keypad_How_To_Beep.get(beep_field.beeps, "unknown")),
+        ("armed_night", bool(beep_field.armed_night)),
+    )
+    return KeypadUpdate(
+        status=status,
+        partition_status=HoneywellClient.get_partition_state(flags, alpha),
+        zone_code=HoneywellClient.get_zone_report_type(flags, alpha),
+        bypass=bool(flags.bypass),
+        partition_report=bool(flags.not_used2 and flags.not_used3),
+        low_battery=bool(flags.low_battery),
+    )
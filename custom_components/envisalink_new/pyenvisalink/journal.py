@@ -0,0 +1,297 @@
+"""Append-only journal of the events decoded from the panel, kept in a fixed size ring of
+binary records which is memory mapped from a file (or anonymous memory)."""
+
+import logging
+import mmap
+import os
+import struct
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import NamedTuple
+
+from .const import (
+    STATE_CHANGE_KEYPAD,
+    STATE_CHANGE_PARTITION,
+    STATE_CHANGE_ZONE,
+    STATE_CHANGE_ZONE_BYPASS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Kinds of journal record
+JOURNAL_ZONE = 1
+JOURNAL_PARTITION = 2
+JOURNAL_CID = 3
+JOURNAL_COMMAND = 4
+
+# The partition status keys recorded (as bit n of the value) in a partition record
+JOURNAL_PARTITION_FLAGS = (
+    "ac_present",
+    "beep",
+    "armed_bypass",
+    "entry_delay",
+    "exit_delay",
+    "ready",
+    "bat_trouble",
+    "trouble",
+    "fire",
+    "panic",
+    "alarm",
+    "alarm_fire_zone",
+    "alarm_in_memory",
+    "armed_away",
+    "armed_stay",
+    "armed_zero_entry_delay",
+    "armed_night",
+    "bell_trouble",
+    "zone_low_battery",
+)
+
+# magic, format version, record size, capacity, sequence number of the next record
+_HEADER = struct.Struct("<4sHHIQ")
+_HEADER_SIZE = 32
+_MAGIC = b"EVLJ"
+_VERSION = 1
+# time, kind, partition, zone, user, code, value, changed
+_RECORD = struct.Struct("<dBBHHHII")
+_TIME = struct.Struct("<d")
+_HEAD = struct.Struct("<Q")
+_HEAD_OFFSET = _HEADER.size - _HEAD.size
+
+
+class JournalEvent(NamedTuple):
+    """A journal record.
+
+    zone:      zone records carry the zone's flags (bit n = flag n from alarm_state) in
+               value and the flags which changed in changed.
+    partition: the JOURNAL_PARTITION_FLAGS of the partition in value and changed.
+    CID:       the CID event code in code and its qualifier in value, with the zone or
+               user it refers to in zone or user.
+    command:   the command code in code and 1 (succeeded) or 0 in value.  The code is the
+               number the command is written as in the panel's protocol, which is
+               decimal for DSC and hex for Honeywell and UNO.
+    """
+
+    time: float
+    kind: int
+    partition: int
+    zone: int
+    user: int
+    code: int
+    value: int
+    changed: int
+
+
+class EventJournal:
+    """Ring of the last capacity events.  Record n lives in slot n % capacity and the
+    header holds the sequence number of the next record, so the live records are always
+    the capacity records before it.  Record times never go backwards so the ring can be
+    searched by time, and the records for each zone are indexed by sequence number."""
+
+    __slots__ = (
+        "path",
+        "capacity",
+        "_map",
+        "_head",
+        "_lastTime",
+        "_zones",
+        "_zoneFlags",
+        "_partitionFlags",
+    )
+
+    def __init__(self, buffer, capacity, path=None):
+        self.path = path
+        self.capacity = capacity
+        self._map = buffer
+        self._head = 0
+        self._lastTime = 0.0
+        # zone -> sequence numbers of its records, and the state last journaled for each
+        # zone and partition so only real transitions are recorded
+        self._zones = {}
+        self._zoneFlags = {}
+        self._partitionFlags = {}
+
+    @classmethod
+    def open(cls, path=None, capacity=4096) -> "EventJournal":
+        """Map the journal file at path, creating it (or starting over if it was made
+        with a different capacity or is damaged).  Without a path the journal is kept in
+        anonymous memory.  This blocks so should be run in an executor."""
+        size = _HEADER_SIZE + _RECORD.size * capacity
+        if path is None:
+            journal = cls(mmap.mmap(-1, size), capacity)
+            journal._write_header()
+            return journal
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fresh = os.fstat(fd).st_size != size
+            if fresh:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+            buffer = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+        journal = cls(buffer, capacity, path)
+        if fresh or not journal._load():
+            buffer[:] = bytes(size)
+            journal._head = 0
+            journal._write_header()
+        return journal
+
+    def _write_header(self):
+        _HEADER.pack_into(
+            self._map, 0, _MAGIC, _VERSION, _RECORD.size, self.capacity, self._head
+        )
+
+    def _load(self) -> bool:
+        """Pick up the records of an existing journal file."""
+        magic, version, recordSize, capacity, head = _HEADER.unpack_from(self._map)
+        if (
+            magic != _MAGIC
+            or version != _VERSION
+            or recordSize != _RECORD.size
+            or capacity != self.capacity
+        ):
+            _LOGGER.warning("Starting a new event journal in '%s'", self.path)
+            return False
+
+        self._head = head
+        for seq in range(self._first(), head):
+            event = self._read(seq)
+            self._lastTime = event.time
+            self._index(seq, event.kind, event.zone)
+            if event.kind == JOURNAL_ZONE:
+                self._zoneFlags[event.zone] = event.value
+            elif event.kind == JOURNAL_PARTITION:
+                self._partitionFlags[event.partition] = event.value
+        return True
+
+    def __len__(self) -> int:
+        return self._head - self._first()
+
+    def _first(self) -> int:
+        return max(0, self._head - self.capacity)
+
+    def _offset(self, seq) -> int:
+        return _HEADER_SIZE + (seq % self.capacity) * _RECORD.size
+
+    def _read(self, seq) -> JournalEvent:
+        return JournalEvent._make(_RECORD.unpack_from(self._map, self._offset(seq)))
+
+    def _time_at(self, seq) -> float:
+        return _TIME.unpack_from(self._map, self._offset(seq))[0]
+
+    def _index(self, seq, kind, zone):
+        if zone and kind in (JOURNAL_ZONE, JOURNAL_CID):
+            seqs = self._zones.get(zone)
+            if seqs is None:
+                seqs = self._zones[zone] = deque()
+            seqs.append(seq)
+            # Drop the records which have been overwritten
+            first = self._first()
+            while seqs[0] < first:
+                seqs.popleft()
+
+    def append(self, kind, partition=0, zone=0, user=0, code=0, value=0, changed=0):
+        """Add a record to the journal, overwriting the oldest one once it is full."""
+        now = time.time()
+        # Keep the ring ordered by time even if the clock is stepped back
+        if now < self._lastTime:
+            now = self._lastTime
+        self._lastTime = now
+
+        seq = self._head
+        _RECORD.pack_into(
+            self._map,
+            self._offset(seq),
+            now,
+            kind,
+            partition,
+            zone,
+            user,
+            code,
+            value,
+            changed,
+        )
+        self._head = seq + 1
+        _HEAD.pack_into(self._map, _HEAD_OFFSET, self._head)
+        self._index(seq, kind, zone)
+
+    def record_state_changes(self, alarmState, changeType, values):
+        """Record the zones or partitions from a state change update whose flags have
+        changed since they were last journaled."""
+        if changeType in (STATE_CHANGE_ZONE, STATE_CHANGE_ZONE_BYPASS):
+            zones = alarmState.zones
+            lastFlags = self._zoneFlags
+            for zone in values:
+                flags = zones.flags(zone)
+                changed = flags ^ lastFlags.get(zone, 0)
+                if changed:
+                    lastFlags[zone] = flags
+                    self.append(JOURNAL_ZONE, zone=zone, value=flags, changed=changed)
+        elif changeType in (STATE_CHANGE_PARTITION, STATE_CHANGE_KEYPAD):
+            partitions = alarmState.partitions
+            lastFlags = self._partitionFlags
+            for partition in values:
+                status = partitions[partition].status
+                flags = 0
+                for bit, key in enumerate(JOURNAL_PARTITION_FLAGS):
+                    if status[key]:
+                        flags |= 1 << bit
+                changed = flags ^ lastFlags.get(partition, 0)
+                if changed:
+                    lastFlags[partition] = flags
+                    self.append(
+                        JOURNAL_PARTITION, partition=partition, value=flags, changed=changed
+                    )
+
+    def record_cid(self, code, qualifier, partition, zone=0, user=0):
+        self.append(
+            JOURNAL_CID,
+            partition=partition,
+            zone=zone,
+            user=user,
+            code=code,
+            value=qualifier,
+        )
+
+    def record_command(self, cmd, succeeded, base=16):
+        """Record the result of a command; base is the base its code is written in."""
+        try:
+            code = int(cmd, base)
+        except ValueError:
+            code = 0
+        self.append(JOURNAL_COMMAND, code=code, value=1 if succeeded else 0)
+
+    def events_since(self, since, kind=None) -> list:
+        """The events recorded at or after the given time, oldest first."""
+        first = self._first()
+        seq = first + bisect_left(range(first, self._head), since, key=self._time_at)
+        events = [self._read(s) for s in range(seq, self._head)]
+        if kind is not None:
+            events = [event for event in events if event.kind == kind]
+        return events
+
+    def zone_history(self, zone, n=10) -> list:
+        """The last n zone and CID events for a zone, oldest first."""
+        seqs = self._zones.get(zone)
+        if not seqs:
+            return []
+        first = self._first()
+        while seqs and seqs[0] < first:
+            seqs.popleft()
+        start = max(0, len(seqs) - n)
+        return [self._read(seqs[i]) for i in range(start, len(seqs))]
+
+    def flush(self):
+        """Write the journal out to its file.  This blocks."""
+        if self.path:
+            self._map.flush()
+
+    def close(self):
+        """Flush and unmap the journal.  This blocks."""
+        if not self._map.closed:
+            self.flush()
+            self._map.close()
@@ -0,0 +1,86 @@
+"""Logging helpers for the pyenvisalink package.
+
+All of the helpers here defer any formatting work until a log record is actually going
+to be emitted so that the receive path costs nothing extra when DEBUG is disabled."""
+
+import json
+import logging
+import time
+from collections.abc import Mapping
+
+
+class LazyJson:
+    """Wraps a value so that it is only JSON encoded when the log record is formatted."""
+
+    __slots__ = ("_value",)
+
+    def __init__(self, value):
+        self._value = value
+
+    def __str__(self) -> str:
+        return json.dumps(self._value, default=_json_default)
+
+
+def _json_default(value):
+    # The alarm state is made up of Mapping views rather than plain dicts
+    if isinstance(value, Mapping):
+        return dict(value)
+    return str(value)
+
+
+class WireTrace:
+    """Sampled and rate-limited tracing of the frames exchanged with the EVL, logged at
+    DEBUG on the given logger.
+
+    Only one of every `sampleRate` frames is logged and no more than `maxPerSecond` frames
+    are logged in any one second (0 disables the limit).  Frames dropped because of the
+    rate limit are counted and reported once the limit resets."""
+
+    def __init__(self, logger, sampleRate=1, maxPerSecond=0):
+        self._logger = logger
+        self._sampleRate = max(1, int(sampleRate))
+        self._maxPerSecond = maxPerSecond
+        self._frameCount = 0
+        self._windowStart = 0.0
+        self._windowCount = 0
+        self._suppressed = 0
+
+    def enabled(self) -> bool:
+        return self._logger.isEnabledFor(logging.DEBUG)
+
+    def rx(self, buffer, start=0, end=None):
+        """Trace a frame received from the EVL.  The frame is only copied out of the
+        receive buffer and decoded if it is actually going to be logged."""
+        if self._logger.isEnabledFor(logging.DEBUG) and self._should_trace():
+            frame = bytes(buffer[start:end]).decode("ascii", "replace")
+            self._logger.debug("RX < %s", frame)
+
+    def tx(self, data):
+        """Trace a frame sent to the EVL."""
+        if self._logger.isEnabledFor(logging.DEBUG) and self._should_trace():
+            self._logger.debug("TX > %s", data)
+
+    def _should_trace(self) -> bool:
+        self._frameCount += 1
+        if self._frameCount % self._sampleRate:
+            return False
+
+        if not self._maxPerSecond:
+            return True
+
+        now = time.monotonic()
+        if now - self._windowStart >= 1.0:
+            if self._suppressed:
+                self._logger.debug(
+                    "%d frames not traced due to rate limit", self._suppressed
+                )
+            self._windowStart = now
+            self._windowCount = 0
+            self._suppressed = 0
+
+        if self._windowCount >= self._maxPerSecond:
+            self._suppressed += 1
+            return False
+
+        self._windowCount += 1
+        return True
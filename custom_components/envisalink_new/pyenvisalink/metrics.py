@@ -0,0 +1,134 @@
+"""Lightweight latency metrics for the pyenvisalink package."""
+
+from bisect import bisect_left
+
+# Upper bounds (in seconds) of the latency histogram buckets.  Anything slower than the
+# last bound lands in an overflow bucket.
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    """Fixed bucket histogram of latencies measured in seconds."""
+
+    __slots__ = ("_bounds", "_counts", "count", "total", "min", "max")
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, seconds):
+        self._counts[bisect_left(self._bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def percentile(self, percent):
+        """Estimate a percentile as the upper bound of the bucket it falls in."""
+        if not self.count:
+            return None
+        target = self.count * percent / 100
+        seen = 0
+        for idx, bucketCount in enumerate(self._counts):
+            seen += bucketCount
+            if seen >= target:
+                return self._bounds[idx] if idx < len(self._bounds) else self.max
+        return self.max
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.mean(),
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "buckets": dict(zip(["%g" % b for b in self._bounds] + ["+Inf"], self._counts)),
+        }
+
+
+class CommandMetrics:
+    """Counters and latency histograms for a single command code."""
+
+    __slots__ = (
+        "queueWait",
+        "wireTime",
+        "sent",
+        "succeeded",
+        "failed",
+        "retries",
+        "timeouts",
+        "retryReasons",
+        "failureReasons",
+    )
+
+    def __init__(self):
+        self.queueWait = LatencyHistogram()
+        self.wireTime = LatencyHistogram()
+        self.sent = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.retryReasons = {}
+        self.failureReasons = {}
+
+    def record_retry(self, reason):
+        self.retries += 1
+        self.retryReasons[reason] = self.retryReasons.get(reason, 0) + 1
+
+    def record_failure(self, reason):
+        self.failed += 1
+        self.failureReasons[reason] = self.failureReasons.get(reason, 0) + 1
+
+    def snapshot(self) -> dict:
+        return {
+            "sent": self.sent,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "retry_reasons": dict(self.retryReasons),
+            "failure_reasons": dict(self.failureReasons),
+            "queue_wait": self.queueWait.snapshot(),
+            "wire_time": self.wireTime.snapshot(),
+        }
+
+
+class ZoneDumpMetrics:
+    """Counters for the zone timer dumps used to reconcile zone state."""
+
+    __slots__ = ("requested", "skipped", "received", "corrections", "correctingDumps")
+
+    def __init__(self):
+        self.requested = 0
+        self.skipped = 0
+        self.received = 0
+        # Number of zones whose state was corrected by a dump, and the number of dumps
+        # which corrected at least one zone
+        self.corrections = 0
+        self.correctingDumps = 0
+
+    def record_dump(self, corrected):
+        self.received += 1
+        if corrected:
+            self.corrections += corrected
+            self.correctingDumps += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "requested": self.requested,
+            "skipped": self.skipped,
+            "received": self.received,
+            "corrections": self.corrections,
+            "correcting_dumps": self.correctingDumps,
+        }
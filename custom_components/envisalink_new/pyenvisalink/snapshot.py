@@ -0,0 +1,100 @@
+"""Compact binary snapshots of the alarm state so it can be restored after a restart."""
+
+import json
+import struct
+import sys
+from array import array
+
+from .alarm_state import ZONE_BYPASSED, PartitionStatus
+
+# magic, format version, zone count, partition count, time saved
+_HEADER = struct.Struct("<4sHHHd")
+_MAGIC = b"EVLS"
+_VERSION = 1
+_FLAG_COUNT = ZONE_BYPASSED + 1
+_LENGTH = struct.Struct("<H")
+_PARTITION_DEFAULTS = dict(PartitionStatus())
+
+
+def encode_snapshot(alarmState, savedAt) -> bytes:
+    """Serialize the alarm state.
+
+    The zone flags are written as one little endian bitmap per flag followed by the
+    last fault times as little endian doubles.  The partition status holds a mix of
+    strings, numbers and panel specific keys so each partition is written as a length
+    prefixed JSON object of the keys which differ from their defaults; there are only
+    ever a handful of them."""
+    zones = alarmState.zones
+    bitmapSize = zones.count // 8 + 1
+    parts = [_HEADER.pack(_MAGIC, _VERSION, zones.count, len(alarmState.partitions), savedAt)]
+    for flag in range(_FLAG_COUNT):
+        parts.append(zones.bitmap(flag).to_bytes(bitmapSize, "little"))
+
+    lastFault = zones.last_fault
+    if sys.byteorder != "little":
+        lastFault = array("d", lastFault)
+        lastFault.byteswap()
+    parts.append(lastFault.tobytes())
+
+    for partition in alarmState.partitions.values():
+        changed = {
+            key: value
+            for key, value in partition.status.items()
+            if key not in _PARTITION_DEFAULTS or _PARTITION_DEFAULTS[key] != value
+        }
+        status = json.dumps(changed, separators=(",", ":")).encode()
+        parts.append(_LENGTH.pack(len(status)))
+        parts.append(status)
+    return b"".join(parts)
+
+
+def decode_snapshot(alarmState, data) -> float | None:
+    """Restore a snapshot made by encode_snapshot into the alarm state, marking all of
+    it as stale until the panel reports it again.  Returns the time the snapshot was
+    saved, or None (leaving the alarm state untouched) if it doesn't match the layout
+    of the alarm state or is damaged."""
+    zones = alarmState.zones
+    try:
+        magic, version, zoneCount, partitionCount, savedAt = _HEADER.unpack_from(data)
+        if (
+            magic != _MAGIC
+            or version != _VERSION
+            or zoneCount != zones.count
+            or partitionCount != len(alarmState.partitions)
+        ):
+            return None
+
+        offset = _HEADER.size
+        bitmapSize = zoneCount // 8 + 1
+        bitmaps = []
+        for _ in range(_FLAG_COUNT):
+            bitmaps.append(int.from_bytes(data[offset : offset + bitmapSize], "little"))
+            offset += bitmapSize
+
+        lastFault = array("d")
+        size = lastFault.itemsize * (zoneCount + 1)
+        lastFault.frombytes(data[offset : offset + size])
+        if len(lastFault) != zoneCount + 1:
+            return None
+        if sys.byteorder != "little":
+            lastFault.byteswap()
+        offset += size
+
+        statuses = []
+        for _ in range(partitionCount):
+            (length,) = _LENGTH.unpack_from(data, offset)
+            offset += _LENGTH.size
+            statuses.append(json.loads(data[offset : offset + length]))
+            offset += length
+    except (struct.error, ValueError):
+        return None
+
+    for flag, bits in enumerate(bitmaps):
+        zones.set_bitmap(flag, bits)
+    zones.last_fault[:] = lastFault
+    zones.mark_stale()
+
+    for partition, status in zip(alarmState.partitions.values(), statuses):
+        partition.status.update(status)
+    alarmState.mark_partitions_stale()
+    return savedAt
@@ -0,0 +1,21 @@
+"""Shared fixtures for the pyenvisalink tests.
+
+The tests import the library as a top level package, the same way test_harness.py does,
+so they can run without Home Assistant:
+
+    cd custom_components/envisalink_new
+    python -m pytest --rootdir=pyenvisalink/tests pyenvisalink/tests
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from pyenvisalink.fake_evl import build_panel  # noqa: E402
+
+
+@pytest.fixture
+def make_panel():
+    return build_panel
@@ -0,0 +1,35 @@
+"""Starting an alarm panel against a fake EVL."""
+import asyncio
+
+import pytest
+
+from pyenvisalink.alarm_state import ZONE_OPEN
+from pyenvisalink.const import PANEL_TYPE_DSC
+from pyenvisalink.fake_evl import FakeEvl, dsc_frame
+
+
+@pytest.mark.parametrize(
+    "version, maxZones, count",
+    (("3", None, 64), ("4", None, 128), ("3", 16, 16), ("4", 100, 100), ("3", 100, 64)),
+)
+def test_zone_store_sized_to_zones_in_use(make_panel, version, maxZones, count):
+    async def run():
+        evl = FakeEvl(PANEL_TYPE_DSC)
+        port = await evl.start()
+        panel = make_panel(PANEL_TYPE_DSC, port, maxZones=maxZones)
+        panel.envisalink_version = version
+        assert await panel.start() == panel.ConnectionResult.SUCCESS
+        assert panel.alarm_state.zones.count == count
+        assert len(panel.alarm_state["zone"]) == count
+
+        # Zones beyond the ones tracked are ignored
+        client = panel._client
+        for zone in (count, count + 1):
+            frame = dsc_frame("609", "%03d" % zone)
+            client.process_frame(frame, 0, len(frame))
+        assert panel.alarm_state.zones.bitmap(ZONE_OPEN) == 1 << count
+
+        await panel.stop()
+        await evl.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,185 @@
+"""Every caller waiting on the command queue must be released exactly once, whichever way
+its commands complete."""
+import asyncio
+from collections import Counter
+
+from pyenvisalink.const import (
+    PANEL_TYPE_HONEYWELL,
+    PRIORITY_MAINTENANCE,
+    PRIORITY_USER_ACTION,
+)
+from pyenvisalink.fake_evl import FakeEvl
+from pyenvisalink.honeywell_client import HoneywellClient
+
+
+def count_completions(client) -> Counter:
+    """Count the times each operation is completed."""
+    completions = Counter()
+    recordCompletion = client.record_completion
+
+    def record_completion(op):
+        completions[op] += 1
+        recordCompletion(op)
+
+    client.record_completion = record_completion
+    return completions
+
+
+def count_results(batch) -> list:
+    """Record every result the batch future resolves with."""
+    results = []
+    batch.future.add_done_callback(lambda future: results.append(future.result()))
+    return results
+
+
+async def start_client(make_panel, **kwargs):
+    """A logged in client whose commands are recorded rather than sent."""
+    client = HoneywellClient(make_panel(PANEL_TYPE_HONEYWELL, **kwargs))
+    client._loggedin = True
+    sent = []
+
+    async def send_command(cmd, data, logData=None):
+        sent.append(cmd)
+
+    client.send_command = send_command
+    task = asyncio.get_running_loop().create_task(client.process_command_queue())
+    return client, sent, task
+
+
+async def stop_client(client, task):
+    client._shutdown = True
+    client._commandEvent.set()
+    await task
+
+
+def test_deadline_expiry_releases_every_caller(make_panel):
+    class SilentEvl(FakeEvl):
+        def respond(self, code, data):
+            return None
+
+    async def run():
+        evl = SilentEvl(PANEL_TYPE_HONEYWELL)
+        port = await evl.start()
+        panel = make_panel(PANEL_TYPE_HONEYWELL, port, commandTimeout=0.2)
+        assert await panel.start() == panel.ConnectionResult.SUCCESS
+        client = panel._client
+        completions = count_completions(client)
+
+        results = await asyncio.wait_for(
+            asyncio.gather(*[client.queue_command("00", "") for _ in range(20)]), 5
+        )
+        assert results == [False] * 20
+        assert len(completions) == 20
+        assert set(completions.values()) == {1}
+        reasons = Counter(op.failureReason for op in completions)
+        assert reasons == {"Timeout": 1, "Disconnected": 19}
+        assert not client._inFlight and not any(client._commandQueues)
+
+        await panel.stop()
+        await evl.stop()
+
+    asyncio.run(run())
+
+
+def test_fail_all_operations_releases_every_caller_once(make_panel):
+    async def run():
+        client, sent, task = await start_client(make_panel)
+        completions = count_completions(client)
+
+        commands = [{"cmd": "03", "data": str(n)} for n in range(3)]
+        batches = [client.queue_batch(commands)]
+        batches += [client.queue_batch(commands, priority=PRIORITY_MAINTENANCE)]
+        batches += [client.queue_command("00", str(n)) for n in range(50)]
+        waiters = [asyncio.ensure_future(batch) for batch in batches]
+
+        # Let the first batch be partly sent, with one command waiting on a retry
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert len(client._inFlight) == 1
+        client.command_succeeded("03")
+        await asyncio.sleep(0)
+        client.command_failed(retry=True)
+
+        client.fail_all_operations()
+        client.fail_all_operations()
+        # A late response for a command which has already been failed is ignored
+        client.command_succeeded("03")
+
+        done = await asyncio.wait_for(asyncio.gather(*waiters), 5)
+        assert [batch.succeeded for batch in done[:2]] == [False, False]
+        assert done[2:] == [False] * 50
+        assert len(completions) == 3 + 3 + 50
+        assert set(completions.values()) == {1}
+        assert [op.failureReason for op in completions].count("Disconnected") == 55
+        assert not client._inFlight and not any(client._commandQueues)
+
+        await stop_client(client, task)
+
+    asyncio.run(run())
+
+
+def test_batch_future_resolves_once(make_panel):
+    async def run():
+        client, sent, task = await start_client(make_panel)
+        completions = count_completions(client)
+
+        commands = [{"cmd": "03", "data": str(n)} for n in range(3)]
+        ok = asyncio.ensure_future(client.queue_batch(commands))
+        aborted = asyncio.ensure_future(client.queue_batch(commands, abortOnFailure=True))
+        await asyncio.sleep(0)
+
+        # The first batch only resolves once its last command completes
+        for n in range(3):
+            await asyncio.sleep(0)
+            assert not ok.done()
+            client.command_succeeded("03")
+        await asyncio.sleep(0)
+        batch = await ok
+        assert batch.succeeded
+        results = count_results(batch)
+
+        # A failure aborts the rest of the second batch without sending it
+        client.command_succeeded("03")
+        await asyncio.sleep(0)
+        client.command_failed()
+        batch = await asyncio.wait_for(aborted, 5)
+        assert not batch.succeeded
+        assert sent == ["03"] * 5
+        State = client.Operation.State
+        states = [op.state for op in batch.operations]
+        assert states == [State.SUCCEEDED, State.FAILED, State.FAILED]
+        assert batch.operations[-1].failureReason == "Aborted"
+
+        # Nothing left to complete, so stray responses can't resolve either batch again
+        client.command_succeeded("03")
+        client.command_failed()
+        client.fail_all_operations()
+        await asyncio.sleep(0)
+        assert results == [True]
+        assert len(completions) == 6
+        assert set(completions.values()) == {1}
+
+        await stop_client(client, task)
+
+    asyncio.run(run())
+
+
+def test_batch_result_is_its_last_operation_in_any_completion_order(make_panel):
+    async def run():
+        client = HoneywellClient(make_panel(PANEL_TYPE_HONEYWELL))
+        State = client.Operation.State
+        commands = [{"cmd": "03", "data": str(n)} for n in range(3)]
+        orders = ((State.FAILED, State.SUCCEEDED), (State.SUCCEEDED, State.FAILED))
+        for first, last in orders:
+            pending = asyncio.ensure_future(client.queue_batch(commands))
+            await asyncio.sleep(0)
+            ops = list(client._commandQueues[PRIORITY_USER_ACTION])
+
+            # The last operation completes before the others, as it can when pipelined
+            client.complete_operation(ops[2], last)
+            client.complete_operation(ops[0], first)
+            client.complete_operation(ops[1], State.SUCCEEDED)
+            batch = await asyncio.wait_for(pending, 5)
+            assert batch.succeeded == (last == State.SUCCEEDED)
+
+    asyncio.run(run())
@@ -0,0 +1,227 @@
+"""The in place frame parsers and the buffered transport must hand the handlers exactly
+what the original string based parsers and the stream reader path did."""
+import asyncio
+import random
+import re
+
+import pytest
+
+from pyenvisalink.const import PANEL_TYPE_DSC, PANEL_TYPE_HONEYWELL, PANEL_TYPE_UNO
+from pyenvisalink.dsc_client import DSCClient
+from pyenvisalink.envisalink_base_client import EnvisalinkProtocol
+from pyenvisalink.fake_evl import FakeEvl, dsc_frame
+from pyenvisalink.honeywell_client import HoneywellClient
+from pyenvisalink.uno_client import UnoClient
+
+HONEYWELL_LINES = [
+    b"%00,01,1C08,08,00,****DISARMED****  Ready to Arm  $\r\n",
+    b"%00,01,0008,12,00,FAULT 12 FRONT DOOR              $\r\n",
+    b"%00,02,0008,14,00,FAULT 14 BACK DOOR               $\r\n",
+    b"%00,01,0008,12,00,FAULT 12 FRONT DOOR              $\r\n",
+    b"%00,01,8008,07,00,BYPAS 07 GARAGE                  $\r\n",
+    b"%02,0100000000000000$\r\n",
+    b"%03,11300100305$\r\n",
+    b"%03,34010100002$\r\n",
+    b"%00,01,1C08,08,00,****DISARMED****  Ready to Arm  $\r\n",
+]
+UNO_LINES = [
+    b"%01,0C00000000000000$\r\n",
+    b"%04,0200000000000000$\r\n",
+    b"%02,0100000000000000$\r\n",
+    b"%06,0000000000000000$\r\n",
+    b"%01,0400000000000000$\r\n",
+    b"%04,0000000000000000$\r\n",
+]
+DSC_LINES = [
+    dsc_frame("609", "001"),
+    dsc_frame("609", "012"),
+    b"12:34:56 " + dsc_frame("610", "001"),
+    dsc_frame("650", "1"),
+    dsc_frame("651", "2"),
+    dsc_frame("616", "0400000000000000"),
+    dsc_frame("510", "81"),
+    dsc_frame("849", "02"),
+    dsc_frame("652", "10"),
+    dsc_frame("655", "1"),
+    dsc_frame("610", "012"),
+]
+# Frames which only a parser has to cope with
+ODD_HONEYWELL_LINES = [
+    b"Login:\r\n",
+    b"OK\r\n",
+    b"FAILED\r\n",
+    b"^03,00$\r\n",
+    b"^0C$\r\n",
+    b"%FF,FFFF0000$\r\n",
+    b"  %01$extra$ \r\n",
+    b"%$\r\n",
+    b"%0$\r\n",
+    b"%00,01,1C08,08,00,A,B,C$\r\n",
+    b"%00,no sentinel\r\n",
+    b"\r\n",
+]
+ODD_DSC_LINES = [
+    b"5053CD\r\n",
+    b"500",
+    b"5001",
+    b"50012",
+    b"\r\n",
+    b"1:2:3 45\r\n",
+    b"12:34:56 5\r\n",
+    b"12:34:5660901234\r\n",
+]
+
+
+def original_honeywell_parse(raw, loggedIn):
+    """The parser the Honeywell client used before frames were parsed in place."""
+    rawInput = raw.decode("ascii").strip()
+    parse = re.match(r"([%\^].+)\$", rawInput)
+    if parse and parse.group(1):
+        inputList = parse.group(1).split(",")
+        return inputList[0], ",".join(inputList[1:])
+    if not loggedIn and rawInput:
+        return rawInput, ""
+    return None
+
+
+def original_dsc_parse(raw, loggedIn):
+    """The parser the DSC client used before frames were parsed in place."""
+    rawInput = raw.decode("ascii").strip()
+    if rawInput == "":
+        return None
+    dataoffset = 0
+    if re.match(r"\d\d:\d\d:\d\d\s", rawInput):
+        dataoffset = dataoffset + 9
+    return rawInput[dataoffset : dataoffset + 3], rawInput[dataoffset + 3 :][:-2]
+
+
+PANELS = {
+    PANEL_TYPE_HONEYWELL: (HoneywellClient, HONEYWELL_LINES, original_honeywell_parse),
+    PANEL_TYPE_UNO: (UnoClient, UNO_LINES, original_honeywell_parse),
+    PANEL_TYPE_DSC: (DSCClient, DSC_LINES, original_dsc_parse),
+}
+ODD_LINES = {
+    PANEL_TYPE_HONEYWELL: ODD_HONEYWELL_LINES,
+    PANEL_TYPE_UNO: ODD_HONEYWELL_LINES,
+    PANEL_TYPE_DSC: ODD_DSC_LINES,
+}
+
+
+@pytest.mark.parametrize("panelType", PANELS)
+@pytest.mark.parametrize("loggedIn", (False, True))
+def test_parse_matches_original_parser(make_panel, panelType, loggedIn):
+    async def run():
+        clientClass, lines, original = PANELS[panelType]
+        client = clientClass(make_panel(panelType))
+        client._loggedin = loggedIn
+        for raw in lines + ODD_LINES[panelType]:
+            assert client.parseHandler(raw, 0, len(raw)) == original(raw, loggedIn), raw
+
+            # Frames are parsed in place from the middle of the receive buffer
+            buffer = bytearray(b"XX\n" + raw + b"YY")
+            start = 3
+            assert client.parseHandler(buffer, start, start + len(raw)) == original(
+                raw, loggedIn
+            ), raw
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("panelType", PANELS)
+def test_buffered_protocol_matches_stream_reader(make_panel, panelType):
+    """Split the stream at random points; the protocol must still produce the frames
+    the stream reader path produces one line at a time."""
+
+    async def run():
+        clientClass, lines, _ = PANELS[panelType]
+        client = clientClass(make_panel(panelType))
+        client._loggedin = True
+        stream = b"".join(lines + ODD_LINES[panelType][:-1]) * 20
+
+        parsed = []
+        parseHandler = client.parseHandler
+
+        def record(buffer, start, end):
+            parsed.append(parseHandler(buffer, start, end))
+
+        client.parseHandler = record
+        offset = 0
+        while offset < len(stream):
+            line = stream[offset : stream.index(b"\n", offset) + 1]
+            client.process_frame(line, 0, len(line))
+            offset += len(line)
+        expected, parsed[:] = list(parsed), []
+
+        protocol = EnvisalinkProtocol(client)
+        rand = random.Random(1)
+        offset = 0
+        while offset < len(stream):
+            chunk = stream[offset : offset + rand.randint(1, 200)]
+            buffer = protocol.get_buffer(-1)
+            buffer[: len(chunk)] = chunk
+            protocol.buffer_updated(len(chunk))
+            offset += len(chunk)
+
+        assert parsed == expected
+        assert len(expected) > len(lines)
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("panelType", PANELS)
+def test_transports_produce_same_state(make_panel, panelType):
+    """Replay the same TPI session through both transports against a fake EVL and
+    compare the callbacks and the resulting alarm state."""
+
+    async def replay(buffered):
+        _, lines, _ = PANELS[panelType]
+        evl = FakeEvl(panelType)
+        port = await evl.start()
+        panel = make_panel(panelType, port, bufferedTransport=buffered)
+        callbacks = []
+        for name in ("keypad_update", "zone_state_change", "zone_bypass_state_change"):
+            setattr(
+                panel,
+                f"callback_{name}",
+                lambda data, name=name: callbacks.append((name, data)),
+            )
+        panel.callback_partition_state_change = lambda data: callbacks.append(
+            ("partition_state_change", {p: sorted(f) for p, f in data.items()})
+        )
+
+        assert await panel.start() == panel.ConnectionResult.SUCCESS
+        callbacks.clear()
+        done = asyncio.Event()
+        processFrame = panel._client.process_frame
+        frames = []
+
+        def process_frame(buffer, start, end):
+            processFrame(buffer, start, end)
+            # Ignore the acks of the commands sent after login
+            frame = bytes(buffer[start:end])
+            if frame in lines:
+                frames.append(frame)
+            if len(frames) == len(lines):
+                done.set()
+
+        panel._client.process_frame = process_frame
+        for raw in lines:
+            evl.send(raw)
+        await asyncio.wait_for(done.wait(), 5)
+        assert frames == lines
+
+        zones = panel.alarm_state.zones
+        state = (
+            [zones.bitmap(flag) for flag in range(6)],
+            [dict(partition.status) for partition in panel.alarm_state.partitions.values()],
+        )
+        await panel.stop()
+        await evl.stop()
+        return callbacks, state
+
+    async def run():
+        return await replay(False), await replay(True)
+
+    stream, buffered = asyncio.run(run())
+    assert stream == buffered
+    assert stream[0]
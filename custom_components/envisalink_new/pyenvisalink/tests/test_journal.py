@@ -0,0 +1,129 @@
+"""The event journal ring and what the clients record in it."""
+import asyncio
+
+from pyenvisalink.const import PANEL_TYPE_DSC, STATE_CHANGE_ZONE
+from pyenvisalink.dsc_client import DSCClient
+from pyenvisalink.fake_evl import FakeEvl
+from pyenvisalink.journal import (
+    JOURNAL_CID,
+    JOURNAL_COMMAND,
+    JOURNAL_PARTITION,
+    JOURNAL_PARTITION_FLAGS,
+    JOURNAL_ZONE,
+    EventJournal,
+)
+
+
+def fill(journal, n, start=0):
+    """Append n CID records for zones 1-3, numbered by their code."""
+    for code in range(start, start + n):
+        journal.record_cid(code, 1, 1, zone=code % 3 + 1)
+
+
+def test_ring_wraps_and_reopens(tmp_path):
+    path = str(tmp_path / "journal")
+    journal = EventJournal.open(path, 16)
+    fill(journal, 40)
+    assert len(journal) == 16
+    codes = [event.code for event in journal.events_since(0)]
+    assert codes == list(range(24, 40))
+    journal.close()
+
+    # The records and the zone index survive reopening the file
+    journal = EventJournal.open(path, 16)
+    assert len(journal) == 16
+    assert [event.code for event in journal.events_since(0)] == codes
+    assert [event.code for event in journal.zone_history(1, 3)] == [33, 36, 39]
+    fill(journal, 4, 40)
+    assert [event.code for event in journal.events_since(0)] == list(range(28, 44))
+    journal.close()
+
+    # A journal of a different size starts over
+    journal = EventJournal.open(path, 32)
+    assert len(journal) == 0
+    journal.close()
+
+
+def test_events_since_filters_by_time_and_kind():
+    journal = EventJournal.open(None, 64)
+    fill(journal, 5)
+    journal.record_command("03", True)
+    since = journal.events_since(0)[-1].time
+    fill(journal, 5, 5)
+    journal.record_command("03", False)
+
+    events = journal.events_since(since)
+    # Times are not unique, so everything from the first record at that time is returned
+    assert events[0].time == since
+    cids = [event.code for event in events if event.kind == JOURNAL_CID]
+    assert cids == list(range(5, 10))
+    commands = journal.events_since(since, JOURNAL_COMMAND)
+    assert [(event.code, event.value) for event in commands] == [(3, 1), (3, 0)]
+    assert journal.events_since(events[-1].time + 1) == []
+
+
+def test_zone_history_after_wraparound():
+    journal = EventJournal.open(None, 16)
+    fill(journal, 40)
+    # Only the zone's records still in the ring are returned, oldest first
+    assert [event.code for event in journal.zone_history(2, 100)] == [25, 28, 31, 34, 37]
+    assert [event.code for event in journal.zone_history(2, 2)] == [34, 37]
+    assert journal.zone_history(4) == []
+
+    # A zone whose records have all been overwritten has no history
+    journal.record_cid(0, 1, 1, zone=9)
+    fill(journal, 16)
+    assert journal.zone_history(9) == []
+
+
+def test_state_changes_are_journaled(make_panel):
+    async def run():
+        panel = make_panel(PANEL_TYPE_DSC)
+        panel._journal = EventJournal.open(None, 64)
+        client = DSCClient(panel)
+        client._loggedin = True
+
+        client.handle_state_change_callbacks(client.handle_zone_state_change("609", "012"))
+        # Keypad updates change the status of every partition
+        client.handle_state_change_callbacks(client.handle_keypad_update("800", ""))
+        # Changes which leave the journaled flags alone are not recorded
+        client.handle_state_change_callbacks({STATE_CHANGE_ZONE: [12]})
+
+        events = panel.journal.events_since(0)
+        assert [(event.kind, event.zone) for event in events[:1]] == [(JOURNAL_ZONE, 12)]
+        partitions = [event for event in events if event.kind == JOURNAL_PARTITION]
+        assert len(events) == 1 + len(partitions)
+        assert sorted(event.partition for event in partitions) == sorted(
+            panel.alarm_state.partitions
+        )
+        batTrouble = 1 << JOURNAL_PARTITION_FLAGS.index("bat_trouble")
+        assert all(event.changed & batTrouble for event in partitions)
+        assert all(event.value & batTrouble for event in partitions)
+
+    asyncio.run(run())
+
+
+def test_journal_is_opt_in(make_panel, tmp_path):
+    async def run():
+        evl = FakeEvl(PANEL_TYPE_DSC)
+        port = await evl.start()
+
+        panel = make_panel(PANEL_TYPE_DSC, port)
+        assert await panel.start() == panel.ConnectionResult.SUCCESS
+        assert panel.journal is None
+        await panel.stop()
+
+        panel = make_panel(PANEL_TYPE_DSC, port, journalPath=str(tmp_path / "journal"))
+        assert await panel.start() == panel.ConnectionResult.SUCCESS
+        assert panel.journal is not None
+        await evl.loggedIn.wait()
+        # DSC command codes are decimal
+        assert await panel._client.queue_command("070", "1")
+        commands = panel.journal.events_since(0, JOURNAL_COMMAND)
+        assert (70, 1) in [(event.code, event.value) for event in commands]
+        await panel.stop()
+        assert panel.journal is None
+
+        await evl.stop()
+
+    asyncio.run(run())
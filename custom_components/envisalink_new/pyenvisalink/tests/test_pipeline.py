@@ -0,0 +1,136 @@
+"""Pipelined DSC commands and congestion control against a fake EVL."""
+import asyncio
+
+from pyenvisalink.const import PANEL_TYPE_DSC, PANEL_TYPE_HONEYWELL
+from pyenvisalink.fake_evl import FakeEvl, dsc_frame
+
+COMMANDS = ["001", "008", "010", "020", "055", "056", "057", "058"]
+
+
+class WindowEvl(FakeEvl):
+    """Tracks how many commands were awaiting a response when each one arrived, and fails
+    the commands listed in errors."""
+
+    def __init__(self, *args, errors=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.errors = set(errors)
+        self.outstanding = []
+        self.replies = 0
+
+    def parse_command(self, line):
+        command = super().parse_command(line)
+        self.outstanding.append(len(self.commands) - self.replies + 1)
+        return command
+
+    def respond(self, code, data):
+        self.replies += 1
+        if code in self.errors:
+            return dsc_frame("502", "020")
+        return super().respond(code, data)
+
+
+async def start_panel(make_panel, evl, **kwargs):
+    port = await evl.start()
+    panel = make_panel(evl.panelType, port, **kwargs)
+    assert await panel.start() == panel.ConnectionResult.SUCCESS
+    # Wait for the commands queued at login to finish
+    while panel._client.command_queue_busy() or not panel._client.is_online():
+        await asyncio.sleep(0.01)
+    evl.commands.clear()
+    evl.outstanding.clear()
+    evl.replies = 0
+    return panel
+
+
+def completion_order(client) -> list:
+    completed = []
+    recordCompletion = client.record_completion
+
+    def record_completion(op):
+        completed.append((op.cmd, op.state))
+        recordCompletion(op)
+
+    client.record_completion = record_completion
+    return completed
+
+
+def test_pipelined_acks_complete_in_order(make_panel):
+    async def run():
+        evl = WindowEvl(PANEL_TYPE_DSC, latency=0.02)
+        panel = await start_panel(make_panel, evl, pipelineWindow=4)
+        client = panel._client
+        completed = completion_order(client)
+
+        results = await asyncio.gather(*[client.queue_command(cmd, "") for cmd in COMMANDS])
+        assert results == [True] * len(COMMANDS)
+        assert [code for code, _ in evl.commands] == COMMANDS
+        assert max(evl.outstanding) == 4
+        State = client.Operation.State
+        assert completed == [(cmd, State.SUCCEEDED) for cmd in COMMANDS]
+        assert client.in_flight_window() == 4
+
+        await panel.stop()
+        await evl.stop()
+
+    asyncio.run(run())
+
+
+def test_error_mid_window_falls_back_to_serial(make_panel):
+    async def run():
+        evl = WindowEvl(PANEL_TYPE_DSC, latency=0.02, errors=["010"])
+        panel = await start_panel(make_panel, evl, pipelineWindow=4)
+        client = panel._client
+        completed = completion_order(client)
+
+        results = await asyncio.gather(*[client.queue_command(cmd, "") for cmd in COMMANDS])
+        # The error is attributed to the oldest command awaiting a response, which is
+        # the one the EVL rejected since the acks arrive in order
+        assert results == [cmd != "010" for cmd in COMMANDS]
+        State = client.Operation.State
+        assert completed == [
+            (cmd, State.FAILED if cmd == "010" else State.SUCCEEDED) for cmd in COMMANDS
+        ]
+        assert client._serialFallback
+        assert client.in_flight_window() == 1
+
+        # Commands are no longer overlapped after the error
+        evl.outstanding.clear()
+        results = await asyncio.gather(*[client.queue_command(cmd, "") for cmd in COMMANDS])
+        assert results == [cmd != "010" for cmd in COMMANDS]
+        assert max(evl.outstanding) == 1
+
+        # Until the next login
+        client.handle_login_success("505", "1")
+        assert client.in_flight_window() == 4
+
+        await panel.stop()
+        await evl.stop()
+
+    asyncio.run(run())
+
+
+def test_congestion_control_paces_commands(make_panel):
+    """The EVL acks immediately but rejects commands sent faster than it can take them.
+    Without pacing nearly every command is rejected at least once."""
+
+    async def run():
+        evl = FakeEvl(PANEL_TYPE_HONEYWELL, maxRate=50)
+        port = await evl.start()
+        panel = make_panel(PANEL_TYPE_HONEYWELL, port, congestionControl=True)
+        assert await panel.start() == panel.ConnectionResult.SUCCESS
+        await evl.loggedIn.wait()
+
+        client = panel._client
+        results = await asyncio.gather(*[client.queue_command("00", "") for _ in range(60)])
+        assert results == [True] * 60
+        metrics = client.get_metrics()
+        assert metrics["totals"]["failed"] == 0
+        assert metrics["congestion"]["overruns"] == evl.overruns
+        assert evl.overruns < 15
+        # The estimate settles at around the rate the EVL accepts
+        assert 25 <= metrics["congestion"]["rate"] <= 75
+
+        await panel.stop()
+        await evl.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,99 @@
+"""Restoring the alarm state from a snapshot."""
+import asyncio
+
+from pyenvisalink.alarm_state import ZONE_BYPASSED, ZONE_FAULT, ZONE_OPEN, AlarmState
+from pyenvisalink.const import PANEL_TYPE_HONEYWELL
+from pyenvisalink.honeywell_client import HoneywellClient
+from pyenvisalink.snapshot import decode_snapshot, encode_snapshot
+
+KEYPAD_FRAME = b"%00,01,1C08,08,00,****DISARMED****  Ready to Arm  $\r\n"
+
+
+def restored_state() -> AlarmState:
+    state = AlarmState.get_initial_alarm_state(64, 8)
+    state.zones.set_flag(3, ZONE_OPEN, True)
+    state.zones.set_flag(9, ZONE_BYPASSED, True)
+    state.partitions[1].status.update({"ready": True, "alpha": "Ready"})
+
+    restored = AlarmState.get_initial_alarm_state(64, 8)
+    assert decode_snapshot(restored, encode_snapshot(state, 1000.0)) == 1000.0
+    return restored
+
+
+def test_restored_state_is_stale():
+    state = restored_state()
+    zones = state.zones
+    assert zones.get_flag(3, ZONE_OPEN)
+    assert zones.get_flag(9, ZONE_BYPASSED)
+    assert zones.is_stale(3) and zones.is_stale(64)
+    assert state.partitions[1].status["alpha"] == "Ready"
+    assert state.partitions[1].status.stale
+
+
+def test_confirming_stale_state_is_a_change():
+    state = restored_state()
+    zones = state.zones
+
+    # The panel reports the same state that was restored
+    version = zones.versions[3]
+    assert zones.set_flag(3, ZONE_OPEN, True)
+    assert not zones.is_stale(3)
+    assert zones.versions[3] == version + 1
+    assert not zones.set_flag(3, ZONE_FAULT, False)
+    assert not zones.set_flag(3, ZONE_OPEN, True)
+
+    assert zones.update_bitmap(ZONE_OPEN, 1 << 3, mask=0b11110) == [1, 2, 4]
+    assert zones.update_bitmap(ZONE_OPEN, 1 << 3, mask=0b11110) == []
+
+    status = state.partitions[1].status
+    version = status.version
+    assert status.update({"ready": True}) == []
+    assert not status.stale
+    assert status.version == version + 1
+    assert state.take_confirmed_partitions() == {1}
+    assert state.take_confirmed_partitions() == set()
+    assert status.update({"ready": True}) == []
+    assert status.version == version + 1
+
+
+def test_confirmed_partition_is_triggered_without_fields(make_panel):
+    async def run():
+        panel = make_panel(PANEL_TYPE_HONEYWELL)
+        client = HoneywellClient(panel)
+        client._loggedin = True
+        updates = []
+        panel.callback_partition_state_change = updates.append
+        end = len(KEYPAD_FRAME)
+
+        # A stale partition which changes is only reported with its changed fields
+        panel.alarm_state.mark_partitions_stale()
+        client.process_frame(KEYPAD_FRAME, 0, end)
+        assert len(updates) == 1 and "stale" not in updates[0][1]
+        assert not panel.alarm_state.partitions[1].status.stale
+
+        # One which is confirmed unchanged is reported with no fields
+        updates.clear()
+        panel.alarm_state.mark_partitions_stale()
+        client._lastKeypadFrames.clear()
+        client.process_frame(KEYPAD_FRAME, 0, end)
+        assert updates == [{1: []}]
+
+        updates.clear()
+        client.process_frame(KEYPAD_FRAME, 0, end)
+        assert updates == []
+
+    asyncio.run(run())
+
+
+def test_stop_saves_snapshot_without_periodic_saves(make_panel, tmp_path):
+    async def run():
+        path = tmp_path / "snapshot"
+        panel = make_panel(PANEL_TYPE_HONEYWELL, snapshotPath=str(path), snapshotInterval=0)
+        panel.alarm_state.zones.set_flag(3, ZONE_OPEN, True)
+        await panel.stop()
+
+        restored = make_panel(PANEL_TYPE_HONEYWELL, snapshotPath=str(path))
+        assert await restored.load_snapshot()
+        assert restored.alarm_state.zones.get_flag(3, ZONE_OPEN)
+
+    asyncio.run(run())
@@ -0,0 +1,33 @@
+"""Tracing the frames exchanged with the EVL."""
+import asyncio
+import logging
+
+from pyenvisalink.const import PANEL_TYPE_HONEYWELL
+from pyenvisalink.honeywell_client import HoneywellClient
+from pyenvisalink.log_helpers import WireTrace
+
+FRAME = b"%00,01,1C08,08,00,****DISARMED****  Ready to Arm  $\r\n"
+
+
+def test_frames_are_traced_as_text_on_the_client_logger(make_panel, caplog):
+    async def run():
+        client = HoneywellClient(make_panel(PANEL_TYPE_HONEYWELL))
+        client._loggedin = True
+        with caplog.at_level(logging.DEBUG, "pyenvisalink.envisalink_base_client"):
+            client.process_frames(FRAME, [(0, len(FRAME))])
+            await client.send_data("^01,00$")
+
+    asyncio.run(run())
+    messages = [record.getMessage() for record in caplog.records]
+    traced = [message for message in messages if message[:4] in ("RX <", "TX >")]
+    assert traced == [f"RX < {FRAME.decode('ascii')}", "TX > ^01,00$"]
+
+
+def test_sampling(caplog):
+    logger = logging.getLogger("pyenvisalink.tests.wire")
+    trace = WireTrace(logger, sampleRate=3)
+    with caplog.at_level(logging.DEBUG, logger.name):
+        for n in range(9):
+            trace.rx(b"%d\r\n" % n)
+    messages = [record.getMessage() for record in caplog.records]
+    assert messages == ["RX < 2\r\n", "RX < 5\r\n", "RX < 8\r\n"]
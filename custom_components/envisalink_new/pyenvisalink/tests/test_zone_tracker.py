@@ -0,0 +1,144 @@
+"""Closing the zones a Honeywell keypad stops reporting."""
+import asyncio
+import random
+
+from pyenvisalink.alarm_state import ZONE_OPEN
+from pyenvisalink.const import PANEL_TYPE_HONEYWELL
+from pyenvisalink.honeywell_client import HoneywellClient
+from pyenvisalink.zone_tracker import (
+    ZONE_REPORT_BATTERY,
+    ZONE_REPORT_STATE,
+    ZONE_REPORT_TAMPER,
+    ZoneFaultTracker,
+)
+
+FAULT_12 = "01,0008,12,00,FAULT 12 FRONT DOOR              "
+FAULT_14 = "01,0008,14,00,FAULT 14 BACK DOOR               "
+
+
+def honeywell_client(make_panel) -> HoneywellClient:
+    client = HoneywellClient(make_panel(PANEL_TYPE_HONEYWELL))
+    client._loggedin = True
+    return client
+
+
+def keypad(client, data):
+    client.handle_keypad_update("%00", data)
+
+
+def test_restored_open_zone_expires(make_panel):
+    async def run():
+        client = honeywell_client(make_panel)
+        zones = client._alarmPanel.alarm_state.zones
+        for zone in (5, 12):
+            zones.set_flag(zone, ZONE_OPEN, True)
+        zones.mark_stale()
+
+        # The keypad cycles through zones 12 and 14 but never shows zone 5
+        for _ in range(10):
+            keypad(client, FAULT_12)
+            keypad(client, FAULT_14)
+        assert not zones.get_flag(5, ZONE_OPEN)
+        assert zones.get_flag(12, ZONE_OPEN)
+        assert zones.get_flag(14, ZONE_OPEN)
+        assert not zones.stale & zones.bitmap(ZONE_OPEN)
+
+    asyncio.run(run())
+
+
+def test_restored_zone_reported_since_is_tracked_normally(make_panel):
+    async def run():
+        client = honeywell_client(make_panel)
+        zones = client._alarmPanel.alarm_state.zones
+        zones.set_flag(12, ZONE_OPEN, True)
+        zones.mark_stale()
+
+        # The restored entry expires while the keypad is still showing the zone
+        for _ in range(10):
+            keypad(client, FAULT_12)
+            keypad(client, FAULT_14)
+            assert zones.get_flag(12, ZONE_OPEN)
+
+        # Then it closes once the keypad stops showing it
+        for _ in range(10):
+            keypad(client, FAULT_14)
+        assert not zones.get_flag(12, ZONE_OPEN)
+        assert zones.get_flag(14, ZONE_OPEN)
+
+    asyncio.run(run())
+
+
+class ZoneTimers:
+    """The zone timers the Honeywell client kept before the tracker: a counter per
+    "zone|kind" key, all of which are incremented on each keypad zone report."""
+
+    def __init__(self):
+        self.timers = {}
+
+    def update(self, zone, kind) -> list:
+        """A keypad zone report; kind is None for reports which aren't tracked (bypassed
+        zones).  Returns the (zone, kind) entries which have expired."""
+        for z in self.timers:
+            self.timers[z] += 1
+        if kind is not None:
+            self.timers[f"{zone}|{kind}"] = 1
+
+        expired = []
+        max_timer = round(len(self.timers) * 2 + 2, 0)
+        for z in list(self.timers):
+            if self.timers[z] > max_timer:
+                timer = str.split(z, "|")
+                expired.append((int(timer[0]), timer[1]))
+                self.timers.pop(z)
+        return expired
+
+    def entries(self) -> list:
+        return [(int(zone), kind) for zone, kind in (z.split("|") for z in self.timers)]
+
+    def clear(self) -> list:
+        cleared = self.entries()
+        self.timers.clear()
+        return cleared
+
+
+def test_tracker_matches_zone_timers():
+    """Feed the same keypad zone reports to the tracker and the timers it replaced; the
+    same entries must close at the same updates."""
+    rand = random.Random(16)
+    tracker = ZoneFaultTracker()
+    timers = ZoneTimers()
+    faulted = set(rand.sample(range(1, 65), 10))
+    closed = 0
+    for _ in range(5000):
+        r = rand.random()
+        if r < 0.05:
+            faulted.add(rand.randint(1, 64))
+        elif r < 0.1 and faulted:
+            faulted.discard(rand.choice(sorted(faulted)))
+
+        r = rand.random()
+        if r < 0.01:
+            # The partition goes ready
+            assert sorted(tracker.clear()) == sorted(timers.clear())
+            continue
+        if r < 0.05:
+            # Wireless zone battery and tamper reports
+            zone = rand.randint(1, 64)
+            kind = rand.choice((ZONE_REPORT_BATTERY, ZONE_REPORT_TAMPER))
+        elif r < 0.07:
+            # Bypassed zones
+            zone, kind = rand.randint(1, 64), None
+        elif faulted:
+            zone, kind = rand.choice(sorted(faulted)), ZONE_REPORT_STATE
+        else:
+            continue
+
+        tracker.advance()
+        if kind is not None:
+            tracker.report(zone, kind)
+        expired = tracker.expire()
+        assert sorted(expired) == sorted(timers.update(zone, kind))
+        assert sorted(tracker) == sorted(timers.entries())
+        closed += len(expired)
+    # The sequence closes plenty of entries
+    assert closed > 100
@@ -1,10 +1,17 @@
-import json
 import logging
 import re
 import time
 
-from .const import STATE_CHANGE_PARTITION, STATE_CHANGE_ZONE, STATE_CHANGE_ZONE_BYPASS
+from .alarm_state import ZONE_BYPASSED, ZONE_FAULT, ZONE_OPEN, decode_zone_bitmap
+from .const import (
+    PRIORITY_LIFE_SAFETY,
+    PRIORITY_MAINTENANCE,
+    STATE_CHANGE_PARTITION,
+    STATE_CHANGE_ZONE,
+    STATE_CHANGE_ZONE_BYPASS,
+)
 from .honeywell_client import HoneywellClient
+from .log_helpers import LazyJson
 from .uno_envisalinkdefs import (
     evl_Commands,
     evl_PanicTypes,
@@ -19,10 +26,9 @@ _LOGGER = logging.getLogger(__name__)
 
 class UnoClient(HoneywellClient):
     """Represents an Uno alarm client."""
-    def __init__(self, panel):
-        super().__init__(panel)
-        self._evl_ResponseTypes = evl_ResponseTypes
-        self._evl_TPI_Response_Codes = evl_TPI_Response_Codes
+
+    _evl_ResponseTypes = evl_ResponseTypes
+    _evl_TPI_Response_Codes = evl_TPI_Response_Codes
 
     def handle_login_success(self, code, data):
         """Handler for when the envisalink accepts our credentials."""
@@ -31,39 +37,38 @@ class UnoClient(HoneywellClient):
         self.create_internal_task(self.complete_login(), name="complete_login")
 
     async def complete_login(self):
-        await self.queue_command(evl_Commands["HostInfo"], "")
-        await self.queue_command(evl_Commands["InitialStateDump"], "")
+        await self.queue_command(evl_Commands["HostInfo"], "", priority=PRIORITY_MAINTENANCE)
+        await self.queue_command(
+            evl_Commands["InitialStateDump"], "", priority=PRIORITY_MAINTENANCE
+        )
 
     def handle_keypad_update(self, code, data):
         return None
 
     def handle_zone_state_change(self, code, data):
         """Handle when the envisalink sends us a zone change."""
-        zone_updates = []
         now = time.time()
 
-        zoneNumber = 0
-        num_bytes = len(data)
-        idx = 0
-        while (idx < num_bytes):
-            byte = int(data[idx:idx+2], 16)
-            idx += 2
-            for bit in range(8):
-                faulted = byte & (1 << bit) != 0
-                zoneNumber += 1
+        zones = self._alarmPanel.alarm_state.zones
+        bits, mask = decode_zone_bitmap(data)
+        openChanged = zones.update_bitmap(ZONE_OPEN, bits, mask)
+        faultChanged = zones.update_bitmap(ZONE_FAULT, bits, mask)
+        zone_updates = sorted(set(openChanged).union(faultChanged))
 
-                self._alarmPanel.alarm_state['zone'][zoneNumber]['status'].update({'open': faulted, 'fault': faulted})
-                if faulted:
-                    self._alarmPanel.alarm_state['zone'][zoneNumber]['last_fault'] = now
+        debug = _LOGGER.isEnabledFor(logging.DEBUG)
+        for zoneNumber in zone_updates:
+            faulted = bits >> zoneNumber & 1
+            if faulted:
+                zones.last_fault[zoneNumber] = now
 
+            if debug:
                 _LOGGER.debug("(zone %i) is %s", zoneNumber, "Open/Faulted" if faulted else "Closed/Not Faulted")
-                zone_updates.append(zoneNumber)
 
         return { STATE_CHANGE_ZONE: zone_updates }
 
     def handle_partition_state_change(self, code, data):
         """Handle when the envisalink sends us a partition change."""
-        partition_updates = []
+        partition_updates = {}
         for currentIndex in range(0, 8):
             partitionNumber = currentIndex + 1
             partitionStateCode = data[currentIndex * 2:(currentIndex * 2) + 2]
@@ -76,48 +81,32 @@ class UnoClient(HoneywellClient):
             if not partitionState or partitionState['name'] == 'NOT_USED':
                 continue
 
-            previouslyArmed = self._alarmPanel.alarm_state['partition'][partitionNumber]['status'].get('armed', False)
-            armed = partitionState['status'].get('armed', False)
-            self._alarmPanel.alarm_state['partition'][partitionNumber]['status'].update(
-                partitionState['status'])
+            status = self._alarmPanel.alarm_state['partition'][partitionNumber]['status']
+            previouslyArmed = status.get('armed', False)
+            changed = status.update(partitionState['status'])
 
             if partitionState['name'] == 'EXIT_ENTRY_DELAY':
-                self._alarmPanel.alarm_state['partition'][partitionNumber]['status'].update({
+                changed += status.update({
                     'exit_delay': not previouslyArmed,
                     'entry_delay': previouslyArmed,
                 })
 
-            _LOGGER.debug('Partition ' + str(partitionNumber) + ' is in state ' + partitionState['name'])
-            _LOGGER.debug(json.dumps(self._alarmPanel.alarm_state['partition'][partitionNumber]['status']))
-            partition_updates.append(partitionNumber)
+            if not changed:
+                continue
+
+            _LOGGER.debug('Partition %d is in state %s', partitionNumber, partitionState['name'])
+            _LOGGER.debug('%s', LazyJson(status))
+            partition_updates[partitionNumber] = changed
 
         return { STATE_CHANGE_PARTITION: partition_updates }
 
     def handle_zone_bypass_update(self, code, data):
-        updates= []
-        zoneNumber = 0
-        num_bytes = len(data)
-        idx = 0
-        while (idx < num_bytes):
-            byte = int(data[idx:idx+2], 16)
-            idx += 2
-            for bit in range(8):
-                bypassed= byte & (1 << bit) != 0
-                zoneNumber += 1
-
-                _LOGGER.debug(
-                    str.format(
-                        "(zone {0}) bypass state: {1}",
-                        zoneNumber,
-                        bypassed,
-                    )
-                )
-
-                if self._alarmPanel.alarm_state['zone'][zoneNumber]['bypassed'] != bypassed:
-                    updates.append(zoneNumber)
-                    self._alarmPanel.alarm_state['zone'][zoneNumber]['bypassed'] = bypassed
-                    updates.append(zoneNumber)
+        bits, mask = decode_zone_bitmap(data)
+        updates = self._alarmPanel.alarm_state.zones.update_bitmap(ZONE_BYPASSED, bits, mask)
 
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            for zoneNumber in updates:
+                _LOGGER.debug("(zone %d) bypass state: %s", zoneNumber, bool(bits >> zoneNumber & 1))
 
         return { STATE_CHANGE_ZONE_BYPASS: updates}
 
@@ -138,25 +127,28 @@ class UnoClient(HoneywellClient):
 
     def handle_partition_trouble_state_change(self, code, data):
         """Process Partition Trouble State Change"""
-        partition_updates = []
+        partition_updates = {}
         for currentIndex in range(0, 8):
             partitionNumber = currentIndex + 1
             troubleCode = data[currentIndex * 2:(currentIndex * 2) + 2]
             flags = MajorTrouble_Flags()
             flags.asByte = int(troubleCode, 16)
 
-            _LOGGER.debug(f'Partition {partitionNumber} has new trouble state {flags}')
+            _LOGGER.debug('Partition %d has new trouble state %s', partitionNumber, flags)
 
             status = self._alarmPanel.alarm_state['partition'][partitionNumber]['status']
-            status['trouble'] = bool(flags.service_required)
-            status['ac_present'] = not bool(flags.ac_failure)
-            status['bat_trouble'] = bool(flags.system_battery_overcurrent)
-            status['bell_trouble'] = bool(flags.system_bell_fault)
-            status['zone_low_battery'] = bool(flags.wireless_device_low_battery)
+            changed = status.update({
+                'trouble': bool(flags.service_required),
+                'ac_present': not bool(flags.ac_failure),
+                'bat_trouble': bool(flags.system_battery_overcurrent),
+                'bell_trouble': bool(flags.system_bell_fault),
+                'zone_low_battery': bool(flags.wireless_device_low_battery),
+            })
 
-            _LOGGER.debug(f'Partition {partitionNumber} status: {json.dumps(status)}')
+            _LOGGER.debug('Partition %d status: %s', partitionNumber, LazyJson(status))
 
-            partition_updates.append(partitionNumber)
+            if changed:
+                partition_updates[partitionNumber] = changed
 
         return { STATE_CHANGE_PARTITION: partition_updates }
 
@@ -178,11 +170,17 @@ class UnoClient(HoneywellClient):
 
     async def disarm_partition(self, code, partitionNumber):
         """Public method to disarm a partition."""
-        await self.queue_command(evl_Commands["Disarm"], f"{partitionNumber},{code}", code)
+        await self.queue_command(
+            evl_Commands["Disarm"], f"{partitionNumber},{code}", code, priority=PRIORITY_LIFE_SAFETY
+        )
 
     async def panic_alarm(self, panicType):
         """Public method to raise a panic alarm."""
-        await self.queue_command(evl_Commands["PanicAlarm"], f"1,{evl_PanicTypes[panicType]}")
+        await self.queue_command(
+            evl_Commands["PanicAlarm"],
+            f"1,{evl_PanicTypes[panicType]}",
+            priority=PRIORITY_LIFE_SAFETY,
+        )
 
     async def bypass_zone(self, zone, partition, enable):
         command = evl_Commands["BypassZone" if enable else "UnbypassZone"]
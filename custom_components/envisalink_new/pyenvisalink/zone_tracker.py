@@ -0,0 +1,71 @@
+"""Tracking of the zones reported as faulted by a Honeywell keypad."""
+
+from collections import OrderedDict
+
+# Kinds of zone report tracked for a partition
+ZONE_REPORT_STATE = "state"
+ZONE_REPORT_BATTERY = "battery"
+ZONE_REPORT_TAMPER = "tamper"
+# A zone restored as open from a snapshot which the keypad hasn't reported yet
+ZONE_REPORT_RESTORED = "restored"
+
+
+class ZoneFaultTracker:
+    """Tracks the zones a Honeywell keypad is scrolling through for one partition.
+
+    The keypad only ever shows one faulted zone at a time, so a zone is considered
+    restored once it hasn't been shown for a while.  Rather than aging every entry on each
+    keypad update, the tracker keeps a generation counter which advances once per update
+    and records the generation in which each (zone, kind) entry was last reported.
+    Entries are kept ordered from least to most recently reported so the expired ones
+    are always at the front."""
+
+    __slots__ = ("generation", "_entries")
+
+    def __init__(self):
+        self.generation = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def advance(self):
+        """Start a new keypad update; every tracked entry ages by one."""
+        self.generation += 1
+
+    def report(self, zone, kind):
+        """Record that the keypad has just reported the zone."""
+        key = (zone, kind)
+        self._entries[key] = self.generation
+        self._entries.move_to_end(key)
+
+    def age(self, key) -> int:
+        """Number of keypad updates (including the current one) since the entry was last
+        reported."""
+        return self.generation - self._entries[key] + 1
+
+    def expire(self) -> list:
+        """Remove and return the entries which have not been reported in more than twice
+        as many keypad updates as there are entries being tracked (plus a margin)."""
+        # TODO Is this the right margin to add?
+        maxAge = len(self._entries) * 2 + 2
+        # Entries last reported at or before this generation are older than maxAge
+        expiredGeneration = self.generation - maxAge
+        expired = []
+        entries = self._entries
+        while entries:
+            key, seen = next(iter(entries.items()))
+            if seen > expiredGeneration:
+                break
+            del entries[key]
+            expired.append(key)
+        return expired
+
+    def clear(self) -> list:
+        """Remove and return all of the tracked entries."""
+        cleared = list(self._entries)
+        self._entries.clear()
+        return cleared
@@ -1,8 +1,15 @@
 """Support for Envisalink sensors (shows panel info)."""
 from __future__ import annotations
 
-from homeassistant.components.sensor import SensorEntity
+from datetime import timedelta
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorStateClass,
+)
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfTime
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
@@ -17,6 +24,114 @@ from .helpers import find_yaml_info, parse_range_string
 from .models import EnvisalinkDevice
 from .pyenvisalink.const import STATE_CHANGE_PARTITION
 
+# Only the command metric sensors are polled; the keypad sensors are pushed updates.
+SCAN_INTERVAL = timedelta(seconds=60)
+
+
+def _mean_ms(histograms) -> float | None:
+    """Combined mean (in ms) of a set of latency histogram snapshots."""
+    count = sum(h["count"] for h in histograms)
+    if not count:
+        return None
+    return round(sum(h["mean"] * h["count"] for h in histograms if h["count"]) / count * 1000, 1)
+
+
+def _merge_counts(metrics, key) -> dict:
+    """Sum the per-reason counts across all command codes."""
+    merged = {}
+    for info in metrics["commands"].values():
+        for reason, count in info[key].items():
+            merged[reason] = merged.get(reason, 0) + count
+    return merged
+
+
+def _per_command(metrics, key) -> dict:
+    return {cmd: info[key] for cmd, info in metrics["commands"].items()}
+
+
+def _latency_summary(histogram) -> dict:
+    return {
+        "count": histogram["count"],
+        "mean_ms": round(histogram["mean"] * 1000, 1) if histogram["count"] else None,
+        "p95_ms": round(histogram["p95"] * 1000, 1) if histogram["count"] else None,
+        "max_ms": round(histogram["max"] * 1000, 1) if histogram["count"] else None,
+    }
+
+
+_metric_sensor_info = {
+    "commands_sent": {
+        "name": "Commands Sent",
+        "icon": "mdi:send",
+        "state_class": SensorStateClass.TOTAL_INCREASING,
+        "value": lambda m: m["totals"]["sent"],
+        "attributes": lambda m: {"sent": _per_command(m, "sent")},
+    },
+    "command_retries": {
+        "name": "Command Retries",
+        "icon": "mdi:restore",
+        "state_class": SensorStateClass.TOTAL_INCREASING,
+        "value": lambda m: m["totals"]["retries"],
+        "attributes": lambda m: {
+            "retries": _per_command(m, "retries"),
+            "reasons": _merge_counts(m, "retry_reasons"),
+        },
+    },
+    "command_timeouts": {
+        "name": "Command Timeouts",
+        "icon": "mdi:timer-alert",
+        "state_class": SensorStateClass.TOTAL_INCREASING,
+        "value": lambda m: m["totals"]["timeouts"],
+        "attributes": lambda m: {"timeouts": _per_command(m, "timeouts")},
+    },
+    "command_failures": {
+        "name": "Command Failures",
+        "icon": "mdi:alert-circle",
+        "state_class": SensorStateClass.TOTAL_INCREASING,
+        "value": lambda m: m["totals"]["failed"],
+        "attributes": lambda m: {
+            "failures": _per_command(m, "failed"),
+            "reasons": _merge_counts(m, "failure_reasons"),
+        },
+    },
+    "command_latency": {
+        "name": "Command Latency",
+        "icon": "mdi:timer",
+        "device_class": SensorDeviceClass.DURATION,
+        "unit": UnitOfTime.MILLISECONDS,
+        "state_class": SensorStateClass.MEASUREMENT,
+        "value": lambda m: _mean_ms([c["wire_time"] for c in m["commands"].values()]),
+        "attributes": lambda m: {
+            cmd: _latency_summary(info["wire_time"]) for cmd, info in m["commands"].items()
+        },
+    },
+    "command_queue_wait": {
+        "name": "Command Queue Wait",
+        "icon": "mdi:tray-full",
+        "device_class": SensorDeviceClass.DURATION,
+        "unit": UnitOfTime.MILLISECONDS,
+        "state_class": SensorStateClass.MEASUREMENT,
+        "value": lambda m: _mean_ms(m["queue_wait"].values()),
+        "attributes": lambda m: {
+            priority: _latency_summary(histogram)
+            for priority, histogram in m["queue_wait"].items()
+        },
+    },
+    "state_writes": {
+        "name": "State Writes",
+        "icon": "mdi:database-edit",
+        "state_class": SensorStateClass.TOTAL_INCREASING,
+        "value": lambda m: m["state_writes"]["writes"],
+        "attributes": lambda m: m["state_writes"],
+    },
+    "zone_dump_corrections": {
+        "name": "Zone Dump Corrections",
+        "icon": "mdi:sync-alert",
+        "state_class": SensorStateClass.TOTAL_INCREASING,
+        "value": lambda m: m["zone_dump"]["corrections"],
+        "attributes": lambda m: m["zone_dump"],
+    },
+}
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -46,6 +161,10 @@ async def async_setup_entry(
             )
             entities.append(entity)
 
+    # Setup the diagnostic command metric sensors
+    for metric in _metric_sensor_info:
+        entities.append(EnvisalinkCommandMetricSensor(metric, controller))
+
     if entities:
         async_add_entities(entities)
 
@@ -57,6 +176,8 @@ class EnvisalinkKeypadSensor(EnvisalinkDevice, SensorEntity):
         """Initialize the sensor."""
         self._icon = "mdi:alarm-panel"
         self._partition_number = partition_number
+        self._attributes = None
+        self._attributes_version = None
         name = f"Partition {partition_number} Keypad"
         self._attr_unique_id = f"{controller.unique_id}_{name}"
 
@@ -87,4 +208,45 @@ class EnvisalinkKeypadSensor(EnvisalinkDevice, SensorEntity):
     @property
     def extra_state_attributes(self):
         """Return the state attributes."""
-        return self._info["status"]
+        status = self._info["status"]
+        if status.version != self._attributes_version:
+            self._attributes = dict(status)
+            self._attributes["stale"] = status.stale
+            self._attributes_version = status.version
+        return self._attributes
+
+
+class EnvisalinkCommandMetricSensor(EnvisalinkDevice, SensorEntity):
+    """Diagnostic sensor reporting metrics for the commands sent to the EVL."""
+
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, metric, controller):
+        """Initialize the sensor."""
+        sensor_info = _metric_sensor_info[metric]
+        self._sensor_info = sensor_info
+        self._attr_icon = sensor_info["icon"]
+        self._attr_state_class = sensor_info["state_class"]
+        self._attr_device_class = sensor_info.get("device_class")
+        self._attr_native_unit_of_measurement = sensor_info.get("unit")
+        self._attr_unique_id = f"{controller.unique_id}_{metric}"
+
+        LOGGER.debug("Setting up command metric sensor: %s", sensor_info["name"])
+        super().__init__(sensor_info["name"], controller, None, None)
+
+        # The metrics change with every command so poll for them rather than pushing
+        # an update for each one.
+        self._attr_should_poll = True
+
+    async def async_update(self) -> None:
+        """Take a new snapshot of the command metrics."""
+        metrics = self._controller.get_command_metrics()
+        if not metrics:
+            self._attr_native_value = None
+            self._attr_extra_state_attributes = None
+            return
+
+        self._attr_native_value = self._sensor_info["value"](metrics)
+        self._attr_extra_state_attributes = self._sensor_info["attributes"](metrics)
@@ -80,6 +80,7 @@ class EnvisalinkBypassSwitch(EnvisalinkDevice, SwitchEntity):
         """Initialize the switch."""
         self._zone_number = zone_number
         self._partition = partition
+        self._attr_extra_state_attributes = {"zone": zone_number, "partition": partition}
 
         setup_info = generate_entity_setup_info(
             controller, "zone", zone_number, "Bypass", zone_conf
@@ -114,15 +115,6 @@ class EnvisalinkBypassSwitch(EnvisalinkDevice, SwitchEntity):
             self._zone_number, self._partition, False
         )
 
-    @property
-    def extra_state_attributes(self):
-        """Return the state attributes."""
-        attr = {}
-
-        attr["zone"] = self._zone_number
-        attr["partition"] = self._partition
-        return attr
-
 
 class EnvisalinkChimeSwitch(EnvisalinkDevice, SwitchEntity, RestoreEntity):
     """Representation of an Envisalink chime switch."""
@@ -134,7 +126,7 @@ class EnvisalinkChimeSwitch(EnvisalinkDevice, SwitchEntity, RestoreEntity):
         self._attr_has_entity_name = True
         self._partition_number = partition_number
 
-        super().__init__(name, controller, STATE_CHANGE_PARTITION, partition_number)
+        super().__init__(name, controller, STATE_CHANGE_PARTITION, partition_number, "chime")
 
     @property
     def _info(self):
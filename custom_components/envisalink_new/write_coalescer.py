@@ -0,0 +1,136 @@
+"""Coalescing of the Home Assistant state writes triggered by Envisalink updates."""
+from asyncio import AbstractEventLoop, TimerHandle
+from collections.abc import Callable, Iterable
+
+
+class StateWriteCoalescer:
+    """Batches entity state writes so each entity is written at most once per flush.
+
+    Writes are flushed on the next event loop iteration, or after a window (in seconds)
+    if one is given, so a burst of updates touching the same entity only writes it once.
+    Writes can also be rate limited per key (e.g. per zone): once a key has been written,
+    further writes within min_interval are held back and released together when the
+    interval is up, so the final state is always written.  Urgent writes skip all of
+    this and are made immediately."""
+
+    def __init__(
+        self, loop: AbstractEventLoop, window: float = 0, min_interval: float = 0
+    ) -> None:
+        self._loop = loop
+        self._window = window
+        self._minInterval = min_interval
+        self._pending: dict[Callable[[], None], None] = {}
+        self._flushHandle: TimerHandle | None = None
+        # key -> time of the last write, and the writes held back for the key
+        self._lastWrite: dict = {}
+        self._deferred: dict = {}
+        self._deferredHandles: dict = {}
+
+        self.requested = 0
+        self.writes = 0
+        self.coalesced = 0
+        self.deferred = 0
+        self.urgent = 0
+
+    def schedule(
+        self, callbacks: Iterable[Callable[[], None]], key=None, urgent: bool = False
+    ) -> None:
+        """Schedule the write callbacks for a set of entities."""
+        if urgent:
+            self._write_now(callbacks, key)
+            return
+
+        pending = self._pending
+        if key is not None and self._minInterval:
+            now = self._loop.time()
+            last = self._lastWrite.get(key)
+            if last is not None and now - last < self._minInterval:
+                self._defer(callbacks, key, last + self._minInterval)
+                return
+            self._lastWrite[key] = now
+
+        for callback in callbacks:
+            self.requested += 1
+            if callback in pending:
+                self.coalesced += 1
+            else:
+                pending[callback] = None
+
+        if pending and self._flushHandle is None:
+            if self._window:
+                self._flushHandle = self._loop.call_later(self._window, self.flush)
+            else:
+                self._flushHandle = self._loop.call_soon(self.flush)
+
+    def flush(self) -> None:
+        """Write every entity with a pending update."""
+        if self._flushHandle is not None:
+            self._flushHandle.cancel()
+            self._flushHandle = None
+        pending, self._pending = self._pending, {}
+        self.writes += len(pending)
+        for callback in pending:
+            callback()
+
+    def discard(self, callback: Callable[[], None]) -> None:
+        """Drop any pending or held back write for an entity which is going away."""
+        self._pending.pop(callback, None)
+        for deferred in self._deferred.values():
+            deferred.pop(callback, None)
+
+    def cancel(self) -> None:
+        """Drop all pending and held back writes."""
+        if self._flushHandle is not None:
+            self._flushHandle.cancel()
+            self._flushHandle = None
+        for handle in self._deferredHandles.values():
+            handle.cancel()
+        self._pending.clear()
+        self._deferred.clear()
+        self._deferredHandles.clear()
+        self._lastWrite.clear()
+
+    def _write_now(self, callbacks, key) -> None:
+        pending = self._pending
+        deferred = self._deferred.get(key)
+        if key is not None:
+            self._lastWrite[key] = self._loop.time()
+        for callback in callbacks:
+            self.requested += 1
+            self.urgent += 1
+            self.writes += 1
+            # This write supersedes any that are waiting
+            pending.pop(callback, None)
+            if deferred:
+                deferred.pop(callback, None)
+            callback()
+
+    def _defer(self, callbacks, key, when) -> None:
+        deferred = self._deferred.setdefault(key, {})
+        for callback in callbacks:
+            self.requested += 1
+            if callback in deferred:
+                self.coalesced += 1
+            else:
+                self.deferred += 1
+                deferred[callback] = None
+        if key not in self._deferredHandles:
+            self._deferredHandles[key] = self._loop.call_at(when, self._release, key)
+
+    def _release(self, key) -> None:
+        del self._deferredHandles[key]
+        callbacks = self._deferred.pop(key, None)
+        if callbacks:
+            # Count the released writes as new requests only once
+            self.requested -= len(callbacks)
+            self._lastWrite.pop(key, None)
+            self.schedule(callbacks, key)
+
+    def snapshot(self) -> dict:
+        return {
+            "requested": self.requested,
+            "writes": self.writes,
+            "coalesced": self.coalesced,
+            "deferred": self.deferred,
+            "urgent": self.urgent,
+        }
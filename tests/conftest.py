@@ -0,0 +1,50 @@
+"""Shared fixtures for the tests of the Home Assistant side of the integration.  They need
+Home Assistant installed; run them from the root of the repository:
+
+    python -m pytest tests
+
+The tests for the pyenvisalink library are in pyenvisalink/tests.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custom_components.envisalink_new.const import DOMAIN  # noqa: E402
+from custom_components.envisalink_new.controller import EnvisalinkController  # noqa: E402
+from custom_components.envisalink_new.pyenvisalink.alarm_state import (  # noqa: E402
+    AlarmState,
+)
+from custom_components.envisalink_new.pyenvisalink.const import (  # noqa: E402
+    MAX_PARTITIONS,
+)
+
+
+def build_controller(options=None, zones=8) -> EnvisalinkController:
+    """A controller for an EVL which is never connected to, with an initial alarm state.
+    It must be built inside a running event loop."""
+    entry = ConfigEntry(
+        version=1,
+        minor_version=1,
+        domain=DOMAIN,
+        title="Alarm",
+        data={"host": "127.0.0.1", "zone_set": f"1-{zones}"},
+        options=options or {},
+        source="user",
+        unique_id=None,
+        discovery_keys={},
+    )
+    controller = EnvisalinkController(HomeAssistant(str(Path(__file__).parent)), entry)
+    controller.controller._alarmState = AlarmState.get_initial_alarm_state(
+        zones, MAX_PARTITIONS
+    )
+    return controller
+
+
+@pytest.fixture
+def make_controller():
+    return build_controller
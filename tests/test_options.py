@@ -0,0 +1,57 @@
+"""The advanced options are passed through to the alarm panel."""
+import asyncio
+
+from custom_components.envisalink_new.const import (
+    CONF_BUFFERED_TRANSPORT,
+    CONF_CONGESTION_CONTROL,
+    CONF_KEYPRESS_BATCH_SIZE,
+    CONF_PIPELINE_WINDOW,
+    CONF_WIRE_TRACE_MAX_PER_SECOND,
+    CONF_WIRE_TRACE_SAMPLE_RATE,
+)
+
+
+def panel_for(make_controller, options):
+    async def run():
+        return make_controller(options).controller
+
+    return asyncio.run(run())
+
+
+def test_defaults(make_controller):
+    panel = panel_for(make_controller, {})
+    assert not panel.buffered_transport
+    assert panel.wire_trace_sample_rate == 1
+    assert panel.wire_trace_max_per_second == 0
+    assert panel.pipeline_window == 1
+    assert panel.keypress_batch_size == 1
+    assert not panel.congestion_control
+
+
+def test_buffered_transport(make_controller):
+    panel = panel_for(make_controller, {CONF_BUFFERED_TRANSPORT: True})
+    assert panel.buffered_transport
+
+
+def test_wire_trace(make_controller):
+    panel = panel_for(
+        make_controller,
+        {CONF_WIRE_TRACE_SAMPLE_RATE: 10, CONF_WIRE_TRACE_MAX_PER_SECOND: 5},
+    )
+    assert panel.wire_trace_sample_rate == 10
+    assert panel.wire_trace_max_per_second == 5
+
+
+def test_pipeline_window(make_controller):
+    panel = panel_for(make_controller, {CONF_PIPELINE_WINDOW: 4})
+    assert panel.pipeline_window == 4
+
+
+def test_keypress_batch_size(make_controller):
+    panel = panel_for(make_controller, {CONF_KEYPRESS_BATCH_SIZE: 8})
+    assert panel.keypress_batch_size == 8
+
+
+def test_congestion_control(make_controller):
+    panel = panel_for(make_controller, {CONF_CONGESTION_CONTROL: True})
+    assert panel.congestion_control
@@ -0,0 +1,152 @@
+"""Entity state writes: alarm transitions skip the coalescing, and the writes of entities
+which go away are dropped."""
+import asyncio
+
+import pytest
+
+from custom_components.envisalink_new.const import (
+    CONF_STATE_WRITE_WINDOW,
+    CONF_ZONE_MIN_UPDATE_INTERVAL,
+)
+from custom_components.envisalink_new.pyenvisalink.alarm_state import ZONE_ALARM
+from custom_components.envisalink_new.pyenvisalink.const import (
+    STATE_CHANGE_PARTITION,
+    STATE_CHANGE_ZONE,
+    STATE_CHANGE_ZONE_BYPASS,
+)
+
+# Long enough that nothing held back is written while a test runs
+SLOW = {CONF_STATE_WRITE_WINDOW: 60, CONF_ZONE_MIN_UPDATE_INTERVAL: 60}
+
+
+class Entity:
+    def __init__(self):
+        self.writes = 0
+
+    def write(self):
+        self.writes += 1
+
+
+def no_pending_writes(controller) -> bool:
+    """No write is waiting for the window or held back by the minimum interval."""
+    state_writes = controller._state_writes
+    return not state_writes._pending and not any(state_writes._deferred.values())
+
+
+@pytest.mark.parametrize("field", ["alarm", "fire", "alarm_fire_zone", "panic"])
+def test_urgent_partition_fields_skip_the_window(make_controller, field):
+    async def run():
+        controller = make_controller(SLOW)
+        entity = Entity()
+        controller.add_state_change_listener(STATE_CHANGE_PARTITION, 1, entity.write)
+
+        controller.async_partition_updated_callback({1: ["ready"]})
+        assert entity.writes == 0
+        controller.async_partition_updated_callback({1: ["ready", field]})
+        assert entity.writes == 1
+        # The urgent write supersedes the one which was waiting
+        assert no_pending_writes(controller)
+
+    asyncio.run(run())
+
+
+def test_zone_alarm_skips_the_window_and_debounce(make_controller):
+    async def run():
+        controller = make_controller(SLOW)
+        zones = controller.controller.alarm_state.zones
+        entity = Entity()
+        controller.add_state_change_listener(STATE_CHANGE_ZONE, 3, entity.write)
+
+        controller.async_zones_updated_callback([3])
+        # Within the minimum interval, so held back
+        controller.async_zones_updated_callback([3])
+        assert entity.writes == 0
+
+        zones.set_flag(3, ZONE_ALARM, True)
+        controller.async_zones_updated_callback([3])
+        assert entity.writes == 1
+        # Coming out of alarm is urgent too
+        zones.set_flag(3, ZONE_ALARM, False)
+        controller.async_zones_updated_callback([3])
+        assert entity.writes == 2
+        assert no_pending_writes(controller)
+
+        # After which the zone's writes are held back again
+        controller.async_zones_updated_callback([3])
+        controller.async_zones_updated_callback([3])
+        assert entity.writes == 2
+        controller._state_writes.cancel()
+
+    asyncio.run(run())
+
+
+def test_coalesced_writes_are_made_once(make_controller):
+    async def run():
+        controller = make_controller({CONF_STATE_WRITE_WINDOW: 0.05})
+        entity = Entity()
+        controller.add_state_change_listener(STATE_CHANGE_PARTITION, 1, entity.write)
+        for _ in range(5):
+            controller.async_partition_updated_callback({1: ["ready"]})
+        assert entity.writes == 0
+        await asyncio.sleep(0.1)
+        assert entity.writes == 1
+        assert no_pending_writes(controller)
+
+    asyncio.run(run())
+
+
+def test_removed_entity_is_not_written(make_controller):
+    async def run():
+        controller = make_controller(
+            {CONF_STATE_WRITE_WINDOW: 0.05, CONF_ZONE_MIN_UPDATE_INTERVAL: 0.3}
+        )
+        pending, deferred, kept = Entity(), Entity(), Entity()
+        remove_pending = controller.add_state_change_listener(
+            STATE_CHANGE_ZONE_BYPASS, 1, pending.write
+        )
+        remove_deferred = controller.add_state_change_listener(
+            STATE_CHANGE_ZONE, 2, deferred.write
+        )
+        controller.add_state_change_listener(STATE_CHANGE_ZONE, 2, kept.write)
+
+        controller.async_zone_bypass_update([1])
+        controller.async_zones_updated_callback([2])
+        await asyncio.sleep(0.06)
+        # The second update of zone 2 is held back until the interval is up
+        controller.async_zones_updated_callback([2])
+        controller.async_zone_bypass_update([1])
+        assert (pending.writes, deferred.writes, kept.writes) == (1, 1, 1)
+
+        remove_pending()
+        remove_deferred()
+        await asyncio.sleep(0.4)
+        assert (pending.writes, deferred.writes, kept.writes) == (1, 1, 2)
+        assert no_pending_writes(controller)
+
+    asyncio.run(run())
+
+
+def test_stop_drops_every_pending_write(make_controller):
+    async def run():
+        controller = make_controller(
+            {CONF_STATE_WRITE_WINDOW: 0.05, CONF_ZONE_MIN_UPDATE_INTERVAL: 0.3}
+        )
+        entities = [Entity() for _ in range(3)]
+        controller.add_state_change_listener(STATE_CHANGE_PARTITION, 1, entities[0].write)
+        controller.add_state_change_listener(STATE_CHANGE_ZONE, 1, entities[1].write)
+        controller.add_state_change_listener(STATE_CHANGE_ZONE, 2, entities[2].write)
+
+        controller.async_zones_updated_callback([1])
+        await asyncio.sleep(0.06)
+        controller.async_zones_updated_callback([1, 2])
+        controller.async_partition_updated_callback({1: ["ready"]})
+        assert [entity.writes for entity in entities] == [0, 1, 0]
+
+        await controller.stop()
+        assert no_pending_writes(controller)
+        state_writes = controller._state_writes
+        assert state_writes._flushHandle is None and not state_writes._deferredHandles
+        await asyncio.sleep(0.4)
+        assert [entity.writes for entity in entities] == [0, 1, 0]
+
+    asyncio.run(run())